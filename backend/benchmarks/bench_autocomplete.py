@@ -0,0 +1,91 @@
+"""
+Typeahead latency benchmark
+Builds the autocomplete index over a synthetic catalog and times completions of every prefix
+of sampled product names, as a user typing them one keystroke at a time would send, plus
+the cost of keeping the index current on product writes
+
+No database needed; the catalog is generated in memory.
+    python benchmarks/bench_autocomplete.py --products 100000
+"""
+import argparse
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from services.autocomplete_service import AutocompleteIndex
+
+BRANDS = ["Apple", "Samsung", "Sony", "Nike", "Adidas", "Philips", "Boat", "Puma", "Lenovo", "Prestige"]
+NOUNS = ["phone", "laptop", "headphones", "shoes", "watch", "speaker", "kettle", "charger", "jacket", "backpack"]
+ADJECTIVES = ["pro", "max", "ultra", "lite", "classic", "sport", "wireless", "smart", "mini", "plus"]
+
+def synthetic_product(rng: random.Random, i: int) -> dict:
+    words = [rng.choice(ADJECTIVES) for _ in range(rng.randint(0, 2))]
+    return {
+        "id": f"bench-{i}",
+        "name": f"{rng.choice(BRANDS)} {' '.join(words)} {rng.choice(NOUNS)} {rng.randint(1, 999)}",
+        "brand": rng.choice(BRANDS),
+        "category_id": f"category-{rng.randrange(50)}",
+        "rating": round(rng.uniform(1, 5), 1),
+        "review_count": int(rng.paretovariate(1.2)) - 1,
+    }
+
+def percentile(values, pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+def run_benchmark(products: int, queries: int, writes: int, seed: int):
+    rng = random.Random(seed)
+    catalog = [synthetic_product(rng, i) for i in range(products)]
+
+    start = time.perf_counter()
+    index = AutocompleteIndex.build(catalog, {f"category-{i}": f"Category {i}" for i in range(50)})
+    build_elapsed = time.perf_counter() - start
+
+    # Every prefix of a sampled name, the way debounced keystrokes arrive
+    typed = []
+    for product in rng.sample(catalog, queries):
+        name = product["name"].lower()
+        typed.extend(name[:length] for length in range(1, len(name) + 1))
+
+    def type_all() -> list:
+        latencies = []
+        for prefix in typed:
+            start = time.perf_counter()
+            index.complete(prefix, 5)
+            latencies.append((time.perf_counter() - start) * 1000)
+        return latencies
+
+    # The first pass fills the top-suggestion cache of busy prefixes; the second is steady state
+    cold = type_all()
+    warm = type_all()
+
+    write_latencies = []
+    for i in range(writes):
+        product = synthetic_product(rng, products + i)
+        start = time.perf_counter()
+        index.index_product(product)
+        write_latencies.append((time.perf_counter() - start) * 1000)
+
+    print(f"📊 {products} products, {len(typed)} keystroke completions")
+    print(f"  - Index built in {build_elapsed:.2f}s")
+    for label, latencies in (("cold cache", cold), ("warm cache", warm)):
+        print(f"  - Completion ({label}) p50 {statistics.median(latencies):.3f}ms, "
+              f"p99 {percentile(latencies, 99):.3f}ms, max {max(latencies):.3f}ms")
+    print(f"  - Product write p50 {statistics.median(write_latencies):.3f}ms, "
+          f"p99 {percentile(write_latencies, 99):.3f}ms")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=100000, help="Synthetic catalog size")
+    parser.add_argument("--queries", type=int, default=500, help="Product names typed out keystroke by keystroke")
+    parser.add_argument("--writes", type=int, default=1000, help="Products added after the build")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed")
+    args = parser.parse_args()
+
+    run_benchmark(args.products, args.queries, args.writes, args.seed)
+
+if __name__ == "__main__":
+    main()
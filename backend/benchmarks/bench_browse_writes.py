@@ -0,0 +1,103 @@
+"""
+Write volume benchmark for browse-only traffic
+Simulates new users who open their cart and wishlist and check the wishlist badge on a page
+of products without ever adding anything, then has each of them add one item, and counts
+the write commands sent to MongoDB in each phase
+
+Requires a running MongoDB (MONGO_URL); uses its own database (BENCH_DB_NAME), dropped afterwards.
+    python benchmarks/bench_browse_writes.py --users 200 --cards 24
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+import uuid
+from collections import Counter
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+# Always run against a throwaway database, never the configured one
+os.environ["DB_NAME"] = os.environ.get("BENCH_DB_NAME", "polluxkart_bench")
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import monitoring
+from config.settings import settings
+from config.database import Database, COLLECTIONS
+
+WRITE_COMMANDS = {"insert", "update", "delete", "findAndModify"}
+
+class WriteCounter(monitoring.CommandListener):
+    """Counts write commands by collection"""
+    def __init__(self):
+        self.writes = Counter()
+
+    def started(self, event):
+        if event.command_name in WRITE_COMMANDS:
+            self.writes[event.command.get(event.command_name)] += 1
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+async def run_benchmark(users: int, cards: int):
+    counter = WriteCounter()
+    Database.client = AsyncIOMotorClient(settings.MONGO_URL, event_listeners=[counter])
+    db = Database.get_db()
+
+    # Services bind to the database when constructed, so import them after the client is set
+    from services.cart_service import CartService, WishlistService
+    cart_service = CartService()
+    wishlist_service = WishlistService()
+
+    product_ids = [f"bench-{uuid.uuid4()}" for _ in range(cards)]
+    await db[COLLECTIONS['products']].insert_many([
+        {
+            "id": product_id, "name": f"Bench product {i}", "description": "", "price": 100.0,
+            "category_id": "bench", "stock": 100, "in_stock": True, "is_active": True,
+            "created_at": "2024-01-01T00:00:00+00:00", "updated_at": "2024-01-01T00:00:00+00:00",
+        }
+        for i, product_id in enumerate(product_ids)
+    ])
+    user_ids = [f"bench-user-{uuid.uuid4()}" for _ in range(users)]
+
+    async def browse(user_id: str):
+        await cart_service.get_cart(user_id)
+        await wishlist_service.get_wishlist(user_id)
+        await asyncio.gather(*(wishlist_service.is_in_wishlist(user_id, pid) for pid in product_ids))
+
+    async def first_add(user_id: str):
+        await wishlist_service.add_to_wishlist(user_id, product_ids[0])
+        await cart_service.add_to_cart(user_id, product_ids[0], 1)
+
+    counter.writes.clear()
+    start = time.perf_counter()
+    await asyncio.gather(*(browse(user_id) for user_id in user_ids))
+    browse_elapsed = time.perf_counter() - start
+    browse_writes = sum(counter.writes.values())
+
+    counter.writes.clear()
+    await asyncio.gather(*(first_add(user_id) for user_id in user_ids))
+    add_writes = dict(counter.writes)
+
+    requests = users * (2 + cards)
+    print(f"📊 {users} new users, each viewing cart, wishlist and {cards} wishlist badges ({requests} reads)")
+    print(f"  - Browse phase: {browse_writes} writes in {browse_elapsed:.3f}s ({browse_writes / users:.2f} per user)")
+    print(f"  - First add to wishlist and cart: {sum(add_writes.values())} writes {add_writes}")
+    print(f"  - Carts stored: {await db[COLLECTIONS['carts']].count_documents({})}, "
+          f"wishlists stored: {await db[COLLECTIONS['wishlists']].count_documents({})}")
+
+    await Database.get_client().drop_database(settings.DB_NAME)
+    await Database.close()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=200, help="Simulated new users")
+    parser.add_argument("--cards", type=int, default=24, help="Product cards (wishlist badge checks) per user")
+    args = parser.parse_args()
+
+    asyncio.run(run_benchmark(args.users, args.cards))
+
+if __name__ == "__main__":
+    main()
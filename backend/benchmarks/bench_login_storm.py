@@ -0,0 +1,114 @@
+"""
+Event-loop latency benchmark for password hashing during a login storm
+Verifies N passwords concurrently while an unrelated endpoint (GET /) is polled, once with
+bcrypt run inline on the event loop and once through the bounded PasswordHasher, and
+reports the latency percentiles of the unrelated requests
+
+No database needed; the probe endpoint does not touch MongoDB.
+    python benchmarks/bench_login_storm.py --logins 200 --workers 4
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from server import app
+from utils.auth import PasswordHasher, hash_password, verify_password
+
+PROBE_SCOPE = {
+    "type": "http",
+    "asgi": {"version": "3.0"},
+    "http_version": "1.1",
+    "method": "GET",
+    "scheme": "http",
+    "path": "/",
+    "raw_path": b"/",
+    "root_path": "",
+    "query_string": b"",
+    "headers": [],
+    "client": ("bench", 0),
+    "server": ("bench", 80),
+}
+
+async def probe_request() -> float:
+    """Call GET / in-process through the ASGI app and return its latency in ms"""
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    start = time.perf_counter()
+    await app(dict(PROBE_SCOPE), receive, send)
+    return (time.perf_counter() - start) * 1000
+
+def percentile(values, pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+async def run_storm(mode: str, logins: int, workers: int, probe_interval: float, password_hash: str) -> dict:
+    hasher = PasswordHasher(max_workers=workers)
+    latencies = []
+    done = asyncio.Event()
+
+    async def login():
+        if mode == "inline":
+            verify_password("bench-password", password_hash)
+            await asyncio.sleep(0)
+        else:
+            await hasher.verify("bench-password", password_hash)
+
+    async def probe():
+        while not done.is_set():
+            # Measure from when the probe was due, so time spent waiting for the loop counts
+            due = time.perf_counter()
+            await asyncio.sleep(probe_interval)
+            await probe_request()
+            latencies.append((time.perf_counter() - due - probe_interval) * 1000)
+
+    probe_task = asyncio.create_task(probe())
+    start = time.perf_counter()
+    await asyncio.gather(*(login() for _ in range(logins)))
+    elapsed = time.perf_counter() - start
+    done.set()
+    await probe_task
+    hasher._executor.shutdown()
+
+    return {
+        "mode": mode,
+        "elapsed": elapsed,
+        "logins_per_sec": logins / elapsed,
+        "probes": len(latencies),
+        "p50": statistics.median(latencies) if latencies else 0.0,
+        "p99": percentile(latencies, 99) if latencies else 0.0,
+        "max": max(latencies) if latencies else 0.0,
+        "max_queue_depth": hasher.max_queue_depth,
+    }
+
+async def run_benchmark(logins: int, workers: int, probe_interval_ms: float):
+    password_hash = hash_password("bench-password")
+
+    print(f"📊 {logins} concurrent logins, probing GET / every {probe_interval_ms}ms")
+    for mode in ("inline", "offloaded"):
+        result = await run_storm(mode, logins, workers, probe_interval_ms / 1000, password_hash)
+        label = "bcrypt on event loop" if mode == "inline" else f"PasswordHasher ({workers} workers)"
+        print(f"  - {label}:")
+        print(f"      {result['elapsed']:.2f}s ({result['logins_per_sec']:.0f} logins/s), {result['probes']} probes")
+        print(f"      probe latency p50 {result['p50']:.2f}ms, p99 {result['p99']:.2f}ms, max {result['max']:.2f}ms")
+        if mode == "offloaded":
+            print(f"      max queue depth {result['max_queue_depth']}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=200, help="Concurrent password verifications")
+    parser.add_argument("--workers", type=int, default=4, help="PasswordHasher threads")
+    parser.add_argument("--probe-interval", type=float, default=5.0, help="Milliseconds between probe requests")
+    args = parser.parse_args()
+
+    asyncio.run(run_benchmark(args.logins, args.workers, args.probe_interval))
+
+if __name__ == "__main__":
+    main()
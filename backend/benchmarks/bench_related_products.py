@@ -0,0 +1,86 @@
+"""
+Build-time benchmark for TF-IDF related products
+Generates a synthetic catalog with a Zipf-distributed vocabulary and times vectorizing it,
+computing every product's top-k neighbours and applying incremental edits
+
+No database needed.
+    python benchmarks/bench_related_products.py --products 100000 --k 10
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import numpy as np
+from services.related_service import RelatedProductsIndex
+
+BRANDS = [f"brand{i}" for i in range(500)]
+CATEGORIES = ["Electronics", "Fashion", "Home & Living", "Beauty", "Sports", "Books", "Toys", "Grocery"]
+
+def synthetic_products(count: int, vocabulary_size: int, seed: int) -> list:
+    rng = np.random.default_rng(seed)
+    vocabulary = [f"term{i}" for i in range(vocabulary_size)]
+    # Zipf-like word frequencies, as in real product text
+    weights = 1 / np.arange(1, vocabulary_size + 1)
+    weights /= weights.sum()
+    # Draw every word up front; 4 name + 30 description + 3x3 feature words per product
+    draws = iter(rng.choice(vocabulary_size, size=count * 43, p=weights).tolist())
+
+    def words(n: int) -> str:
+        return " ".join(vocabulary[next(draws)] for _ in range(n))
+
+    return [
+        {
+            "id": f"bench-{i}",
+            "name": words(4),
+            "description": words(30),
+            "features": [words(3) for _ in range(3)],
+            "brand": random.choice(BRANDS),
+            "category_name": random.choice(CATEGORIES),
+        }
+        for i in range(count)
+    ]
+
+def run_benchmark(products: int, k: int, vocabulary: int, edits: int):
+    random.seed(42)
+    print(f"📊 {products} products, vocabulary {vocabulary}, top {k} neighbours")
+
+    start = time.perf_counter()
+    catalog = synthetic_products(products, vocabulary, seed=42)
+    print(f"  - Generated catalog in {time.perf_counter() - start:.2f}s")
+
+    index = RelatedProductsIndex(k=k)
+    start = time.perf_counter()
+    index.build(catalog)
+    elapsed = time.perf_counter() - start
+    matrix = index.matrix
+    print(f"  - Full build: {elapsed:.2f}s ({products / elapsed:.0f} products/s)")
+    print(f"      matrix {matrix.shape[0]}x{matrix.shape[1]}, {matrix.nnz} non-zeros "
+          f"({matrix.data.nbytes + matrix.indices.nbytes + matrix.indptr.nbytes} bytes)")
+
+    edited = synthetic_products(edits, vocabulary, seed=7)
+    timings = []
+    changed = []
+    for product in edited:
+        product["id"] = random.choice(index.ids)
+        start = time.perf_counter()
+        changed.append(len(index.update_product(product)))
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    print(f"  - Incremental edit: p50 {timings[len(timings) // 2]:.1f}ms, p99 {timings[int(len(timings) * 0.99)]:.1f}ms, "
+          f"{sum(changed) / len(changed):.1f} lists rewritten per edit")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=100000, help="Catalog size")
+    parser.add_argument("--k", type=int, default=10, help="Neighbours per product")
+    parser.add_argument("--vocabulary", type=int, default=20000, help="Distinct words in the synthetic text")
+    parser.add_argument("--edits", type=int, default=50, help="Incremental edits to time")
+    args = parser.parse_args()
+
+    run_benchmark(args.products, args.k, args.vocabulary, args.edits)
+
+if __name__ == "__main__":
+    main()
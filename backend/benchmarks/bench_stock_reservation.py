@@ -0,0 +1,80 @@
+"""
+Contention benchmark for InventoryService.reserve_stock
+Fires N concurrent reservations at one SKU and checks throughput and that no overselling happens
+
+Requires a running MongoDB (MONGO_URL); uses its own database (BENCH_DB_NAME), dropped afterwards.
+    python benchmarks/bench_stock_reservation.py --stock 500 --requests 2000 --concurrency 200
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+import uuid
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+# Always run against a throwaway database, never the configured one
+os.environ["DB_NAME"] = os.environ.get("BENCH_DB_NAME", "polluxkart_bench")
+
+from config.database import get_db, Database
+from services.inventory_service import InventoryService
+
+async def run_benchmark(stock: int, requests: int, concurrency: int, quantity: int) -> bool:
+    """Run the benchmark, returning True if no overselling was detected"""
+    db = get_db()
+    service = InventoryService()
+    product_id = f"bench-{uuid.uuid4()}"
+    
+    await service.inventory.insert_one({
+        "id": str(uuid.uuid4()),
+        "product_id": product_id,
+        "quantity": stock,
+        "reserved": 0,
+        "low_stock_threshold": 10,
+    })
+    
+    semaphore = asyncio.Semaphore(concurrency)
+    reserved_ok = 0
+    rejected = 0
+    
+    async def reserve(i: int):
+        nonlocal reserved_ok, rejected
+        async with semaphore:
+            try:
+                await service.reserve_stock(product_id, quantity, f"bench-order-{i}")
+                reserved_ok += 1
+            except ValueError:
+                rejected += 1
+    
+    start = time.perf_counter()
+    await asyncio.gather(*(reserve(i) for i in range(requests)))
+    elapsed = time.perf_counter() - start
+    
+    inv = await service.inventory.find_one({"product_id": product_id}, {"_id": 0})
+    expected_ok = min(requests, stock // quantity)
+    
+    print(f"📊 {requests} reservations of {quantity} against stock {stock} (concurrency {concurrency})")
+    print(f"  - Elapsed: {elapsed:.3f}s ({requests / elapsed:.0f} reservations/s)")
+    print(f"  - Succeeded: {reserved_ok} (expected {expected_ok}), rejected: {rejected}")
+    print(f"  - Final reserved: {inv['reserved']} / quantity {inv['quantity']}")
+    
+    ok = (
+        reserved_ok == expected_ok
+        and inv["reserved"] == reserved_ok * quantity
+        and inv["reserved"] <= inv["quantity"]
+    )
+    print("✅ No overselling" if ok else "❌ Overselling or lost reservations detected")
+    
+    await db.client.drop_database(db.name)
+    await Database.close()
+    return ok
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent stock reservation benchmark")
+    parser.add_argument("--stock", type=int, default=500)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--quantity", type=int, default=1)
+    args = parser.parse_args()
+    ok = asyncio.run(run_benchmark(args.stock, args.requests, args.concurrency, args.quantity))
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,423 @@
+"""
+Load test harness with weighted shopper scenarios
+Virtual users loop over scenarios picked by weight (browsing listings, searching,
+viewing product pages, churning a cart, checking out through the mock Razorpay path)
+for a fixed duration, and the run reports requests per second and p50/p95/p99 latency
+per endpoint. Results can be saved as a JSON baseline and two baselines diffed.
+
+Targets:
+  - in process (default): drives the ASGI app through httpx, with its lifespan,
+    against the configured MONGO_URL / DB_NAME
+  - --uvicorn: starts `uvicorn server:app` on --port and drives it over HTTP
+  - --base-url: drives an already running server
+
+Use a seeded throwaway database (scripts/seed_db.py) with stock to spare, and leave
+RAZORPAY_KEY_ID/SECRET unset so checkout takes the mock payment path.
+    python benchmarks/load_test.py run --users 50 --duration 60 --output baseline.json
+    python benchmarks/load_test.py run --mix browse=1,checkout=0 --uvicorn --workers 4
+    python benchmarks/load_test.py diff baseline.json candidate.json --threshold 10
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import httpx
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# Relative frequency of each scenario; override with --mix
+DEFAULT_MIX = {
+    "browse": 40,
+    "search": 20,
+    "product_detail": 25,
+    "cart_churn": 10,
+    "checkout": 5,
+}
+
+SORTS = ["default", "price_asc", "price_desc", "rating", "newest"]
+
+SHIPPING_ADDRESS = {
+    "full_name": "Load Test",
+    "phone": "+919800000000",
+    "address_line1": "1 Benchmark Road",
+    "city": "Bengaluru",
+    "state": "Karnataka",
+    "pincode": "560001",
+}
+
+def percentile(values, pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+class Recorder:
+    """Latencies and error counts per endpoint, keyed by "METHOD /route/{template}" """
+
+    def __init__(self):
+        self.latencies = {}
+        self.errors = {}
+        self.recording = False
+
+    def record(self, name: str, elapsed_ms: float, ok: bool):
+        if not self.recording:
+            return
+        self.latencies.setdefault(name, []).append(elapsed_ms)
+        if not ok:
+            self.errors[name] = self.errors.get(name, 0) + 1
+
+    def summary(self, elapsed: float) -> dict:
+        endpoints = {}
+        for name, latencies in sorted(self.latencies.items()):
+            endpoints[name] = {
+                "requests": len(latencies),
+                "errors": self.errors.get(name, 0),
+                "rps": round(len(latencies) / elapsed, 2),
+                "p50_ms": round(percentile(latencies, 50), 2),
+                "p95_ms": round(percentile(latencies, 95), 2),
+                "p99_ms": round(percentile(latencies, 99), 2),
+                "max_ms": round(max(latencies), 2),
+            }
+        total = sum(e["requests"] for e in endpoints.values())
+        everything = [ms for latencies in self.latencies.values() for ms in latencies]
+        return {
+            "requests": total,
+            "errors": sum(e["errors"] for e in endpoints.values()),
+            "rps": round(total / elapsed, 2),
+            "p50_ms": round(percentile(everything, 50), 2) if everything else 0.0,
+            "p95_ms": round(percentile(everything, 95), 2) if everything else 0.0,
+            "p99_ms": round(percentile(everything, 99), 2) if everything else 0.0,
+            "endpoints": endpoints,
+        }
+
+class Shopper:
+    """One virtual user with its own auth token"""
+
+    def __init__(self, client: httpx.AsyncClient, recorder: Recorder, catalog: dict, rng: random.Random):
+        self.client = client
+        self.recorder = recorder
+        self.catalog = catalog
+        self.rng = rng
+        self.headers = {}
+
+    async def request(self, name: str, method: str, url: str, **kwargs) -> httpx.Response:
+        """Send a request and record it under `name`, the endpoint's route template"""
+        start = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, headers=self.headers, **kwargs)
+        except httpx.HTTPError:
+            self.recorder.record(name, (time.perf_counter() - start) * 1000, ok=False)
+            raise
+        self.recorder.record(name, (time.perf_counter() - start) * 1000, ok=response.status_code < 400)
+        return response
+
+    async def sign_up(self):
+        suffix = uuid.uuid4().hex[:12]
+        response = await self.client.post("/api/auth/register", json={
+            "email": f"shopper-{suffix}@loadtest.polluxkart.com",
+            "phone": f"+91{self.rng.randrange(10 ** 9, 10 ** 10)}",
+            "name": f"Load Test {suffix}",
+            "password": "LoadTest@123",
+        })
+        if response.status_code >= 400:
+            raise SystemExit(f"Signing up a shopper failed ({response.status_code}): {response.text}")
+        self.headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    def product_id(self) -> str:
+        return self.rng.choice(self.catalog["product_ids"])
+
+    # ============ Scenarios ============
+
+    async def browse(self):
+        await self.request("GET /api/products/categories", "GET", "/api/products/categories")
+        params = {"page": self.rng.randint(1, 5), "page_size": 12, "sort_by": self.rng.choice(SORTS)}
+        if self.catalog["category_ids"] and self.rng.random() < 0.5:
+            params["category_id"] = self.rng.choice(self.catalog["category_ids"])
+        await self.request("GET /api/products", "GET", "/api/products", params=params)
+        await self.request("GET /api/products", "GET", "/api/products", params={**params, "page": params["page"] + 1})
+
+    async def search(self):
+        term = self.rng.choice(self.catalog["search_terms"])
+        # Debounced keystrokes, then the results page
+        for length in range(2, len(term) + 1, 2):
+            await self.request(
+                "GET /api/products/autocomplete", "GET", "/api/products/autocomplete", params={"q": term[:length]}
+            )
+        await self.request("GET /api/products", "GET", "/api/products", params={"search": term, "page_size": 12})
+
+    async def product_detail(self):
+        product_id = self.product_id()
+        await self.request("GET /api/products/{product_id}/detail", "GET", f"/api/products/{product_id}/detail")
+        await self.request(
+            "GET /api/products/{product_id}/frequently-bought-together",
+            "GET", f"/api/products/{product_id}/frequently-bought-together"
+        )
+        await self.request(
+            "POST /api/wishlist/check", "POST", "/api/wishlist/check",
+            json={"product_ids": self.rng.sample(self.catalog["product_ids"], min(12, len(self.catalog["product_ids"])))}
+        )
+
+    async def cart_churn(self):
+        product_id = self.product_id()
+        await self.request("POST /api/cart/items", "POST", "/api/cart/items", json={"product_id": product_id, "quantity": 1})
+        await self.request(
+            "PUT /api/cart/items/{product_id}", "PUT", f"/api/cart/items/{product_id}", json={"quantity": 2}
+        )
+        await self.request("GET /api/cart", "GET", "/api/cart")
+        await self.request("DELETE /api/cart/items/{product_id}", "DELETE", f"/api/cart/items/{product_id}")
+
+    async def checkout(self):
+        for product_id in self.rng.sample(self.catalog["product_ids"], min(self.rng.randint(1, 3), len(self.catalog["product_ids"]))):
+            await self.request("POST /api/cart/items", "POST", "/api/cart/items", json={"product_id": product_id, "quantity": 1})
+        await self.request("GET /api/cart/recommendations", "GET", "/api/cart/recommendations")
+
+        response = await self.request("POST /api/orders", "POST", "/api/orders", json={
+            "shipping_address": SHIPPING_ADDRESS, "payment_method": "razorpay"
+        })
+        if response.status_code >= 400:
+            await self.request("DELETE /api/cart", "DELETE", "/api/cart")
+            return
+        order_id = response.json()["id"]
+
+        response = await self.request(
+            "POST /api/payments/razorpay/create/{order_id}", "POST", f"/api/payments/razorpay/create/{order_id}"
+        )
+        if response.status_code >= 400:
+            return
+        # The mock payment path accepts any signature
+        await self.request("POST /api/payments/razorpay/verify", "POST", "/api/payments/razorpay/verify", json={
+            "razorpay_order_id": response.json()["razorpay_order_id"],
+            "razorpay_payment_id": f"pay_mock_{uuid.uuid4().hex[:14]}",
+            "razorpay_signature": "mock",
+        })
+
+async def load_catalog(client: httpx.AsyncClient, pages: int) -> dict:
+    """Product IDs, category IDs and search terms for scenarios to pick from"""
+    product_ids, terms = [], set()
+    for page in range(1, pages + 1):
+        response = await client.get("/api/products", params={"page": page, "page_size": 50})
+        response.raise_for_status()
+        products = response.json()["products"]
+        for product in products:
+            product_ids.append(product["id"])
+            terms.update(word.lower() for word in product["name"].split() if len(word) >= 4 and word.isalpha())
+        if len(products) < 50:
+            break
+    if not product_ids:
+        raise SystemExit("No products to load test against; seed the database first (scripts/seed_db.py)")
+
+    response = await client.get("/api/products/categories")
+    response.raise_for_status()
+    category_ids = [c["id"] for c in response.json()] + [
+        sub["id"] for c in response.json() for sub in c.get("subcategories", [])
+    ]
+    return {"product_ids": product_ids, "category_ids": category_ids, "search_terms": sorted(terms) or ["phone"]}
+
+@asynccontextmanager
+async def target_client(args):
+    """An httpx client for the chosen target, with the server running for its duration"""
+    limits = httpx.Limits(max_connections=args.users, max_keepalive_connections=args.users)
+    timeout = httpx.Timeout(args.timeout)
+
+    if args.base_url:
+        async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=timeout) as client:
+            yield client
+        return
+
+    if args.uvicorn:
+        command = [
+            sys.executable, "-m", "uvicorn", "server:app", "--host", "127.0.0.1", "--port", str(args.port),
+            "--workers", str(args.workers), "--log-level", "warning",
+        ]
+        process = subprocess.Popen(command, cwd=BACKEND_DIR)
+        try:
+            async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.port}", limits=limits, timeout=timeout) as client:
+                for _ in range(100):
+                    try:
+                        if (await client.get("/api/health")).status_code == 200:
+                            break
+                    except httpx.TransportError:
+                        pass
+                    await asyncio.sleep(0.2)
+                else:
+                    raise SystemExit("uvicorn did not become healthy")
+                yield client
+        finally:
+            process.terminate()
+            process.wait()
+        return
+
+    from server import app
+    async with app.router.lifespan_context(app):
+        # Unhandled errors become 500 responses, as they would over HTTP
+        transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=timeout) as client:
+            yield client
+
+def parse_mix(value: str) -> dict:
+    mix = dict(DEFAULT_MIX)
+    for part in filter(None, value.split(",")):
+        name, _, weight = part.partition("=")
+        if name not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(f"Unknown scenario {name!r}; choose from {', '.join(DEFAULT_MIX)}")
+        mix[name] = float(weight)
+    if not any(mix.values()):
+        raise argparse.ArgumentTypeError("At least one scenario needs a positive weight")
+    return mix
+
+async def run_load(args) -> dict:
+    recorder = Recorder()
+    rng = random.Random(args.seed)
+    scenario_names = [name for name, weight in args.mix.items() if weight > 0]
+    weights = [args.mix[name] for name in scenario_names]
+
+    async with target_client(args) as client:
+        catalog = await load_catalog(client, args.catalog_pages)
+        shoppers = [Shopper(client, recorder, catalog, random.Random(rng.random())) for _ in range(args.users)]
+        print(f"🛠️ Signing up {len(shoppers)} shoppers...")
+        await asyncio.gather(*(shopper.sign_up() for shopper in shoppers))
+
+        async def shop(shopper: Shopper, deadline: float):
+            while time.perf_counter() < deadline:
+                scenario = shopper.rng.choices(scenario_names, weights)[0]
+                try:
+                    await getattr(shopper, scenario)()
+                except (httpx.HTTPError, KeyError, ValueError):
+                    # Already recorded as an error; start the next scenario
+                    pass
+                if args.think_ms:
+                    await asyncio.sleep(shopper.rng.expovariate(1000 / args.think_ms))
+
+        if args.warmup:
+            print(f"🔥 Warming up for {args.warmup}s...")
+            warmup_deadline = time.perf_counter() + args.warmup
+            await asyncio.gather(*(shop(shopper, warmup_deadline) for shopper in shoppers))
+
+        print(f"🚀 Running {args.users} shoppers for {args.duration}s...")
+        recorder.recording = True
+        start = time.perf_counter()
+        await asyncio.gather(*(shop(shopper, start + args.duration) for shopper in shoppers))
+        elapsed = time.perf_counter() - start
+
+    target = args.base_url or (f"uvicorn --workers {args.workers}" if args.uvicorn else "in-process")
+    return {
+        "meta": {
+            "started_at": datetime.now(timezone.utc).isoformat(),
+            "target": target,
+            "users": args.users,
+            "duration_seconds": round(elapsed, 2),
+            "think_ms": args.think_ms,
+            "mix": args.mix,
+            "seed": args.seed,
+            "git_commit": git_commit(),
+        },
+        "summary": recorder.summary(elapsed),
+    }
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+def print_report(result: dict):
+    meta, summary = result["meta"], result["summary"]
+    print(f"📊 {meta['target']}, {meta['users']} shoppers, {meta['duration_seconds']}s")
+    print(f"  - {summary['requests']} requests, {summary['rps']} req/s, {summary['errors']} errors, "
+          f"p50 {summary['p50_ms']}ms, p95 {summary['p95_ms']}ms, p99 {summary['p99_ms']}ms")
+    width = max((len(name) for name in summary["endpoints"]), default=8)
+    print(f"  {'endpoint':<{width}} {'reqs':>7} {'err':>5} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8}")
+    for name, e in summary["endpoints"].items():
+        print(f"  {name:<{width}} {e['requests']:>7} {e['errors']:>5} {e['rps']:>8} "
+              f"{e['p50_ms']:>8} {e['p95_ms']:>8} {e['p99_ms']:>8}")
+
+def change(old: float, new: float) -> float:
+    """Relative change from `old` to `new` in percent"""
+    if not old:
+        return 0.0 if not new else float("inf")
+    return (new - old) / old * 100
+
+def diff_baselines(old: dict, new: dict, threshold: float) -> int:
+    """Print per-endpoint changes; returns how many endpoints regressed beyond `threshold` percent"""
+    print(f"📊 {old['meta'].get('git_commit') or 'baseline'} -> {new['meta'].get('git_commit') or 'candidate'}"
+          f" (regression threshold {threshold}%)")
+    rows = {"(all)": (old["summary"], new["summary"])}
+    names = sorted(set(old["summary"]["endpoints"]) | set(new["summary"]["endpoints"]))
+    for name in names:
+        rows[name] = (old["summary"]["endpoints"].get(name), new["summary"]["endpoints"].get(name))
+
+    width = max(len(name) for name in rows)
+    print(f"  {'endpoint':<{width}} {'rps':>16} {'p50':>16} {'p95':>16} {'p99':>16}")
+    regressions = 0
+    for name, (before, after) in rows.items():
+        if before is None or after is None:
+            print(f"  {name:<{width}} {'only in ' + ('candidate' if before is None else 'baseline'):>16}")
+            continue
+
+        cells, regressed = [], False
+        for metric, higher_is_worse in (("rps", False), ("p50_ms", True), ("p95_ms", True), ("p99_ms", True)):
+            pct = change(before[metric], after[metric])
+            worse = pct > threshold if higher_is_worse else pct < -threshold
+            regressed = regressed or worse
+            cells.append(f"{after[metric]:>8} {pct:+6.1f}%{'!' if worse else ' '}")
+        if after["errors"] > before["errors"]:
+            regressed = True
+            cells.append(f"errors {before['errors']} -> {after['errors']}!")
+        if regressed and name != "(all)":
+            regressions += 1
+        print(f"  {name:<{width}} " + " ".join(cells))
+
+    print(f"  - {regressions} endpoint(s) regressed")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="Run a load test")
+    run.add_argument("--users", type=int, default=20, help="Concurrent virtual shoppers")
+    run.add_argument("--duration", type=float, default=30, help="Measured seconds")
+    run.add_argument("--warmup", type=float, default=5, help="Unmeasured seconds first, to fill caches")
+    run.add_argument("--think-ms", type=float, default=0, help="Mean pause between scenarios (0 for closed-loop max load)")
+    run.add_argument("--mix", type=parse_mix, default=dict(DEFAULT_MIX),
+                     help="Scenario weights, e.g. browse=50,checkout=0 (defaults: "
+                          + ",".join(f"{k}={v}" for k, v in DEFAULT_MIX.items()) + ")")
+    run.add_argument("--seed", type=int, default=42, help="Random seed for scenario choices")
+    run.add_argument("--catalog-pages", type=int, default=10, help="Pages of 50 products scenarios pick from")
+    run.add_argument("--timeout", type=float, default=30, help="Per-request timeout in seconds")
+    run.add_argument("--base-url", help="Drive a running server instead of the app in process")
+    run.add_argument("--uvicorn", action="store_true", help="Start uvicorn and drive it over HTTP")
+    run.add_argument("--port", type=int, default=int(os.environ.get("LOADTEST_PORT", "8011")), help="Port for --uvicorn")
+    run.add_argument("--workers", type=int, default=1, help="uvicorn worker processes for --uvicorn")
+    run.add_argument("--output", help="Write results to this JSON file")
+
+    diff = commands.add_parser("diff", help="Compare two saved runs")
+    diff.add_argument("baseline", help="Earlier results JSON")
+    diff.add_argument("candidate", help="Later results JSON")
+    diff.add_argument("--threshold", type=float, default=10, help="Percent change counted as a regression")
+
+    args = parser.parse_args()
+
+    if args.command == "run":
+        result = asyncio.run(run_load(args))
+        print_report(result)
+        if args.output:
+            Path(args.output).write_text(json.dumps(result, indent=2))
+            print(f"✅ Results saved to {args.output}")
+    else:
+        old = json.loads(Path(args.baseline).read_text())
+        new = json.loads(Path(args.candidate).read_text())
+        sys.exit(1 if diff_baselines(old, new, args.threshold) else 0)
+
+if __name__ == "__main__":
+    main()
@@ -7,7 +7,9 @@ class Database:
     @classmethod
     def get_client(cls) -> AsyncIOMotorClient:
         if cls.client is None:
-            cls.client = AsyncIOMotorClient(settings.MONGO_URL)
+            # Imported here: utils imports this module
+            from utils.db_monitoring import command_monitor
+            cls.client = AsyncIOMotorClient(settings.MONGO_URL, event_listeners=[command_monitor])
         return cls.client
     
     @classmethod
@@ -35,4 +37,11 @@ COLLECTIONS = {
     'wishlists': 'wishlists',
     'inventory': 'inventory',
     'payments': 'payments',
+    'stock_movements': 'stock_movements',
+    'email_outbox': 'email_outbox',
+    'related_products': 'related_products',
+    'related_product_edits': 'related_product_edits',
+    'co_purchases': 'co_purchases',
+    'co_purchase_pairs': 'co_purchase_pairs',
+    'leases': 'leases',
 }
@@ -0,0 +1,188 @@
+"""
+Declarative index registry for every collection in COLLECTIONS.
+
+Indexes are declared once here and applied idempotently by `ensure_indexes`,
+which runs from the FastAPI lifespan handler and from `scripts/manage_indexes.py`.
+Every index carries an explicit name so the startup report can diff the
+registry against what actually exists in MongoDB.
+"""
+from typing import Dict, List
+import logging
+from pymongo import IndexModel, ASCENDING, DESCENDING
+from pymongo.errors import OperationFailure
+from config.database import COLLECTIONS
+
+logger = logging.getLogger(__name__)
+
+# Product listing sort orders. `ProductService.get_products` sorts with these
+# and the products indexes below are derived from them, so the two cannot drift.
+# Every order ends on `id` so rows are totally ordered for cursor pagination.
+PRODUCT_SORT_OPTIONS = {
+    "default": [("created_at", DESCENDING), ("id", DESCENDING)],
+    "price_asc": [("price", ASCENDING), ("id", ASCENDING)],
+    "price_desc": [("price", DESCENDING), ("id", DESCENDING)],
+    "rating": [("rating", DESCENDING), ("id", DESCENDING)],
+    "newest": [("created_at", DESCENDING), ("id", DESCENDING)],
+    "name_asc": [("name", ASCENDING), ("id", ASCENDING)],
+    "name_desc": [("name", DESCENDING), ("id", DESCENDING)],
+}
+
+def _index_name(keys: List[tuple]) -> str:
+    return "_".join(f"{field}_{direction}" for field, direction in keys)
+
+def _product_sort_indexes() -> List[IndexModel]:
+    """One `is_active` + sort key index per distinct sort option.
+
+    MongoDB walks an index in either direction, so sorts that are exact
+    mirrors of each other (price_asc / price_desc) share one index.
+    """
+    indexes = {}
+    for sort in PRODUCT_SORT_OPTIONS.values():
+        if sort[0][1] == DESCENDING:
+            sort = [(field, -direction) for field, direction in sort]
+        keys = [("is_active", ASCENDING)] + list(sort)
+        indexes[_index_name(keys)] = IndexModel(keys, name=_index_name(keys))
+    return list(indexes.values())
+
+def _unique(field: str, partial: bool = False) -> IndexModel:
+    """Unique index on a lookup key. Partial indexes skip null/missing values."""
+    options = {"name": f"{field}_unique", "unique": True}
+    if partial:
+        options["partialFilterExpression"] = {field: {"$type": "string"}}
+    return IndexModel([(field, ASCENDING)], **options)
+
+def _index(*keys: tuple) -> IndexModel:
+    return IndexModel(list(keys), name=_index_name(keys))
+
+INDEXES: Dict[str, List[IndexModel]] = {
+    COLLECTIONS['users']: [
+        _unique("id"),
+        _unique("phone"),
+        _unique("email", partial=True),
+    ],
+    COLLECTIONS['products']: [
+        _unique("id"),
+        _unique("sku", partial=True),
+        _index(("is_active", ASCENDING), ("category_id", ASCENDING), ("created_at", DESCENDING)),
+        _index(("is_active", ASCENDING), ("brand", ASCENDING)),
+        *_product_sort_indexes(),
+    ],
+    COLLECTIONS['categories']: [
+        _unique("id"),
+        _index(("parent_id", ASCENDING)),
+        _index(("slug", ASCENDING)),
+    ],
+    COLLECTIONS['carts']: [
+        _unique("user_id"),
+    ],
+    COLLECTIONS['wishlists']: [
+        _unique("user_id"),
+    ],
+    COLLECTIONS['orders']: [
+        _unique("id"),
+        _unique("order_number"),
+        _index(("user_id", ASCENDING), ("created_at", DESCENDING)),
+        _index(("user_id", ASCENDING), ("status", ASCENDING), ("created_at", DESCENDING)),
+        # Expiring unpaid orders
+        _index(("status", ASCENDING), ("created_at", ASCENDING)),
+    ],
+    COLLECTIONS['reviews']: [
+        _unique("id"),
+        IndexModel(
+            [("product_id", ASCENDING), ("user_id", ASCENDING)],
+            name="product_id_user_id_unique",
+            unique=True,
+        ),
+        _index(("product_id", ASCENDING), ("created_at", DESCENDING)),
+        _index(("product_id", ASCENDING), ("helpful_count", DESCENDING), ("created_at", DESCENDING)),
+    ],
+    COLLECTIONS['inventory']: [
+        _unique("id"),
+        _unique("product_id"),
+    ],
+    COLLECTIONS['payments']: [
+        _unique("id"),
+        _unique("razorpay_order_id", partial=True),
+        _index(("order_id", ASCENDING)),
+        _index(("user_id", ASCENDING)),
+    ],
+    COLLECTIONS['stock_movements']: [
+        _index(("product_id", ASCENDING), ("created_at", DESCENDING)),
+        _index(("reference_id", ASCENDING)),
+    ],
+    COLLECTIONS['email_outbox']: [
+        _unique("id"),
+        _index(("status", ASCENDING), ("next_attempt_at", ASCENDING)),
+        _index(("claim_id", ASCENDING)),
+    ],
+    COLLECTIONS['related_products']: [
+        _unique("product_id"),
+        _index(("build_id", ASCENDING)),
+    ],
+    COLLECTIONS['related_product_edits']: [
+        _unique("product_id"),
+        _index(("queued_at", ASCENDING)),
+    ],
+    COLLECTIONS['co_purchases']: [
+        _unique("product_id"),
+        _index(("build_id", ASCENDING)),
+    ],
+    COLLECTIONS['co_purchase_pairs']: [
+        IndexModel(
+            [("product_id", ASCENDING), ("other_id", ASCENDING)],
+            name="product_id_other_id_unique",
+            unique=True,
+        ),
+        _index(("product_id", ASCENDING), ("count", DESCENDING)),
+        _index(("build_id", ASCENDING)),
+    ],
+}
+
+async def get_index_report(db) -> Dict[str, Dict[str, List[str]]]:
+    """Compare the registry against the indexes that exist in the database.
+
+    Returns `{collection: {"missing": [...], "extra": [...]}}` for every
+    collection that differs from the registry.
+    """
+    report = {}
+    for collection_name, indexes in INDEXES.items():
+        expected = {index.document["name"] for index in indexes}
+        existing = set()
+        async for index in db[collection_name].list_indexes():
+            if index["name"] != "_id_":
+                existing.add(index["name"])
+
+        missing = sorted(expected - existing)
+        extra = sorted(existing - expected)
+        if missing or extra:
+            report[collection_name] = {"missing": missing, "extra": extra}
+
+    return report
+
+async def ensure_indexes(db) -> Dict[str, Dict[str, List[str]]]:
+    """Create every registered index and return the resulting report.
+
+    Index builds are idempotent. A failing index (e.g. duplicate values
+    blocking a unique index) is logged and shows up as missing in the report
+    instead of aborting startup.
+    """
+    for collection_name, indexes in INDEXES.items():
+        for index in indexes:
+            try:
+                await db[collection_name].create_indexes([index])
+            except OperationFailure as e:
+                logger.error(f"Failed to create index {index.document['name']} on {collection_name}: {e}")
+
+    return await get_index_report(db)
+
+def log_index_report(report: Dict[str, Dict[str, List[str]]]):
+    """Log a startup summary of missing or extra indexes"""
+    if not report:
+        logger.info("All registered indexes are present")
+        return
+
+    for collection_name, diff in report.items():
+        if diff["missing"]:
+            logger.warning(f"Missing indexes on {collection_name}: {', '.join(diff['missing'])}")
+        if diff["extra"]:
+            logger.info(f"Unregistered indexes on {collection_name}: {', '.join(diff['extra'])}")
@@ -9,12 +9,16 @@ class Settings:
     # MongoDB
     MONGO_URL: str = os.environ.get('MONGO_URL', 'mongodb://localhost:27017')
     DB_NAME: str = os.environ.get('DB_NAME', 'polluxkart')
+    ENSURE_INDEXES_ON_STARTUP: bool = os.environ.get('ENSURE_INDEXES_ON_STARTUP', 'true').lower() == 'true'
     
     # JWT
     JWT_SECRET: str = os.environ.get('JWT_SECRET', 'your-super-secret-jwt-key-change-in-production')
     JWT_ALGORITHM: str = 'HS256'
     JWT_EXPIRATION_HOURS: int = 24
     
+    # Password hashing (bcrypt runs on this many threads, off the event loop)
+    PASSWORD_HASH_WORKERS: int = int(os.environ.get('PASSWORD_HASH_WORKERS', '4'))
+    
     # Razorpay
     RAZORPAY_KEY_ID: str = os.environ.get('RAZORPAY_KEY_ID', '')
     RAZORPAY_KEY_SECRET: str = os.environ.get('RAZORPAY_KEY_SECRET', '')
@@ -26,6 +30,64 @@ class Settings:
     SMTP_USER: str = os.environ.get('SMTP_USER', '')
     SMTP_PASSWORD: str = os.environ.get('SMTP_PASSWORD', '')
     EMAIL_FROM: str = os.environ.get('EMAIL_FROM', 'noreply@polluxkart.com')
+    SMTP_STARTTLS: bool = os.environ.get('SMTP_STARTTLS', 'true').lower() == 'true'
+    SMTP_AUTH: bool = os.environ.get('SMTP_AUTH', 'true').lower() == 'true'  # false for a local test server
+    SMTP_TIMEOUT_SECONDS: float = float(os.environ.get('SMTP_TIMEOUT_SECONDS', '30'))
+    SMTP_IDLE_SECONDS: float = float(os.environ.get('SMTP_IDLE_SECONDS', '60'))  # close idle connections after
+    
+    # Email outbox (messages are queued in MongoDB and sent by background workers)
+    EMAIL_WORKERS: int = int(os.environ.get('EMAIL_WORKERS', '2'))  # 0 disables sending from this process
+    EMAIL_BATCH_SIZE: int = int(os.environ.get('EMAIL_BATCH_SIZE', '20'))
+    EMAIL_MAX_ATTEMPTS: int = int(os.environ.get('EMAIL_MAX_ATTEMPTS', '5'))
+    EMAIL_RETRY_BASE_SECONDS: float = float(os.environ.get('EMAIL_RETRY_BASE_SECONDS', '30'))
+    EMAIL_RETRY_MAX_SECONDS: float = float(os.environ.get('EMAIL_RETRY_MAX_SECONDS', '3600'))
+    EMAIL_POLL_SECONDS: float = float(os.environ.get('EMAIL_POLL_SECONDS', '5'))
+    EMAIL_CLAIM_TIMEOUT_SECONDS: float = float(os.environ.get('EMAIL_CLAIM_TIMEOUT_SECONDS', '300'))
+    
+    # MongoDB command monitoring
+    SLOW_QUERY_MS: float = float(os.environ.get('SLOW_QUERY_MS', '100'))  # log commands at least this slow; 0 disables
+    DB_STATS_HEADERS: bool = os.environ.get('DB_STATS_HEADERS', 'false').lower() == 'true'  # X-DB-Round-Trips, X-DB-Time-Ms; for test servers
+    
+    # Unpaid orders (other than cash on delivery) are cancelled and their stock released after this long
+    PENDING_ORDER_EXPIRY_MINUTES: int = int(os.environ.get('PENDING_ORDER_EXPIRY_MINUTES', '30'))
+    PENDING_ORDER_SWEEP_SECONDS: int = int(os.environ.get('PENDING_ORDER_SWEEP_SECONDS', '300'))  # 0 disables
+    
+    # Search
+    SEARCH_CANDIDATE_BATCH_SIZE: int = int(os.environ.get('SEARCH_CANDIDATE_BATCH_SIZE', '1000'))  # Search hits checked against the other filters per query
+    SEARCH_INDEX_REFRESH_SECONDS: int = int(os.environ.get('SEARCH_INDEX_REFRESH_SECONDS', '300'))  # 0 only builds at startup
+    AUTOCOMPLETE_MAX_SUGGESTIONS: int = int(os.environ.get('AUTOCOMPLETE_MAX_SUGGESTIONS', '10'))  # Per suggestion type
+    
+    # Bulk product import
+    PRODUCT_IMPORT_BATCH_SIZE: int = int(os.environ.get('PRODUCT_IMPORT_BATCH_SIZE', '1000'))  # Rows per validation and write batch
+    PRODUCT_IMPORT_MAX_ERRORS: int = int(os.environ.get('PRODUCT_IMPORT_MAX_ERRORS', '1000'))  # Row errors returned per import
+    
+    # Catalog cache (TTLs in seconds)
+    CATALOG_CACHE_MAX_ENTRIES: int = int(os.environ.get('CATALOG_CACHE_MAX_ENTRIES', '10000'))
+    CATALOG_CACHE_MAX_BYTES: int = int(os.environ.get('CATALOG_CACHE_MAX_BYTES', str(64 * 1024 * 1024)))
+    CATALOG_CACHE_PRODUCT_TTL: float = float(os.environ.get('CATALOG_CACHE_PRODUCT_TTL', '60'))
+    CATALOG_CACHE_CATEGORY_TTL: float = float(os.environ.get('CATALOG_CACHE_CATEGORY_TTL', '300'))
+    CATALOG_CACHE_BRANDS_TTL: float = float(os.environ.get('CATALOG_CACHE_BRANDS_TTL', '300'))
+    CATALOG_CACHE_DETAIL_TTL: float = float(os.environ.get('CATALOG_CACHE_DETAIL_TTL', '15'))  # includes live stock
+    
+    # Wishlist membership cache (per-user sets of product IDs)
+    WISHLIST_CACHE_MAX_ENTRIES: int = int(os.environ.get('WISHLIST_CACHE_MAX_ENTRIES', '50000'))
+    WISHLIST_CACHE_MAX_BYTES: int = int(os.environ.get('WISHLIST_CACHE_MAX_BYTES', str(32 * 1024 * 1024)))
+    WISHLIST_CACHE_TTL: float = float(os.environ.get('WISHLIST_CACHE_TTL', '30'))
+    WISHLIST_CHECK_MAX_IDS: int = int(os.environ.get('WISHLIST_CHECK_MAX_IDS', '100'))
+    
+    # Related products (TF-IDF), built by scripts/build_related_products.py. One API process at a
+    # time loads them and applies product edits every poll interval (0 leaves edits to the next
+    # build); a positive refresh interval also rebuilds them at startup and then periodically
+    RELATED_PRODUCTS_K: int = int(os.environ.get('RELATED_PRODUCTS_K', '10'))
+    RELATED_PRODUCTS_EDIT_POLL_SECONDS: int = int(os.environ.get('RELATED_PRODUCTS_EDIT_POLL_SECONDS', '10'))
+    RELATED_PRODUCTS_REFRESH_SECONDS: int = int(os.environ.get('RELATED_PRODUCTS_REFRESH_SECONDS', '0'))
+    
+    # Frequently bought together (co-purchase lift), built by scripts/build_co_purchases.py. A positive
+    # refresh interval also rebuilds at startup and then periodically, in one API process at a time
+    CO_PURCHASE_TOP_N: int = int(os.environ.get('CO_PURCHASE_TOP_N', '10'))
+    CO_PURCHASE_MIN_SUPPORT: int = int(os.environ.get('CO_PURCHASE_MIN_SUPPORT', '2'))  # orders with both products
+    CO_PURCHASE_RANK_CANDIDATES: int = int(os.environ.get('CO_PURCHASE_RANK_CANDIDATES', '200'))  # per product, per order
+    CO_PURCHASE_REFRESH_SECONDS: int = int(os.environ.get('CO_PURCHASE_REFRESH_SECONDS', '0'))
     
     # CORS
     CORS_ORIGINS: str = os.environ.get('CORS_ORIGINS', '*')
@@ -6,11 +6,14 @@ from models.user import (
 from models.product import (
     CategoryBase, CategoryCreate, CategoryResponse, CategoryWithSubs, SubCategory,
     ProductBase, ProductCreate, ProductUpdate, ProductResponse, ProductListResponse,
-    ReviewBase, ReviewCreate, ReviewResponse, ProductWithReviews
+    BrandFacet, CategoryFacet, PriceRangeFacet, ProductFacets,
+    AutocompleteSuggestion, AutocompleteResponse, ProductImportError, ProductImportResponse,
+    ReviewBase, ReviewCreate, ReviewResponse, ReviewSummary, ProductWithReviews
 )
 from models.cart import (
     CartItem, CartItemAdd, CartItemUpdate, CartResponse,
-    WishlistItem, WishlistResponse, WishlistItemAdd
+    WishlistItem, WishlistResponse, WishlistItemAdd,
+    WishlistCheckRequest, WishlistCheckResponse
 )
 from models.order import (
     OrderStatus, PaymentStatus, PaymentMethod,
@@ -30,10 +33,13 @@ __all__ = [
     # Product
     'CategoryBase', 'CategoryCreate', 'CategoryResponse', 'CategoryWithSubs', 'SubCategory',
     'ProductBase', 'ProductCreate', 'ProductUpdate', 'ProductResponse', 'ProductListResponse',
-    'ReviewBase', 'ReviewCreate', 'ReviewResponse', 'ProductWithReviews',
+    'BrandFacet', 'CategoryFacet', 'PriceRangeFacet', 'ProductFacets',
+    'AutocompleteSuggestion', 'AutocompleteResponse', 'ProductImportError', 'ProductImportResponse',
+    'ReviewBase', 'ReviewCreate', 'ReviewResponse', 'ReviewSummary', 'ProductWithReviews',
     # Cart
     'CartItem', 'CartItemAdd', 'CartItemUpdate', 'CartResponse',
     'WishlistItem', 'WishlistResponse', 'WishlistItemAdd',
+    'WishlistCheckRequest', 'WishlistCheckResponse',
     # Order
     'OrderStatus', 'PaymentStatus', 'PaymentMethod',
     'Address', 'AddressCreate', 'OrderItem',
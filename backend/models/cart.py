@@ -1,7 +1,8 @@
 from pydantic import BaseModel, Field, ConfigDict
-from typing import Optional, List
+from typing import Optional, List, Dict
 from datetime import datetime, timezone
 import uuid
+from config.settings import settings
 
 def generate_uuid():
     return str(uuid.uuid4())
@@ -53,3 +54,9 @@ class WishlistResponse(BaseModel):
 
 class WishlistItemAdd(BaseModel):
     product_id: str
+
+class WishlistCheckRequest(BaseModel):
+    product_ids: List[str] = Field(min_length=1, max_length=settings.WISHLIST_CHECK_MAX_IDS)
+
+class WishlistCheckResponse(BaseModel):
+    in_wishlist: Dict[str, bool]
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field, ConfigDict
-from typing import Optional, List
+from typing import Optional, List, Dict
 from datetime import datetime, timezone
 import uuid
 
@@ -80,16 +80,64 @@ class ProductResponse(BaseModel):
     in_stock: bool = True
     rating: float = 0.0
     review_count: int = 0
+    rating_histogram: Dict[str, int] = {}  # Review count per star, "1" to "5"
+    verified_review_count: int = 0
+    top_review_ids: List[str] = []  # Most helpful reviews first
     is_active: bool = True
     created_at: datetime = Field(default_factory=current_time)
     updated_at: datetime = Field(default_factory=current_time)
 
+class BrandFacet(BaseModel):
+    brand: str
+    count: int
+
+class CategoryFacet(BaseModel):
+    id: str
+    name: Optional[str] = None
+    count: int
+
+class PriceRangeFacet(BaseModel):
+    min: float
+    max: Optional[float] = None  # None for the open-ended top bucket
+    count: int
+
+class ProductFacets(BaseModel):
+    brands: List[BrandFacet] = []
+    categories: List[CategoryFacet] = []
+    price_ranges: List[PriceRangeFacet] = []
+    in_stock: int = 0
+    out_of_stock: int = 0
+
 class ProductListResponse(BaseModel):
     products: List[ProductResponse]
-    total: int
-    page: int
+    total: Optional[int] = None  # None when include_total=false
+    page: Optional[int] = None  # None in cursor mode
     page_size: int
-    total_pages: int
+    total_pages: Optional[int] = None
+    next_cursor: Optional[str] = None  # Set in cursor mode while more pages remain
+    facets: Optional[ProductFacets] = None  # Set when facets=true
+
+class AutocompleteSuggestion(BaseModel):
+    text: str
+    id: Optional[str] = None  # Product or category ID; None for brands
+
+class AutocompleteResponse(BaseModel):
+    query: str
+    products: List[AutocompleteSuggestion] = []
+    brands: List[AutocompleteSuggestion] = []
+    categories: List[AutocompleteSuggestion] = []
+
+class ProductImportError(BaseModel):
+    row: int  # 1-based data row; the CSV header is not counted
+    sku: Optional[str] = None
+    error: str
+
+class ProductImportResponse(BaseModel):
+    received: int  # Data rows read
+    imported: int  # Products created (or that would be, on a dry run)
+    failed: int
+    errors: List[ProductImportError] = []  # First PRODUCT_IMPORT_MAX_ERRORS failures, in row order
+    dry_run: bool = False
 
 # Review Models
 class ReviewBase(BaseModel):
@@ -112,5 +160,17 @@ class ReviewResponse(ReviewBase):
     helpful_count: int = 0
     verified_purchase: bool = False
 
+class ReviewSummary(BaseModel):
+    product_id: str
+    review_count: int
+    average_rating: float
+    rating_histogram: Dict[str, int]
+    verified_review_count: int
+    verified_share: float  # Fraction of reviews from verified purchases
+    top_review_ids: List[str]
+
 class ProductWithReviews(ProductResponse):
-    reviews: List[ReviewResponse] = []
+    reviews: List[ReviewResponse] = []  # First page, newest first
+    review_summary: Optional[ReviewSummary] = None
+    available_stock: Optional[int] = None  # Unreserved inventory
+    related_products: List[ProductResponse] = []
@@ -10,8 +10,7 @@ async def register(user_data: UserCreate):
     """Register a new user"""
     try:
         user = await auth_service.register(user_data)
-        _, token = await auth_service.login(user_data.phone, user_data.password)
-        return TokenResponse(access_token=token, user=user)
+        return TokenResponse(access_token=auth_service.issue_token(user), user=user)
     except ValueError as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
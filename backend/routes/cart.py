@@ -1,6 +1,9 @@
-from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi import APIRouter, HTTPException, status, Depends, Query
 from typing import List
-from models.cart import CartResponse, CartItemAdd, CartItemUpdate, WishlistResponse, WishlistItemAdd
+from models.cart import (
+    CartResponse, CartItemAdd, CartItemUpdate, WishlistResponse, WishlistItemAdd,
+    WishlistCheckRequest, WishlistCheckResponse
+)
 from models.product import ProductResponse
 from services.cart_service import CartService, WishlistService
 from utils.auth import get_current_user
@@ -16,6 +19,14 @@ async def get_cart(current_user: dict = Depends(get_current_user)):
     """Get current user's cart"""
     return await cart_service.get_cart(current_user["user_id"])
 
+@router.get("/cart/recommendations", response_model=List[ProductResponse])
+async def get_cart_recommendations(
+    limit: int = Query(6, ge=1, le=20),
+    current_user: dict = Depends(get_current_user)
+):
+    """Get products frequently bought with the items in the cart"""
+    return await cart_service.get_cart_recommendations(current_user["user_id"], limit)
+
 @router.post("/cart/items", response_model=CartResponse)
 async def add_to_cart(
     item: CartItemAdd,
@@ -99,3 +110,12 @@ async def check_in_wishlist(
     """Check if product is in wishlist"""
     is_in = await wishlist_service.is_in_wishlist(current_user["user_id"], product_id)
     return {"in_wishlist": is_in}
+
+@router.post("/wishlist/check", response_model=WishlistCheckResponse)
+async def check_many_in_wishlist(
+    request: WishlistCheckRequest,
+    current_user: dict = Depends(get_current_user)
+):
+    """Check which of a list of products are in the wishlist (e.g. for a product grid)"""
+    in_wishlist = await wishlist_service.check_wishlist(current_user["user_id"], request.product_ids)
+    return WishlistCheckResponse(in_wishlist=in_wishlist)
@@ -1,11 +1,14 @@
-from fastapi import APIRouter, HTTPException, status, Depends, Query
+from fastapi import APIRouter, HTTPException, status, Depends, Query, Request
 from typing import Optional, List
 from models.product import (
     ProductCreate, ProductUpdate, ProductResponse, ProductListResponse,
     CategoryCreate, CategoryResponse, CategoryWithSubs,
-    ReviewCreate, ReviewResponse
+    ReviewCreate, ReviewResponse, ReviewSummary, ProductWithReviews, AutocompleteResponse,
+    ProductImportResponse
 )
+from config.settings import settings
 from services.product_service import ProductService
+from services.product_import import parse_rows, format_for_content_type
 from utils.auth import get_current_user, get_optional_user
 
 router = APIRouter(prefix="/products", tags=["Products"])
@@ -46,20 +49,29 @@ async def get_products(
     min_price: Optional[float] = Query(None, ge=0),
     max_price: Optional[float] = Query(None, ge=0),
     sort_by: str = Query("default", regex="^(default|price_asc|price_desc|rating|newest|name_asc|name_desc)$"),
-    in_stock_only: bool = False
+    in_stock_only: bool = False,
+    cursor: Optional[str] = Query(None, description="Keyset pagination cursor; pass an empty value for the first page"),
+    include_total: bool = True,
+    facets: bool = Query(False, description="Include brand, category, price and stock counts for the filtered results")
 ):
     """Get products with filtering, sorting, and pagination"""
-    return await product_service.get_products(
-        page=page,
-        page_size=page_size,
-        category_id=category_id,
-        brand=brand,
-        search=search,
-        min_price=min_price,
-        max_price=max_price,
-        sort_by=sort_by,
-        in_stock_only=in_stock_only
-    )
+    try:
+        return await product_service.get_products(
+            page=page,
+            page_size=page_size,
+            category_id=category_id,
+            brand=brand,
+            search=search,
+            min_price=min_price,
+            max_price=max_price,
+            sort_by=sort_by,
+            in_stock_only=in_stock_only,
+            cursor=cursor,
+            include_total=include_total,
+            facets=facets
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
 @router.post("", response_model=ProductResponse, status_code=status.HTTP_201_CREATED)
 async def create_product(
@@ -69,11 +81,39 @@ async def create_product(
     """Create a new product (admin only)"""
     return await product_service.create_product(product_data)
 
+@router.post("/import", response_model=ProductImportResponse)
+async def import_products(
+    request: Request,
+    import_format: Optional[str] = Query(None, alias="format", regex="^(csv|ndjson)$", description="Defaults to the request's Content-Type"),
+    dry_run: bool = Query(False, description="Validate every row without writing anything"),
+    current_user: dict = Depends(get_current_user)
+):
+    """Create products in bulk from a CSV or NDJSON request body (admin only)
+    
+    The body is parsed as it streams in. Rows that fail are listed in the
+    response with their row number; the other rows are imported.
+    """
+    import_format = import_format or format_for_content_type(request.headers.get("content-type"))
+    if import_format is None:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="Send text/csv or application/x-ndjson, or pass format=csv|ndjson"
+        )
+    return await product_service.import_products(parse_rows(request.stream(), import_format), dry_run=dry_run)
+
 @router.get("/brands", response_model=List[str])
 async def get_brands():
     """Get all unique product brands"""
     return await product_service.get_brands()
 
+@router.get("/autocomplete", response_model=AutocompleteResponse)
+async def autocomplete(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(5, ge=1, le=settings.AUTOCOMPLETE_MAX_SUGGESTIONS)
+):
+    """Suggest product names, brands and categories for a partially typed search"""
+    return product_service.autocomplete(q, limit)
+
 @router.get("/{product_id}", response_model=ProductResponse)
 async def get_product(product_id: str):
     """Get product by ID"""
@@ -82,6 +122,19 @@ async def get_product(product_id: str):
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Product not found")
     return product
 
+@router.get("/{product_id}/detail", response_model=ProductWithReviews)
+async def get_product_detail(product_id: str):
+    """Get a product with its reviews, review summary, availability and related products"""
+    product = await product_service.get_product_detail(product_id)
+    if not product:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Product not found")
+    return product
+
+@router.get("/{product_id}/frequently-bought-together", response_model=List[ProductResponse])
+async def get_frequently_bought_together(product_id: str, limit: int = Query(6, ge=1, le=20)):
+    """Get products most often bought in the same order as this product"""
+    return await product_service.get_frequently_bought_together(product_id, limit)
+
 @router.put("/{product_id}", response_model=ProductResponse)
 async def update_product(
     product_id: str,
@@ -115,6 +168,14 @@ async def get_product_reviews(
     """Get reviews for a product"""
     return await product_service.get_product_reviews(product_id, page, page_size)
 
+@router.get("/{product_id}/reviews/summary", response_model=ReviewSummary)
+async def get_review_summary(product_id: str):
+    """Get a product's rating breakdown and most helpful reviews"""
+    summary = await product_service.get_review_summary(product_id)
+    if not summary:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Product not found")
+    return summary
+
 @router.post("/{product_id}/reviews", response_model=ReviewResponse, status_code=status.HTTP_201_CREATED)
 async def add_product_review(
     product_id: str,
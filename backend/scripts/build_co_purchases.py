@@ -0,0 +1,32 @@
+"""
+Co-purchase build script for PolluxKart
+Recounts how often each pair of products was bought in the same paid order and stores
+every product's "frequently bought together" list in the co_purchases collection
+"""
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from config.database import Database
+from services.co_purchase_service import CoPurchaseService
+
+async def build_co_purchases(batch_size: int):
+    print("🛠️ Building frequently bought together...")
+    start = time.perf_counter()
+    
+    count = await CoPurchaseService().rebuild(batch_size=batch_size)
+    await Database.close()
+    
+    if count is None:
+        print("⏭️ Another process is rebuilding co-purchases; try again when it finishes")
+        sys.exit(1)
+    print(f"✅ Counted co-purchases in {count} orders in {time.perf_counter() - start:.1f}s")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recompute frequently bought together from order history")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Orders per read batch and products per bulk write")
+    args = parser.parse_args()
+    asyncio.run(build_co_purchases(args.batch_size))
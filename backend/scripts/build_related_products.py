@@ -0,0 +1,32 @@
+"""
+Related products build script for PolluxKart
+Recomputes the TF-IDF related products list of every active product and stores them
+in the related_products collection, removing lists of products that are gone
+"""
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from config.database import Database
+from services.related_service import RelatedProductsService
+
+async def build_related_products(batch_size: int):
+    print("🛠️ Building related products...")
+    start = time.perf_counter()
+    
+    count = await RelatedProductsService().rebuild(batch_size=batch_size)
+    await Database.close()
+    
+    if count is None:
+        print("⏭️ Another process is rebuilding related products; try again when it finishes")
+        sys.exit(1)
+    print(f"✅ Stored related products for {count} products in {time.perf_counter() - start:.1f}s")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recompute related products for the whole catalog")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Products per read batch and bulk write")
+    args = parser.parse_args()
+    asyncio.run(build_related_products(args.batch_size))
@@ -0,0 +1,704 @@
+"""
+Synthetic dataset generator for PolluxKart
+Loads a large catalog with reviews, users, orders and stock movements for finding scaling limits
+
+Popularity is Zipf-skewed: a few products get most of the reviews, orders and stock
+movements, a few users place most of the orders, and a few brands and leaf categories
+hold most of the catalog. Every document is derived from --seed, --as-of and its
+position, so the same arguments produce the same dataset however the work is split.
+
+Worker processes generate chunks of documents and stream them into MongoDB with
+unordered insert_many batches. Collections are loaded with only their _id index;
+the registered indexes are built once the data is in.
+    python scripts/generate_dataset.py --preset large --workers 8 --drop
+
+Every generated user signs in with their email and the password Dataset@123.
+"""
+import argparse
+import asyncio
+import math
+import multiprocessing
+import os
+import random
+import re
+import sys
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from pymongo import MongoClient, UpdateOne
+from config.database import get_db, Database, COLLECTIONS
+from config.indexes import ensure_indexes
+from config.settings import settings
+from services.cart_service import TAX_RATE
+from services.product_service import RATING_STARS, TOP_REVIEWS
+from models.order import OrderStatus, PaymentStatus, PaymentMethod
+from utils.auth import hash_password
+
+DATASET_PASSWORD = "Dataset@123"
+DATASET_EMAIL_DOMAIN = "dataset.polluxkart.com"
+DATASET_NAMESPACE = uuid.uuid5(uuid.NAMESPACE_DNS, DATASET_EMAIL_DOMAIN)
+
+# Document counts per preset; "large" is the catalog size the team benchmarks against
+PRESETS = {
+    "small": {
+        "products": 5_000, "reviews": 50_000, "users": 10_000, "orders": 100_000, "stock_movements": 20_000,
+        "root_categories": 6, "category_depth": 2, "category_fanout": 4,
+    },
+    "medium": {
+        "products": 50_000, "reviews": 500_000, "users": 100_000, "orders": 1_000_000, "stock_movements": 200_000,
+        "root_categories": 8, "category_depth": 3, "category_fanout": 5,
+    },
+    "large": {
+        "products": 500_000, "reviews": 5_000_000, "users": 1_000_000, "orders": 10_000_000, "stock_movements": 2_000_000,
+        "root_categories": 10, "category_depth": 4, "category_fanout": 5,
+    },
+}
+
+# Top-level categories: name, median price (₹), product nouns, image
+ROOT_CATEGORIES = [
+    ("Electronics", 15000, ["Headphones", "Smart Watch", "Laptop", "Earbuds", "Smart TV", "Speaker", "Tablet", "Camera", "Charger", "Monitor"],
+     "https://images.unsplash.com/photo-1498049794561-7780e7231661?w=500"),
+    ("Fashion", 1500, ["T-Shirt", "Jeans", "Sneakers", "Crossbody Bag", "Jacket", "Dress", "Kurta", "Sunglasses", "Belt", "Hoodie"],
+     "https://images.unsplash.com/photo-1445205170230-053b83016050?w=500"),
+    ("Home & Living", 3000, ["Office Chair", "Desk Lamp", "Bedding Set", "Cushion", "Curtains", "Rug", "Wall Clock", "Bookshelf", "Vase", "Cookware Set"],
+     "https://images.unsplash.com/photo-1484101403633-562f891dc89a?w=500"),
+    ("Grocery", 300, ["Honey", "Green Tea", "Basmati Rice", "Olive Oil", "Coffee Beans", "Almonds", "Granola", "Spice Mix", "Dark Chocolate", "Oats"],
+     "https://images.unsplash.com/photo-1542838132-92c53300491e?w=500"),
+    ("Beauty", 800, ["Face Serum", "Perfume", "Hair Care Set", "Moisturizer", "Lipstick", "Sunscreen", "Face Wash", "Hair Oil", "Body Lotion", "Eye Cream"],
+     "https://images.unsplash.com/photo-1596462502278-27bfdc403348?w=500"),
+    ("Sports", 2000, ["Yoga Mat", "Dumbbell Set", "Fitness Tracker", "Resistance Bands", "Cricket Bat", "Football", "Running Shorts", "Water Bottle", "Skipping Rope", "Gym Bag"],
+     "https://images.unsplash.com/photo-1461896836934-6a36f7c7dc3c?w=500"),
+    ("Books", 400, ["Novel", "Cookbook", "Biography", "Notebook", "Atlas", "Comic", "Poetry Collection", "Study Guide", "Journal", "Planner"],
+     "https://images.unsplash.com/photo-1495446815901-a7297e633e8d?w=500"),
+    ("Toys", 1200, ["Building Blocks", "Puzzle", "Board Game", "Plush Toy", "RC Car", "Doll House", "Art Kit", "Train Set", "Kite", "Science Kit"],
+     "https://images.unsplash.com/photo-1558060370-d644479cb6f7?w=500"),
+    ("Automotive", 2500, ["Car Vacuum", "Dash Cam", "Seat Cover", "Tyre Inflator", "Phone Mount", "Car Perfume", "Helmet", "Wiper Blades", "Jump Starter", "Floor Mats"],
+     "https://images.unsplash.com/photo-1492144534655-ae79c964c9d7?w=500"),
+    ("Garden", 1000, ["Planter", "Garden Hose", "Pruning Shears", "Seed Kit", "Watering Can", "Bird Feeder", "Compost Bin", "Garden Gloves", "Plant Stand", "Solar Lights"],
+     "https://images.unsplash.com/photo-1416879595882-3373a0480b5b?w=500"),
+    ("Health", 600, ["Multivitamin", "Protein Powder", "BP Monitor", "Thermometer", "First Aid Kit", "Massager", "Pill Organizer", "Knee Support", "Hand Sanitizer", "Oximeter"],
+     "https://images.unsplash.com/photo-1505751172876-fa1923c5c528?w=500"),
+    ("Pets", 700, ["Dog Food", "Cat Litter", "Pet Bed", "Chew Toy", "Leash", "Scratching Post", "Pet Shampoo", "Feeding Bowl", "Aquarium Filter", "Bird Cage"],
+     "https://images.unsplash.com/photo-1450778869180-41d0601e046e?w=500"),
+]
+
+CATEGORY_WORDS = [
+    "Premium", "Everyday", "Smart", "Kids", "Outdoor", "Travel", "Classic", "Eco", "Compact", "Professional",
+    "Budget", "Luxury", "Festive", "Essential", "Portable", "Vintage", "Modern", "Organic", "Wireless", "Handmade",
+    "Seasonal", "Family", "Studio", "Urban", "Heritage", "Sport", "Home", "Office", "Gift", "Limited",
+]
+PRODUCT_ADJECTIVES = [
+    "Ultra", "Pro", "Lite", "Max", "Classic", "Premium", "Smart", "Deluxe", "Essential", "Advanced",
+    "Compact", "Signature", "Everyday", "Elite", "Prime", "Eco", "Active", "Plus", "Air", "Studio",
+]
+PRODUCT_FEATURES = [
+    "1 Year Warranty", "Free Returns", "Eco-friendly", "Lightweight", "Water Resistant", "Handcrafted",
+    "Made in India", "Premium Materials", "Easy to Clean", "Gift Ready", "Long Lasting", "Compact Design",
+    "Ergonomic", "Energy Efficient", "Travel Friendly", "Hypoallergenic", "BIS Certified", "Multiple Colors",
+]
+BRAND_PREFIXES = [
+    "Sound", "Tech", "Pro", "Urban", "Denim", "Luxe", "Comfort", "Bright", "Dream", "Glow",
+    "Scent", "Zen", "Power", "Fit", "Flex", "Nature", "Vision", "Speed", "Aero", "Nova",
+    "Prime", "Terra", "Aqua", "Eco", "Bold", "Pure", "Swift", "Blue", "Silver", "Sun",
+]
+BRAND_SUFFIXES = [
+    "Max", "Fit", "Book", "Style", "Co", "Life", "Sleep", "Skin", "Lux", "Lift",
+    "Track", "Band", "Bee", "Plus", "Run", "Works", "Labs", "Craft", "Home", "Gear",
+    "Wear", "One", "Line", "Nest", "Kart",
+]
+FIRST_NAMES = [
+    "Aarav", "Vivaan", "Aditya", "Vihaan", "Arjun", "Sai", "Reyansh", "Ayaan", "Krishna", "Ishaan",
+    "Ananya", "Diya", "Aadhya", "Saanvi", "Pari", "Anika", "Navya", "Myra", "Sara", "Ira",
+    "Rohan", "Kabir", "Meera", "Priya", "Neha", "Rahul", "Sneha", "Vikram", "Pooja", "Karan",
+]
+LAST_NAMES = [
+    "Sharma", "Verma", "Patel", "Reddy", "Iyer", "Nair", "Gupta", "Singh", "Kumar", "Das",
+    "Mehta", "Joshi", "Rao", "Menon", "Chopra", "Bose", "Kapoor", "Malhotra", "Pillai", "Banerjee",
+]
+CITIES = [
+    ("Mumbai", "Maharashtra", "400"), ("Delhi", "Delhi", "110"), ("Bengaluru", "Karnataka", "560"),
+    ("Hyderabad", "Telangana", "500"), ("Chennai", "Tamil Nadu", "600"), ("Kolkata", "West Bengal", "700"),
+    ("Pune", "Maharashtra", "411"), ("Ahmedabad", "Gujarat", "380"), ("Jaipur", "Rajasthan", "302"),
+    ("Lucknow", "Uttar Pradesh", "226"), ("Kochi", "Kerala", "682"), ("Chandigarh", "Chandigarh", "160"),
+]
+REVIEW_TITLES = {
+    1: ["Very disappointed", "Not worth it", "Stopped working"],
+    2: ["Below expectations", "Could be better", "Average at best"],
+    3: ["Okay for the price", "Decent", "Does the job"],
+    4: ["Really good", "Happy with it", "Good value"],
+    5: ["Excellent!", "Love it", "Highly recommend"],
+}
+
+# Share of reviews from buyers; not cross-checked against the generated orders
+VERIFIED_REVIEW_SHARE = 0.7
+OUT_OF_STOCK_SHARE = 0.08
+INACTIVE_PRODUCT_SHARE = 0.02
+# Orders older than this have finished: delivered, cancelled or refunded
+ORDER_SETTLED_DAYS = 10
+# Where the history ends unless --as-of is given; fixed so reruns match
+DEFAULT_AS_OF = "2025-01-01"
+
+# Users or orders per worker task. Each orders chunk draws from its own random
+# stream, so changing this changes the generated orders.
+CHUNK_SIZE = 5000
+
+def entity_id(seed: int, kind: str, index: int) -> str:
+    """Stable UUID of the index-th document of a kind"""
+    return str(uuid.uuid5(DATASET_NAMESPACE, f"{seed}:{kind}:{index}"))
+
+def base36(value: int, width: int) -> str:
+    digits = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+    chars = []
+    for _ in range(width):
+        value, digit = divmod(value, 36)
+        chars.append(digits[digit])
+    return "".join(reversed(chars))
+
+class Zipf:
+    """Ranks 0..n-1 drawn with probability roughly proportional to 1 / (rank + 1) ** skew
+
+    Uses the continuous approximation, so sampling is O(1) with no per-rank table.
+    Skew 0 is uniform.
+    """
+    def __init__(self, n: int, skew: float):
+        self.n = n
+        self.skew = skew
+        self._total = self._mass_below(n + 1)
+
+    def _mass_below(self, x: float) -> float:
+        if self.skew == 1:
+            return math.log(x)
+        return (x ** (1 - self.skew) - 1) / (1 - self.skew)
+
+    def share(self, rank: int) -> float:
+        """Probability of drawing rank"""
+        return (self._mass_below(rank + 2) - self._mass_below(rank + 1)) / self._total
+
+    def sample(self, rng: random.Random) -> int:
+        y = rng.random() * self._total
+        x = math.exp(y) if self.skew == 1 else (1 + y * (1 - self.skew)) ** (1 / (1 - self.skew))
+        return min(int(x) - 1, self.n - 1)
+
+    def allocate(self, total: int, rank: int, rng: random.Random) -> int:
+        """Rank's share of total, rounded up or down at random so the shares sum to about total"""
+        expected = total * self.share(rank)
+        whole = int(expected)
+        return whole + (1 if rng.random() < expected - whole else 0)
+
+class BatchWriter:
+    """Buffers documents for one collection and writes them with unordered insert_many batches"""
+
+    def __init__(self, collection, batch_size: int):
+        self.collection = collection
+        self.batch_size = batch_size
+        self.buffer = []
+        self.written = 0
+
+    def add(self, document: dict):
+        self.buffer.append(document)
+        if len(self.buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if self.buffer:
+            self.collection.insert_many(self.buffer, ordered=False)
+            self.written += len(self.buffer)
+            self.buffer = []
+
+class Dataset:
+    """Deterministic documents of one generated dataset"""
+
+    def __init__(self, spec: dict):
+        self.spec = spec
+        self.seed = spec["seed"]
+        self.as_of = datetime.fromisoformat(spec["as_of"])
+        self.history = timedelta(days=spec["history_days"])
+        self.categories = self._category_tree()
+        leaves = [category for category in self.categories if category["depth"] == spec["category_depth"]]
+        # Shuffled so the popular leaves are spread over the tree
+        random.Random(f"{self.seed}:leaves").shuffle(leaves)
+        self.leaves = leaves
+        self.brands = self._brand_names(spec["brands"])
+        self.product_popularity = Zipf(spec["products"], spec["skew"])
+        self.user_activity = Zipf(spec["users"], spec["skew"])
+        self.leaf_popularity = Zipf(len(leaves), spec["skew"])
+        self.brand_popularity = Zipf(len(self.brands), spec["skew"])
+        # Order lines mostly name popular products, so their summaries are cached
+        self.product_summary = lru_cache(maxsize=100_000)(self._product_summary)
+
+    def _category_tree(self) -> list:
+        rng = random.Random(f"{self.seed}:categories")
+        created_at = (self.as_of - self.history).isoformat()
+        categories = []
+        level = []
+        for i in range(self.spec["root_categories"]):
+            name, median_price, nouns, image = ROOT_CATEGORIES[i % len(ROOT_CATEGORIES)]
+            if i >= len(ROOT_CATEGORIES):
+                name = f"{name} {i // len(ROOT_CATEGORIES) + 1}"
+            level.append({"name": name, "parent_id": None, "root": i % len(ROOT_CATEGORIES), "image": image})
+        for depth in range(self.spec["category_depth"] + 1):
+            next_level = []
+            for node in level:
+                category_id = entity_id(self.seed, "category", len(categories))
+                root_name = ROOT_CATEGORIES[node["root"]][0]
+                categories.append({
+                    "id": category_id,
+                    "name": node["name"],
+                    "description": f"{node['name']} from top brands",
+                    "image": node["image"],
+                    "parent_id": node["parent_id"],
+                    "slug": re.sub(r'[^a-z0-9]+', '-', node["name"].lower()).strip('-'),
+                    "product_count": 0,
+                    "created_at": created_at,
+                    "depth": depth,
+                    "root": node["root"],
+                })
+                if depth < self.spec["category_depth"]:
+                    for word in rng.sample(CATEGORY_WORDS, self.spec["category_fanout"]):
+                        next_level.append({
+                            "name": f"{word} {root_name}", "parent_id": category_id,
+                            "root": node["root"], "image": node["image"],
+                        })
+            level = next_level
+        return categories
+
+    def _brand_names(self, count: int) -> list:
+        names = [f"{prefix}{suffix}" for prefix in BRAND_PREFIXES for suffix in BRAND_SUFFIXES]
+        random.Random(f"{self.seed}:brands").shuffle(names)
+        return [
+            names[i % len(names)] if i < len(names) else f"{names[i % len(names)]} {i // len(names) + 1}"
+            for i in range(count)
+        ]
+
+    def category_documents(self) -> list:
+        return [
+            {key: value for key, value in category.items() if key not in ("depth", "root")}
+            for category in self.categories
+        ]
+
+    def _random_time(self, rng: random.Random, start: datetime) -> datetime:
+        return start + (self.as_of - start) * rng.random()
+
+    def _product_base(self, index: int) -> dict:
+        """Catalog fields of a product, before stock and review aggregates"""
+        rng = random.Random(f"{self.seed}:product:{index}")
+        category = self.leaves[self.leaf_popularity.sample(rng)]
+        _, median_price, nouns, image = ROOT_CATEGORIES[category["root"]]
+        brand = self.brands[self.brand_popularity.sample(rng)]
+        noun = rng.choice(nouns)
+        name = f"{brand} {rng.choice(PRODUCT_ADJECTIVES)} {noun} {rng.choice('ABCDEFGHJKLMNPRSTVXZ')}{rng.randint(1, 99)}"
+        price = round(max(rng.lognormvariate(math.log(median_price), 0.8), 10.0), 2)
+        product_id = entity_id(self.seed, "product", index)
+        return {
+            "id": product_id,
+            "name": name,
+            "description": f"{name} by {brand}. A {category['name'].lower()} favourite, built for everyday use.",
+            "price": price,
+            "original_price": round(price * rng.uniform(1.1, 1.6), 2) if rng.random() < 0.6 else None,
+            "category_id": category["id"],
+            "category_name": category["name"],
+            "brand": brand,
+            "sku": f"SKU-{product_id[:8].upper()}",
+            "images": [image],
+            "image": image,
+            "features": rng.sample(PRODUCT_FEATURES, 4),
+            "is_active": rng.random() >= INACTIVE_PRODUCT_SHARE,
+            "created_at": self._random_time(rng, self.as_of - self.history),
+            "quality": rng.uniform(2.5, 4.8),
+        }
+
+    def _product_summary(self, index: int) -> tuple:
+        product = self._product_base(index)
+        return product["id"], product["name"], product["image"], product["price"]
+
+    def user_name(self, index: int) -> str:
+        mixed = (index * 2654435761) % 2 ** 32
+        return f"{FIRST_NAMES[mixed % len(FIRST_NAMES)]} {LAST_NAMES[(mixed // len(FIRST_NAMES)) % len(LAST_NAMES)]}"
+
+    def user(self, index: int, password_hash: str) -> dict:
+        rng = random.Random(f"{self.seed}:user:{index}")
+        user_id = entity_id(self.seed, "user", index)
+        return {
+            "id": user_id,
+            "email": f"user{index}@{DATASET_EMAIL_DOMAIN}",
+            "phone": f"+91{6000000000 + index}",
+            "name": self.user_name(index),
+            "password_hash": password_hash,
+            "avatar": f"https://api.dicebear.com/7.x/avataaars/svg?seed={user_id}",
+            "is_active": True,
+            "created_at": self._random_time(rng, self.as_of - self.history).isoformat(),
+        }
+
+    def _distinct_users(self, count: int, rng: random.Random) -> list:
+        users = self.spec["users"]
+        count = min(count, users)
+        if count > users // 4:
+            return rng.sample(range(users), count)
+        chosen = set()
+        while len(chosen) < count:
+            chosen.add(self.user_activity.sample(rng))
+        return sorted(chosen)
+
+    def reviews(self, index: int, product: dict) -> list:
+        """A product's reviews, count in proportion to its popularity"""
+        rng = random.Random(f"{self.seed}:reviews:{index}")
+        count = self.product_popularity.allocate(self.spec["reviews"], index, rng)
+        reviews = []
+        for user_index in self._distinct_users(count, rng):
+            rating = min(5, max(1, round(rng.gauss(product["quality"], 1.0))))
+            reviews.append({
+                "id": str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+                "product_id": product["id"],
+                "user_id": entity_id(self.seed, "user", user_index),
+                "user_name": self.user_name(user_index),
+                "user_avatar": None,
+                "rating": rating,
+                "title": rng.choice(REVIEW_TITLES[rating]),
+                "comment": f"{rng.choice(REVIEW_TITLES[rating])}. {product['name']} is what I use every day now."
+                           if rating >= 4 else f"{rng.choice(REVIEW_TITLES[rating])}. Expected more from {product['brand']}.",
+                "helpful_count": int(rng.paretovariate(1.5)) - 1,
+                "verified_purchase": rng.random() < VERIFIED_REVIEW_SHARE,
+                "created_at": self._random_time(rng, product["created_at"]).isoformat(),
+            })
+        return reviews
+
+    def stock_movements(self, index: int, product: dict) -> tuple:
+        """A product's stock history and the quantity it ends on"""
+        rng = random.Random(f"{self.seed}:movements:{index}")
+        count = self.product_popularity.allocate(self.spec["stock_movements"], index, rng)
+        quantity = 0 if rng.random() < OUT_OF_STOCK_SHARE and count == 0 else rng.randint(20, 500)
+        times = sorted(self._random_time(rng, product["created_at"]) for _ in range(count))
+        movements = []
+        previous = 0
+        for n, created_at in enumerate(times):
+            if n == 0:
+                change, reason, reference_id = quantity, "Initial stock", None
+            elif previous < 10 or rng.random() < 0.01:
+                change, reason, reference_id = rng.randint(50, 300), "Restocked", None
+            else:
+                change = -min(previous, rng.randint(1, 5))
+                reason = "Order confirmed - stock deducted"
+                reference_id = entity_id(self.seed, "order", rng.randrange(max(self.spec["orders"], 1)))
+            movements.append({
+                "id": str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+                "product_id": product["id"],
+                "quantity_change": change,
+                "previous_quantity": previous,
+                "new_quantity": previous + change,
+                "reason": reason,
+                "reference_id": reference_id,
+                "created_by": None,
+                "created_at": created_at.isoformat(),
+            })
+            previous += change
+        if count and rng.random() < OUT_OF_STOCK_SHARE and previous > 0:
+            movements.append({
+                **movements[-1],
+                "id": str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+                "quantity_change": -previous,
+                "previous_quantity": previous,
+                "new_quantity": 0,
+                "reason": "Order confirmed - stock deducted",
+                "reference_id": entity_id(self.seed, "order", rng.randrange(max(self.spec["orders"], 1))),
+            })
+            previous = 0
+        return movements, previous
+
+    def product(self, base: dict, reviews: list, stock: int) -> dict:
+        """A product document with its stock and review aggregates filled in"""
+        product = {key: value for key, value in base.items() if key != "quality"}
+        product["created_at"] = base["created_at"].isoformat()
+        histogram = {star: 0 for star in RATING_STARS}
+        for review in reviews:
+            histogram[str(review["rating"])] += 1
+        rating_sum = sum(review["rating"] for review in reviews)
+        top_reviews = sorted(reviews, key=lambda review: (review["helpful_count"], review["created_at"]), reverse=True)
+        return {
+            **product,
+            "stock": stock,
+            "in_stock": stock > 0,
+            "rating": round(rating_sum / len(reviews), 1) if reviews else 0.0,
+            "review_count": len(reviews),
+            "rating_sum": rating_sum,
+            "rating_histogram": histogram,
+            "verified_review_count": sum(1 for review in reviews if review["verified_purchase"]),
+            "top_review_ids": [review["id"] for review in top_reviews[:TOP_REVIEWS]],
+            "updated_at": product["created_at"],
+        }
+
+    def address(self, user_index: int, rng: random.Random) -> dict:
+        city, state, pincode_prefix = CITIES[(user_index * 7919) % len(CITIES)]
+        return {
+            "full_name": self.user_name(user_index),
+            "phone": f"+91{6000000000 + user_index}",
+            "address_line1": f"{rng.randint(1, 999)}, {rng.choice(LAST_NAMES)} Nagar",
+            "address_line2": None,
+            "city": city,
+            "state": state,
+            "pincode": f"{pincode_prefix}{rng.randint(0, 999):03d}",
+            "country": "India",
+            "is_default": True,
+        }
+
+    def order(self, index: int, rng: random.Random) -> dict:
+        user_index = self.user_activity.sample(rng)
+        line_count = rng.choices([1, 2, 3, 4, 5], weights=[45, 25, 15, 10, 5])[0]
+        product_indexes = {self.product_popularity.sample(rng) for _ in range(line_count)}
+        items = []
+        for product_index in sorted(product_indexes):
+            product_id, name, image, price = self.product_summary(product_index)
+            quantity = rng.choice([1, 1, 1, 2, 3])
+            items.append({
+                "product_id": product_id, "name": name, "image": image,
+                "price": price, "quantity": quantity, "total": round(price * quantity, 2),
+            })
+        subtotal = round(sum(item["total"] for item in items), 2)
+        tax = round(subtotal * TAX_RATE, 2)
+        shipping_fee = 0.0 if subtotal >= 500 else 50.0
+
+        # Recent orders are more common: the store is growing
+        created_at = self.as_of - self.history * rng.random() ** 2
+        age = self.as_of - created_at
+        if age > timedelta(days=ORDER_SETTLED_DAYS):
+            status = rng.choices(
+                [OrderStatus.DELIVERED, OrderStatus.CANCELLED, OrderStatus.REFUNDED], weights=[88, 7, 5]
+            )[0]
+        else:
+            status = rng.choice([
+                OrderStatus.PENDING, OrderStatus.CONFIRMED, OrderStatus.PROCESSING,
+                OrderStatus.SHIPPED, OrderStatus.OUT_FOR_DELIVERY, OrderStatus.DELIVERED,
+            ])
+        payment_method = rng.choices(
+            [PaymentMethod.RAZORPAY, PaymentMethod.COD, PaymentMethod.WALLET], weights=[70, 25, 5]
+        )[0]
+        if status == OrderStatus.PENDING:
+            payment_status = PaymentStatus.PENDING
+        elif status == OrderStatus.REFUNDED:
+            payment_status = PaymentStatus.REFUNDED
+        elif status == OrderStatus.CANCELLED:
+            payment_status = PaymentStatus.FAILED if payment_method == PaymentMethod.RAZORPAY else PaymentStatus.PENDING
+        elif payment_method == PaymentMethod.COD and status != OrderStatus.DELIVERED:
+            payment_status = PaymentStatus.PENDING
+        else:
+            payment_status = PaymentStatus.COMPLETED
+
+        delivered_at = created_at + timedelta(days=rng.uniform(2, 7)) if status == OrderStatus.DELIVERED else None
+        if delivered_at and delivered_at > self.as_of:
+            delivered_at = self.as_of
+        shipped = status in (OrderStatus.SHIPPED, OrderStatus.OUT_FOR_DELIVERY, OrderStatus.DELIVERED)
+        razorpay = payment_method == PaymentMethod.RAZORPAY
+        code = base36(index * 1_000_003 % 36 ** 6, 6)
+        address = self.address(user_index, rng)
+        return {
+            "id": entity_id(self.seed, "order", index),
+            "order_number": f"PK-{created_at:%Y%m%d}-{code}",
+            "user_id": entity_id(self.seed, "user", user_index),
+            "items": items,
+            "shipping_address": address,
+            "billing_address": None,
+            "subtotal": subtotal,
+            "discount": 0.0,
+            "shipping_fee": shipping_fee,
+            "tax": tax,
+            "total": round(subtotal + tax + shipping_fee, 2),
+            "status": status.value,
+            "payment_status": payment_status.value,
+            "payment_method": payment_method.value,
+            "payment_id": f"pay_{code}{index:08d}" if razorpay and payment_status != PaymentStatus.PENDING else None,
+            "razorpay_order_id": f"order_{code}{index:08d}" if razorpay else None,
+            "notes": None,
+            "tracking_number": f"TRK{index:010d}" if shipped else None,
+            "created_at": created_at.isoformat(),
+            "updated_at": (delivered_at or created_at).isoformat(),
+            "delivered_at": delivered_at.isoformat() if delivered_at else None,
+        }
+
+# Per worker process: the dataset and a database handle
+_worker = {}
+
+def _init_worker(spec: dict):
+    _worker["dataset"] = Dataset(spec)
+    _worker["db"] = MongoClient(spec["mongo_url"])[spec["db_name"]]
+
+def load_chunk(kind: str, chunk: int, chunks: int) -> Counter:
+    """Generate and insert one chunk of a kind, returning documents written per collection"""
+    dataset, db = _worker["dataset"], _worker["db"]
+    spec = dataset.spec
+    batch_size = spec["batch_size"]
+    written = Counter()
+
+    if kind == "products":
+        products = BatchWriter(db[COLLECTIONS['products']], batch_size)
+        inventory = BatchWriter(db[COLLECTIONS['inventory']], batch_size)
+        reviews = BatchWriter(db[COLLECTIONS['reviews']], batch_size)
+        movements = BatchWriter(db[COLLECTIONS['stock_movements']], batch_size)
+        # Strided rather than contiguous, so the most reviewed products are spread over the chunks
+        for index in range(chunk, spec["products"], chunks):
+            base = dataset._product_base(index)
+            product_reviews = dataset.reviews(index, base)
+            product_movements, stock = dataset.stock_movements(index, base)
+            product = dataset.product(base, product_reviews, stock)
+            products.add(product)
+            inventory.add({
+                "id": entity_id(dataset.seed, "inventory", index),
+                "product_id": product["id"],
+                "quantity": stock,
+                "reserved": 0,
+                "low_stock_threshold": 10,
+                "updated_at": product["updated_at"],
+            })
+            for review in product_reviews:
+                reviews.add(review)
+            for movement in product_movements:
+                movements.add(movement)
+        writers = [products, inventory, reviews, movements]
+    elif kind == "users":
+        users = BatchWriter(db[COLLECTIONS['users']], batch_size)
+        for index in range(chunk * CHUNK_SIZE, min((chunk + 1) * CHUNK_SIZE, spec["users"])):
+            users.add(dataset.user(index, spec["password_hash"]))
+        writers = [users]
+    else:
+        orders = BatchWriter(db[COLLECTIONS['orders']], batch_size)
+        rng = random.Random(f"{dataset.seed}:orders:{chunk}")
+        for index in range(chunk * CHUNK_SIZE, min((chunk + 1) * CHUNK_SIZE, spec["orders"])):
+            orders.add(dataset.order(index, rng))
+        writers = [orders]
+
+    for writer in writers:
+        writer.flush()
+        written[writer.collection.name] += writer.written
+    return written
+
+async def generate_dataset(spec: dict, workers: int, drop: bool, build_indexes: bool) -> int:
+    """Load the dataset, returning a process exit code"""
+    db = get_db()
+
+    if drop:
+        print("🗑️ Dropping existing collections...")
+        for collection_name in COLLECTIONS.values():
+            await db[collection_name].drop()
+    else:
+        for collection_name in ("categories", "products", "users", "orders"):
+            if await db[COLLECTIONS[collection_name]].estimated_document_count():
+                print(f"❌ {settings.DB_NAME}.{collection_name} is not empty; pass --drop to replace the data")
+                await Database.close()
+                return 1
+
+    start = time.perf_counter()
+    dataset = Dataset(spec)
+    print(f"📁 Creating {len(dataset.categories)} categories ({len(dataset.leaves)} leaves)...")
+    await db[COLLECTIONS['categories']].insert_many(dataset.category_documents())
+
+    # Products come first: with their reviews and stock movements they are the largest chunks
+    product_chunks = math.ceil(spec["products"] / CHUNK_SIZE * 4)
+    plan = [("products", product_chunks)]
+    plan += [(kind, math.ceil(spec[kind] / CHUNK_SIZE)) for kind in ("users", "orders")]
+    total_chunks = sum(chunks for _, chunks in plan)
+    print(f"📦 Generating {total_chunks} chunks on {workers} worker processes...")
+
+    loop = asyncio.get_running_loop()
+    totals = Counter()
+    # Spawned, not forked: this process already runs Motor's threads
+    pool = ProcessPoolExecutor(
+        max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker, initargs=(spec,)
+    )
+    try:
+        tasks = [
+            loop.run_in_executor(pool, load_chunk, kind, chunk, chunks)
+            for kind, chunks in plan
+            for chunk in range(chunks)
+        ]
+        last_report = time.perf_counter()
+        for done, task in enumerate(asyncio.as_completed(tasks), start=1):
+            totals.update(await task)
+            now = time.perf_counter()
+            if now - last_report >= 5 or done == total_chunks:
+                last_report = now
+                inserted = sum(totals.values())
+                print(f"  ⏳ {done}/{total_chunks} chunks, {inserted:,} documents, {inserted / (now - start):,.0f} docs/s")
+    finally:
+        pool.shutdown(cancel_futures=True)
+
+    # Same as create_product's increment: products directly in the category
+    counts = await db[COLLECTIONS['products']].aggregate([
+        {"$group": {"_id": "$category_id", "count": {"$sum": 1}}}
+    ]).to_list(None)
+    if counts:
+        await db[COLLECTIONS['categories']].bulk_write([
+            UpdateOne({"id": row["_id"]}, {"$set": {"product_count": row["count"]}}) for row in counts
+        ], ordered=False)
+    load_seconds = time.perf_counter() - start
+
+    if build_indexes:
+        print("🛠️ Building indexes...")
+        await ensure_indexes(db)
+    await Database.close()
+
+    print(f"\n✨ Dataset loaded into {settings.DB_NAME} in {time.perf_counter() - start:.1f}s "
+          f"({load_seconds:.1f}s before indexes)")
+    print("\n📊 Summary:")
+    print(f"  - categories: {len(dataset.categories):,}")
+    for collection_name, count in sorted(totals.items()):
+        print(f"  - {collection_name}: {count:,}")
+    print(f"  - Users sign in as user<N>@{DATASET_EMAIL_DOMAIN} / {DATASET_PASSWORD}")
+    print(f"  - Reproduce with --seed {spec['seed']} --as-of {spec['as_of']}")
+    print("  - Then run scripts/build_related_products.py and scripts/build_co_purchases.py")
+    return 0
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--preset", choices=PRESETS, default="small", help="Base document counts")
+    for field in ("products", "reviews", "users", "orders", "stock_movements"):
+        parser.add_argument(f"--{field.replace('_', '-')}", type=int, help=f"Number of {field.replace('_', ' ')} (overrides the preset)")
+    parser.add_argument("--root-categories", type=int, help="Top-level categories (overrides the preset)")
+    parser.add_argument("--category-depth", type=int, help="Levels below the top level; products go in the deepest (overrides the preset)")
+    parser.add_argument("--category-fanout", type=int, help=f"Subcategories per category, at most {len(CATEGORY_WORDS)} (overrides the preset)")
+    parser.add_argument("--brands", type=int, help="Distinct brands (default: one per 100 products, at least 20)")
+    parser.add_argument("--skew", type=float, default=0.9, help="Zipf exponent of product, user, brand and category popularity; 0 is uniform")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed")
+    parser.add_argument("--as-of", default=DEFAULT_AS_OF, help=f"Date the history ends (default: {DEFAULT_AS_OF})")
+    parser.add_argument("--history-days", type=int, default=730, help="Days of history before --as-of")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes generating and inserting")
+    parser.add_argument("--batch-size", type=int, default=2000, help="Documents per insert_many")
+    parser.add_argument("--drop", action="store_true", help="Drop every collection first")
+    parser.add_argument("--skip-indexes", action="store_true", help="Don't build the registered indexes after loading")
+    args = parser.parse_args()
+
+    spec = dict(PRESETS[args.preset])
+    for field in spec:
+        if getattr(args, field) is not None:
+            spec[field] = getattr(args, field)
+    if not 1 <= spec["category_fanout"] <= len(CATEGORY_WORDS):
+        parser.error(f"--category-fanout must be between 1 and {len(CATEGORY_WORDS)}")
+    if spec["products"] < 1 or spec["users"] < 1:
+        parser.error("--products and --users must be at least 1")
+    if args.skew < 0:
+        parser.error("--skew must not be negative")
+
+    as_of = datetime.fromisoformat(args.as_of)
+    if as_of.tzinfo is None:
+        as_of = as_of.replace(tzinfo=timezone.utc)
+
+    print(f"🔐 Hashing the shared password ({DATASET_PASSWORD})...")
+    spec.update(
+        brands=args.brands or max(20, spec["products"] // 100),
+        skew=args.skew,
+        seed=args.seed,
+        as_of=as_of.isoformat(),
+        history_days=args.history_days,
+        batch_size=args.batch_size,
+        password_hash=hash_password(DATASET_PASSWORD),
+        mongo_url=settings.MONGO_URL,
+        db_name=settings.DB_NAME,
+    )
+    sys.exit(asyncio.run(generate_dataset(spec, args.workers, args.drop, not args.skip_indexes)))
+
+if __name__ == "__main__":
+    main()
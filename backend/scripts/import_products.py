@@ -0,0 +1,86 @@
+"""
+Bulk product import script for PolluxKart
+Creates products from a CSV or NDJSON file through the same pipeline as POST /api/products/import
+
+CSV files need a header row. Columns (NDJSON keys): name, price, category_id or category
+(name or slug), and optionally description, original_price, brand, sku, stock, images and
+features; list fields are "|"-separated.
+    python scripts/import_products.py catalog.csv --report errors.ndjson
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from config.database import Database
+from services.product_service import ProductService
+from services.product_import import IMPORT_FORMATS, parse_rows
+
+# File extensions of each import format
+EXTENSIONS = {".csv": "csv", ".ndjson": "ndjson", ".jsonl": "ndjson"}
+
+READ_CHUNK_BYTES = 1024 * 1024
+
+async def read_chunks(path: str):
+    """The file (or stdin for "-") in chunks, read off the event loop"""
+    stream = sys.stdin.buffer if path == "-" else open(path, "rb")
+    try:
+        while True:
+            chunk = await asyncio.to_thread(stream.read, READ_CHUNK_BYTES)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        if stream is not sys.stdin.buffer:
+            stream.close()
+
+async def import_products(path: str, import_format: str, batch_size: int, dry_run: bool, report: str) -> int:
+    """Import the file, returning a process exit code"""
+    print(f"📥 {'Validating' if dry_run else 'Importing'} {path} ({import_format})...")
+    start = time.perf_counter()
+
+    result = await ProductService().import_products(
+        parse_rows(read_chunks(path), import_format),
+        batch_size=batch_size,
+        dry_run=dry_run,
+        # Every failure goes to the report; only the first few are printed
+        max_errors=sys.maxsize if report else 20,
+        # The API's in-memory indexes are its own; it picks the products up on its next refresh
+        refresh_indexes=False
+    )
+    await Database.close()
+    elapsed = time.perf_counter() - start
+
+    for error in result.errors[:20]:
+        print(f"  ❌ Row {error.row}{f' ({error.sku})' if error.sku else ''}: {error.error}")
+    if result.failed > 20:
+        print(f"  ... and {result.failed - 20} more")
+    if report:
+        with open(report, "w") as f:
+            for error in result.errors:
+                f.write(json.dumps(error.model_dump()) + "\n")
+        print(f"📝 Wrote {len(result.errors)} row errors to {report}")
+
+    verb = "Would import" if dry_run else "Imported"
+    print(f"✅ {verb} {result.imported} of {result.received} rows in {elapsed:.1f}s "
+          f"({result.received / elapsed if elapsed else 0:.0f} rows/s), {result.failed} failed")
+    if not dry_run and result.imported:
+        print("  - Run scripts/build_related_products.py to include them in related products now")
+    return 1 if result.failed else 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", help="CSV or NDJSON file, or - for stdin")
+    parser.add_argument("--format", choices=IMPORT_FORMATS, help="Defaults to the file extension")
+    parser.add_argument("--batch-size", type=int, default=None, help="Rows per validation and write batch (default: PRODUCT_IMPORT_BATCH_SIZE)")
+    parser.add_argument("--dry-run", action="store_true", help="Validate every row without writing anything")
+    parser.add_argument("--report", help="Write every row error to this file as NDJSON")
+    args = parser.parse_args()
+
+    import_format = args.format or EXTENSIONS.get(Path(args.path).suffix.lower())
+    if import_format is None:
+        parser.error("Can't tell the format from the file name; pass --format")
+    sys.exit(asyncio.run(import_products(args.path, import_format, args.batch_size, args.dry_run, args.report)))
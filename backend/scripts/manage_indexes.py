@@ -0,0 +1,43 @@
+"""
+Index management script for PolluxKart
+Applies the index registry in config/indexes.py, or only reports drift with --check
+"""
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from config.database import get_db, Database
+from config.indexes import ensure_indexes, get_index_report
+
+async def manage_indexes(check_only: bool) -> int:
+    """Apply or verify indexes, returning a process exit code"""
+    db = get_db()
+    
+    if check_only:
+        print("🔍 Checking indexes...")
+        report = await get_index_report(db)
+    else:
+        print("🛠️ Creating indexes...")
+        report = await ensure_indexes(db)
+    
+    await Database.close()
+    
+    if not report:
+        print("✅ All registered indexes are present")
+        return 0
+    
+    for collection_name, diff in report.items():
+        for name in diff["missing"]:
+            print(f"  ❌ {collection_name}: missing {name}")
+        for name in diff["extra"]:
+            print(f"  ⚠️ {collection_name}: unregistered {name}")
+    
+    return 1 if any(diff["missing"] for diff in report.values()) else 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Create or verify MongoDB indexes")
+    parser.add_argument("--check", action="store_true", help="Only report missing or extra indexes")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(manage_indexes(args.check)))
@@ -0,0 +1,29 @@
+"""
+Rating repair script for PolluxKart
+Recomputes each product's rating, review count, rating sum, star histogram and review
+summary from the reviews collection, fixing drift in the incrementally maintained fields
+"""
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from config.database import Database
+from services.product_service import ProductService
+
+async def repair_ratings(product_ids, batch_size: int):
+    scope = f"{len(product_ids)} products" if product_ids else "all products"
+    print(f"🛠️ Recomputing ratings for {scope}...")
+    
+    updated = await ProductService().recompute_ratings(product_ids, batch_size=batch_size)
+    await Database.close()
+    
+    print(f"✅ Rewrote {updated} products")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recompute product rating aggregates from reviews")
+    parser.add_argument("product_ids", nargs="*", help="Only repair these products")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Products per bulk write")
+    args = parser.parse_args()
+    asyncio.run(repair_ratings(args.product_ids or None, args.batch_size))
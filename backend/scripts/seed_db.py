@@ -4,7 +4,8 @@ Run this to populate the database with sample data
 """
 import asyncio
 import sys
-sys.path.insert(0, '/app/backend')
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
 from config.database import get_db, COLLECTIONS
 from services.product_service import ProductService
@@ -1,10 +1,22 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
+import asyncio
 import logging
 
 from config.settings import settings
-from config.database import Database
+from config.database import Database, COLLECTIONS
+from config.indexes import ensure_indexes, log_index_report
+from services.search_service import search_index
+from services.autocomplete_service import autocomplete_index
+from services.related_service import RelatedProductsService
+from services.co_purchase_service import CoPurchaseService
+from services.order_service import OrderService
+from utils.cache import catalog_cache, wishlist_cache
+from utils.singleflight import read_group
+from utils.auth import password_hasher
+from utils.email import email_outbox, smtp_configured
+from utils.metrics import MetricsMiddleware, render_metrics, CONTENT_TYPE as METRICS_CONTENT_TYPE
 from routes import (
     auth_router, products_router, cart_router, 
     orders_router, payments_router, inventory_router
@@ -30,13 +42,55 @@ async def lifespan(app: FastAPI):
         db = Database.get_db()
         await db.command("ping")
         logger.info("Successfully connected to MongoDB")
+        
+        # Create missing indexes and report drift from the registry
+        if settings.ENSURE_INDEXES_ON_STARTUP:
+            report = await ensure_indexes(db)
+            log_index_report(report)
     except Exception as e:
         logger.error(f"Failed to connect to MongoDB: {e}")
     
+    # Build the product search index in the background (search falls back to regex until ready)
+    background_tasks = []
+    background_tasks.append(asyncio.create_task(search_index.refresh_periodically(
+        Database.get_db()[COLLECTIONS['products']], settings.SEARCH_INDEX_REFRESH_SECONDS
+    )))
+    
+    # Build the typeahead index in the background (autocomplete returns nothing until ready)
+    db = Database.get_db()
+    background_tasks.append(asyncio.create_task(autocomplete_index.refresh_periodically(
+        db[COLLECTIONS['products']], db[COLLECTIONS['categories']], settings.SEARCH_INDEX_REFRESH_SECONDS
+    )))
+    
+    # Keep related products current as products change, and optionally rebuild them (one process at a time)
+    if settings.RELATED_PRODUCTS_EDIT_POLL_SECONDS > 0 or settings.RELATED_PRODUCTS_REFRESH_SECONDS > 0:
+        background_tasks.append(asyncio.create_task(RelatedProductsService().maintain(
+            settings.RELATED_PRODUCTS_EDIT_POLL_SECONDS, settings.RELATED_PRODUCTS_REFRESH_SECONDS
+        )))
+    
+    # Opt-in: rebuild "frequently bought together" from order history, then periodically (one process at a time)
+    if settings.CO_PURCHASE_REFRESH_SECONDS > 0:
+        background_tasks.append(asyncio.create_task(
+            CoPurchaseService().refresh_periodically(settings.CO_PURCHASE_REFRESH_SECONDS)
+        ))
+    
+    # Cancel unpaid orders that were abandoned, releasing the stock they hold
+    if settings.PENDING_ORDER_SWEEP_SECONDS > 0:
+        background_tasks.append(asyncio.create_task(
+            OrderService().expire_pending_periodically(settings.PENDING_ORDER_SWEEP_SECONDS)
+        ))
+    
+    # Drain the email outbox in the background
+    if settings.EMAIL_WORKERS > 0 and smtp_configured():
+        background_tasks.extend(email_outbox.start(settings.EMAIL_WORKERS))
+    
     yield
     
     # Shutdown
     logger.info("Shutting down PolluxKart API...")
+    for task in background_tasks:
+        task.cancel()
+    await asyncio.gather(*background_tasks, return_exceptions=True)
     await Database.close()
 
 # Create FastAPI app
@@ -71,8 +125,13 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Only test servers report DB stats; browsers of other origins don't need them
+    expose_headers=["X-DB-Round-Trips", "X-DB-Time-Ms"] if settings.DB_STATS_HEADERS else [],
 )
 
+# Request metrics, outermost so the time spent in other middleware counts
+app.add_middleware(MetricsMiddleware)
+
 # Include routers with /api prefix
 app.include_router(auth_router, prefix="/api")
 app.include_router(products_router, prefix="/api")
@@ -99,6 +158,24 @@ async def health_check():
         "database": db_status
     }
 
+# Runtime stats endpoint
+@app.get("/api/stats")
+async def runtime_stats():
+    """In-process cache, request coalescing, password hashing and email counters, for sizing and tuning"""
+    return {
+        "catalog_cache": catalog_cache.stats(),
+        "wishlist_cache": wishlist_cache.stats(),
+        "coalesced_reads": read_group.stats(),
+        "password_hasher": password_hasher.stats(),
+        "email_outbox": email_outbox.stats(),
+    }
+
+# Prometheus metrics endpoint
+@app.get("/api/metrics")
+async def metrics():
+    """Per-route request latency and response size histograms and in-flight requests, in Prometheus text format"""
+    return Response(render_metrics(), media_type=METRICS_CONTENT_TYPE)
+
 # Root endpoint
 @app.get("/")
 async def root():
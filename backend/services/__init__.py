@@ -5,6 +5,9 @@ from services.cart_service import CartService, WishlistService
 from services.order_service import OrderService
 from services.inventory_service import InventoryService
 from services.payment_service import PaymentService
+from services.search_service import SearchIndex
+from services.related_service import RelatedProductsService
+from services.co_purchase_service import CoPurchaseService
 
 __all__ = [
     'AuthService',
@@ -14,4 +17,7 @@ __all__ = [
     'OrderService',
     'InventoryService',
     'PaymentService',
+    'SearchIndex',
+    'RelatedProductsService',
+    'CoPurchaseService',
 ]
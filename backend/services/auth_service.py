@@ -3,7 +3,7 @@ from datetime import datetime, timezone
 import uuid
 from config.database import get_db, COLLECTIONS
 from models.user import UserCreate, UserResponse, UserInDB, UserUpdate
-from utils.auth import hash_password, verify_password, create_access_token
+from utils.auth import password_hasher, create_access_token
 
 class AuthService:
     def __init__(self):
@@ -33,7 +33,7 @@ class AuthService:
             "email": user_data.email,
             "phone": user_data.phone,
             "name": user_data.name,
-            "password_hash": hash_password(user_data.password),
+            "password_hash": await password_hasher.hash(user_data.password),
             "avatar": f"https://api.dicebear.com/7.x/avataaars/svg?seed={user_id}",
             "is_active": True,
             "created_at": datetime.now(timezone.utc).isoformat(),
@@ -63,19 +63,12 @@ class AuthService:
         if not user:
             raise ValueError("Invalid credentials")
         
-        if not verify_password(password, user.get("password_hash", "")):
+        if not await password_hasher.verify(password, user.get("password_hash", "")):
             raise ValueError("Invalid credentials")
         
         if not user.get("is_active", True):
             raise ValueError("Account is deactivated")
         
-        # Create access token
-        token = create_access_token({
-            "sub": user["id"],
-            "email": user.get("email"),
-            "phone": user.get("phone"),
-        })
-        
         user_response = UserResponse(
             id=user["id"],
             email=user.get("email"),
@@ -85,7 +78,15 @@ class AuthService:
             is_active=user.get("is_active", True),
         )
         
-        return user_response, token
+        return user_response, self.issue_token(user_response)
+    
+    def issue_token(self, user: UserResponse) -> str:
+        """Create an access token for an authenticated user"""
+        return create_access_token({
+            "sub": user.id,
+            "email": user.email,
+            "phone": user.phone,
+        })
     
     async def get_user_by_id(self, user_id: str) -> Optional[UserResponse]:
         """Get user by ID"""
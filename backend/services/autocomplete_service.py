@@ -0,0 +1,315 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+import asyncio
+import bisect
+import heapq
+import logging
+import math
+from config.settings import settings
+from services.search_service import MAX_CHARACTER, tokenize
+
+logger = logging.getLogger(__name__)
+
+# Words of a suggestion a query may start matching at ("pro" finds "iPhone 15 Pro")
+MAX_KEY_WORDS = 8
+
+# Prefixes matching at least this many keys keep their top suggestions cached
+CACHE_MIN_MATCHES = 200
+
+def normalize(text: Optional[str]) -> str:
+    """Lowercase text reduced to single-space separated alphanumeric tokens"""
+    return " ".join(tokenize(text))
+
+def suggestion_keys(text: Optional[str]) -> List[str]:
+    """Keys a suggestion is found under: its normalized text from each word on"""
+    tokens = tokenize(text)
+    return [" ".join(tokens[i:]) for i in range(min(len(tokens), MAX_KEY_WORDS))]
+
+def product_popularity(product: dict) -> float:
+    """Ranking score of a product suggestion: rating weighted by how many reviews back it"""
+    return (product.get("rating") or 0.0) * math.log1p(product.get("review_count") or 0)
+
+class PrefixIndex:
+    """Sorted array of `(key, entry_id)` pairs answering prefix queries with bisect.
+
+    Each entry has a display text and a score; a query returns the best
+    scoring entries with a key starting with the query. Short prefixes match
+    large ranges of the array, so the top entries of any prefix matching at
+    least `CACHE_MIN_MATCHES` keys are cached. Adding an entry merges it into
+    the cached lists of its prefixes; removing one drops only the lists it
+    appears in.
+    """
+
+    def __init__(self):
+        self._keys: List[Tuple[str, str]] = []
+        self._entries: Dict[str, Tuple[str, float, List[str]]] = {}
+        self._top: Dict[str, List[str]] = {}
+
+    @classmethod
+    def build(cls, entries: Iterable[Tuple[str, str, float]]) -> "PrefixIndex":
+        """Index `(entry_id, text, score)` triples in one sort"""
+        index = cls()
+        for entry_id, text, score in entries:
+            keys = suggestion_keys(text)
+            if keys:
+                index._entries[entry_id] = (text, score, keys)
+                index._keys.extend((key, entry_id) for key in keys)
+        index._keys.sort()
+        return index
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _rank_key(self, entry_id: str) -> Tuple[float, str]:
+        text, score, _ = self._entries[entry_id]
+        return -score, text
+
+    def set(self, entry_id: str, text: str, score: float):
+        """Add or replace an entry"""
+        self.remove(entry_id)
+        keys = suggestion_keys(text)
+        if not keys:
+            return
+        for key in keys:
+            bisect.insort(self._keys, (key, entry_id))
+        self._entries[entry_id] = (text, score, keys)
+
+        max_suggestions = settings.AUTOCOMPLETE_MAX_SUGGESTIONS
+        rank = self._rank_key(entry_id)
+        for prefix in self._prefixes(keys):
+            top = self._top.get(prefix)
+            if top is None or entry_id in top:
+                continue
+            if len(top) >= max_suggestions and rank >= self._rank_key(top[-1]):
+                continue
+            bisect.insort(top, entry_id, key=self._rank_key)
+            del top[max_suggestions:]
+
+    def remove(self, entry_id: str):
+        """Remove an entry if present"""
+        entry = self._entries.get(entry_id)
+        if entry is None:
+            return
+        keys = entry[2]
+        for prefix in self._prefixes(keys):
+            top = self._top.get(prefix)
+            if top is not None and entry_id in top:
+                # Whatever ranked next is not known here; recompute on the next query
+                del self._top[prefix]
+        for key in keys:
+            idx = bisect.bisect_left(self._keys, (key, entry_id))
+            del self._keys[idx]
+        del self._entries[entry_id]
+
+    def _prefixes(self, keys: List[str]):
+        return {key[:length] for key in keys for length in range(1, len(key) + 1)}
+
+    def complete(self, prefix: str, limit: int) -> List[Tuple[str, str]]:
+        """`(entry_id, text)` of the best `limit` entries with a key starting with `prefix`"""
+        if not prefix:
+            return []
+
+        top = self._top.get(prefix)
+        if top is None:
+            start = bisect.bisect_left(self._keys, (prefix,))
+            end = bisect.bisect_left(self._keys, (prefix + MAX_CHARACTER,), start)
+            if end - start >= CACHE_MIN_MATCHES:
+                top = self._top[prefix] = self._rank(start, end, settings.AUTOCOMPLETE_MAX_SUGGESTIONS)
+            else:
+                top = self._rank(start, end, limit)
+        return [(entry_id, self._entries[entry_id][0]) for entry_id in top[:limit]]
+
+    def _rank(self, start: int, end: int, limit: int) -> List[str]:
+        matches = {entry_id for _, entry_id in self._keys[start:end]}
+        return heapq.nsmallest(limit, matches, key=self._rank_key)
+
+class AutocompleteIndex:
+    """In-memory typeahead over active product names, brands and category names.
+
+    Like the search index it lives in the API process, is rebuilt from
+    MongoDB at startup and periodically, and is kept current by
+    `ProductService` on product and category writes, which are replayed onto
+    the new index when they land during a rebuild. Products rank by
+    rating weighted by review count; brands and categories by how many active
+    products they hold.
+    """
+
+    def __init__(self):
+        self.ready = False
+        self.products = PrefixIndex()
+        self.brands = PrefixIndex()
+        self.categories = PrefixIndex()
+        self._product_facets: Dict[str, Tuple[Optional[str], Optional[str]]] = {}
+        self._brand_names: Dict[str, str] = {}
+        self._brand_counts: Dict[str, int] = {}
+        self._category_names: Dict[str, str] = {}
+        self._category_counts: Dict[str, int] = {}
+        # Edits made during each running rebuild: document (or None if removed) by kind and ID
+        self._edit_logs: List[Dict[Tuple[str, str], Optional[dict]]] = []
+
+    # ============ Indexing ============
+
+    def _log_edit(self, kind: str, entry_id: str, document: Optional[dict]):
+        for edits in self._edit_logs:
+            edits[(kind, entry_id)] = document
+
+    def index_category(self, category: dict):
+        """Add or rename a category"""
+        self._log_edit("category", category["id"], category)
+        self._category_names[category["id"]] = category["name"]
+        self._set_category(category["id"])
+
+    def index_product(self, product: dict):
+        """Add or replace a product; inactive products are removed"""
+        product_id = product["id"]
+        self._log_edit("product", product_id, product)
+        self._remove_product(product_id)
+
+        if not product.get("is_active", True):
+            return
+
+        self.products.set(product_id, product["name"], product_popularity(product))
+
+        brand_key = normalize(product.get("brand"))
+        category_id = product.get("category_id")
+        self._product_facets[product_id] = (brand_key or None, category_id)
+        if brand_key:
+            self._brand_names.setdefault(brand_key, product["brand"])
+            self._brand_counts[brand_key] = self._brand_counts.get(brand_key, 0) + 1
+            self._set_brand(brand_key)
+        if category_id:
+            self._category_counts[category_id] = self._category_counts.get(category_id, 0) + 1
+            self._set_category(category_id)
+
+    def remove_product(self, product_id: str):
+        """Remove a product if present"""
+        self._log_edit("product", product_id, None)
+        self._remove_product(product_id)
+
+    def _remove_product(self, product_id: str):
+        facets = self._product_facets.pop(product_id, None)
+        if facets is None:
+            return
+
+        self.products.remove(product_id)
+        brand_key, category_id = facets
+        if brand_key:
+            self._brand_counts[brand_key] -= 1
+            if not self._brand_counts[brand_key]:
+                del self._brand_counts[brand_key]
+                del self._brand_names[brand_key]
+            self._set_brand(brand_key)
+        if category_id:
+            self._category_counts[category_id] -= 1
+            self._set_category(category_id)
+
+    def _set_brand(self, brand_key: str):
+        if brand_key in self._brand_counts:
+            self.brands.set(brand_key, self._brand_names[brand_key], self._brand_counts[brand_key])
+        else:
+            self.brands.remove(brand_key)
+
+    def _set_category(self, category_id: str):
+        name = self._category_names.get(category_id)
+        if name:
+            self.categories.set(category_id, name, self._category_counts.get(category_id, 0))
+
+    @classmethod
+    def build(cls, products: Iterable[dict], category_names: Dict[str, str]) -> "AutocompleteIndex":
+        """Index active products and named categories with one sort per index"""
+        index = cls()
+        product_entries = []
+        for product in products:
+            if not product.get("is_active", True):
+                continue
+            product_entries.append((product["id"], product["name"], product_popularity(product)))
+            brand_key = normalize(product.get("brand"))
+            category_id = product.get("category_id")
+            index._product_facets[product["id"]] = (brand_key or None, category_id)
+            if brand_key:
+                index._brand_names.setdefault(brand_key, product["brand"])
+                index._brand_counts[brand_key] = index._brand_counts.get(brand_key, 0) + 1
+            if category_id:
+                index._category_counts[category_id] = index._category_counts.get(category_id, 0) + 1
+
+        index._category_names = dict(category_names)
+        index.products = PrefixIndex.build(product_entries)
+        index.brands = PrefixIndex.build(
+            (key, index._brand_names[key], count) for key, count in index._brand_counts.items()
+        )
+        index.categories = PrefixIndex.build(
+            (category_id, name, index._category_counts.get(category_id, 0))
+            for category_id, name in index._category_names.items()
+        )
+        return index
+
+    async def rebuild(self, products, categories, batch_size: int = 1000):
+        """Rebuild from the products and categories collections.
+
+        The new index is built off to the side and swapped in at the end, so
+        completions keep working against the old one while the rebuild runs.
+        Products and categories indexed meanwhile may have been read before
+        the change, so those edits are replayed onto the new index before the swap.
+        """
+        edits: Dict[Tuple[str, str], Optional[dict]] = {}
+        self._edit_logs.append(edits)
+        try:
+            category_names = {}
+            async for category in categories.find({}, {"_id": 0, "id": 1, "name": 1}):
+                category_names[category["id"]] = category["name"]
+
+            rows = []
+            projection = {"_id": 0, "id": 1, "name": 1, "brand": 1, "category_id": 1, "rating": 1, "review_count": 1}
+            async for product in products.find({"is_active": True}, projection).batch_size(batch_size):
+                rows.append(product)
+                if len(rows) % batch_size == 0:
+                    # Let other requests run between batches
+                    await asyncio.sleep(0)
+
+            fresh = await asyncio.to_thread(AutocompleteIndex.build, rows, category_names)
+        finally:
+            self._edit_logs.remove(edits)
+
+        for (kind, entry_id), document in edits.items():
+            if kind == "category":
+                fresh.index_category(document)
+            elif document is None:
+                fresh.remove_product(entry_id)
+            else:
+                fresh.index_product(document)
+
+        self.products, self.brands, self.categories = fresh.products, fresh.brands, fresh.categories
+        self._product_facets = fresh._product_facets
+        self._brand_names = fresh._brand_names
+        self._brand_counts = fresh._brand_counts
+        self._category_names = fresh._category_names
+        self._category_counts = fresh._category_counts
+        self.ready = True
+        logger.info(
+            f"Autocomplete index rebuilt with {len(fresh.products)} products, "
+            f"{len(fresh.brands)} brands and {len(fresh.categories)} categories ({len(edits)} edits replayed)"
+        )
+
+    async def refresh_periodically(self, products, categories, interval_seconds: int):
+        """Rebuild now and then every `interval_seconds` (only once if 0) until cancelled"""
+        while True:
+            try:
+                await self.rebuild(products, categories)
+            except Exception as e:
+                logger.error(f"Autocomplete index refresh failed: {e}")
+            if interval_seconds <= 0:
+                return
+            await asyncio.sleep(interval_seconds)
+
+    # ============ Querying ============
+
+    def complete(self, query: str, limit: int) -> Dict[str, List[Tuple[str, str]]]:
+        """Best `(id, text)` completions of `query` per suggestion type"""
+        prefix = normalize(query)
+        return {
+            "products": self.products.complete(prefix, limit),
+            "brands": self.brands.complete(prefix, limit),
+            "categories": self.categories.complete(prefix, limit),
+        }
+
+# Shared per-process index used by ProductService
+autocomplete_index = AutocompleteIndex()
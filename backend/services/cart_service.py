@@ -1,36 +1,54 @@
-from typing import Optional
+from typing import Optional, Dict, FrozenSet, List
 from datetime import datetime, timezone
 import uuid
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
 from config.database import get_db, COLLECTIONS
 from models.cart import CartResponse, CartItem, WishlistResponse, WishlistItem
+from models.product import ProductResponse
 from services.product_service import ProductService
+from services.co_purchase_service import CoPurchaseService
+from utils.cache import wishlist_cache
+
+TAX_RATE = 0.18  # 18% GST
+
+# Carts and wishlists are created on first write; deriving their IDs from the
+# user ID keeps the ID stable between the empty response and the stored document
+def cart_id(user_id: str) -> str:
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"polluxkart:cart:{user_id}"))
+
+def wishlist_id(user_id: str) -> str:
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"polluxkart:wishlist:{user_id}"))
 
 class CartService:
     def __init__(self):
         self.db = get_db()
         self.carts = self.db[COLLECTIONS['carts']]
         self.product_service = ProductService()
+        self.co_purchase_service = CoPurchaseService()
     
     async def get_cart(self, user_id: str) -> CartResponse:
-        """Get user's cart or create empty one"""
+        """Get user's cart, or an empty one if they have never added anything"""
         cart = await self.carts.find_one({"user_id": user_id}, {"_id": 0})
         
         if not cart:
-            cart = {
-                "id": str(uuid.uuid4()),
-                "user_id": user_id,
-                "items": [],
-                "subtotal": 0.0,
-                "discount": 0.0,
-                "tax": 0.0,
-                "total": 0.0,
-                "item_count": 0,
-                "updated_at": datetime.now(timezone.utc).isoformat(),
-            }
-            await self.carts.insert_one(cart)
+            # Not persisted; the first mutation creates the document with this same ID
+            return CartResponse(id=cart_id(user_id), user_id=user_id)
         
         return CartResponse(**cart)
     
+    async def get_cart_recommendations(self, user_id: str, limit: int) -> List[ProductResponse]:
+        """Products frequently bought with what is in the cart"""
+        cart = await self.carts.find_one({"user_id": user_id}, {"_id": 0, "items.product_id": 1})
+        if not cart or not cart.get("items"):
+            return []
+        
+        companion_ids = await self.co_purchase_service.get_companion_ids_for_basket(
+            [item["product_id"] for item in cart["items"]]
+        )
+        products, _ = await self.product_service.get_products_by_ids(companion_ids[:limit])
+        return products
+    
     async def add_to_cart(self, user_id: str, product_id: str, quantity: int = 1) -> CartResponse:
         """Add item to cart"""
         # Get product details
@@ -41,46 +59,47 @@ class CartService:
         if not product.in_stock:
             raise ValueError("Product is out of stock")
         
-        cart = await self.get_cart(user_id)
-        items = cart.items
-        
-        # Check if item already in cart
-        existing_idx = None
-        for idx, item in enumerate(items):
-            if item.product_id == product_id:
-                existing_idx = idx
-                break
+        new_item = CartItem(
+            product_id=product_id,
+            quantity=quantity,
+            price=product.price,
+            name=product.name,
+            image=product.image
+        )
         
-        if existing_idx is not None:
-            # Update quantity
-            items[existing_idx].quantity += quantity
-        else:
-            # Add new item
-            items.append(CartItem(
-                product_id=product_id,
-                quantity=quantity,
-                price=product.price,
-                name=product.name,
-                image=product.image
-            ))
-        
-        # Recalculate totals
+        # Increment the quantity if the item is already in the cart, else append it
+        items = {"$cond": [
+            {"$in": [{"$literal": product_id}, {"$ifNull": ["$items.product_id", []]}]},
+            {"$map": {
+                "input": "$items",
+                "in": {"$cond": [
+                    {"$eq": ["$$this.product_id", {"$literal": product_id}]},
+                    {"$mergeObjects": ["$$this", {"quantity": {"$add": ["$$this.quantity", quantity]}}]},
+                    "$$this"
+                ]}
+            }},
+            {"$concatArrays": [{"$ifNull": ["$items", []]}, [{"$literal": new_item.model_dump()}]]}
+        ]}
         return await self._update_cart(user_id, items)
     
     async def update_cart_item(self, user_id: str, product_id: str, quantity: int) -> CartResponse:
         """Update item quantity in cart"""
-        cart = await self.get_cart(user_id)
-        items = cart.items
-        
         if quantity <= 0:
             # Remove item
-            items = [item for item in items if item.product_id != product_id]
+            items = {"$filter": {
+                "input": {"$ifNull": ["$items", []]},
+                "cond": {"$ne": ["$$this.product_id", {"$literal": product_id}]}
+            }}
         else:
             # Update quantity
-            for item in items:
-                if item.product_id == product_id:
-                    item.quantity = quantity
-                    break
+            items = {"$map": {
+                "input": {"$ifNull": ["$items", []]},
+                "in": {"$cond": [
+                    {"$eq": ["$$this.product_id", {"$literal": product_id}]},
+                    {"$mergeObjects": ["$$this", {"quantity": quantity}]},
+                    "$$this"
+                ]}
+            }}
         
         return await self._update_cart(user_id, items)
     
@@ -90,33 +109,50 @@ class CartService:
     
     async def clear_cart(self, user_id: str) -> CartResponse:
         """Clear all items from cart"""
-        return await self._update_cart(user_id, [])
-    
-    async def _update_cart(self, user_id: str, items: list) -> CartResponse:
-        """Update cart with new items and recalculate totals"""
-        # Calculate totals
-        subtotal = sum(item.price * item.quantity for item in items)
-        tax = round(subtotal * 0.18, 2)  # 18% GST
-        total = round(subtotal + tax, 2)
-        item_count = sum(item.quantity for item in items)
-        
-        cart_dict = {
-            "items": [item.model_dump() for item in items],
-            "subtotal": round(subtotal, 2),
-            "discount": 0.0,
-            "tax": tax,
-            "total": total,
-            "item_count": item_count,
-            "updated_at": datetime.now(timezone.utc).isoformat(),
-        }
-        
-        await self.carts.update_one(
+        return await self._update_cart(user_id, {"$literal": []})
+    
+    async def _update_cart(self, user_id: str, items_expr) -> CartResponse:
+        """Apply an items expression and recalculate totals in one atomic update
+        
+        `items_expr` computes the new items array from the stored one, so the
+        change is applied server side against the current cart and concurrent
+        mutations (e.g. adds from two tabs) cannot overwrite each other. The
+        cart is created if it does not exist yet.
+        """
+        pipeline = [
+            {"$set": {
+                "id": {"$ifNull": ["$id", cart_id(user_id)]},
+                "items": items_expr,
+                "discount": {"$ifNull": ["$discount", 0.0]},
+                "updated_at": datetime.now(timezone.utc).isoformat(),
+            }},
+            {"$set": {
+                "subtotal": {"$round": [{"$sum": {"$map": {
+                    "input": "$items",
+                    "in": {"$multiply": ["$$this.price", "$$this.quantity"]}
+                }}}, 2]},
+                "item_count": {"$sum": "$items.quantity"},
+            }},
+            {"$set": {"tax": {"$round": [{"$multiply": ["$subtotal", TAX_RATE]}, 2]}}},
+            {"$set": {"total": {"$round": [{"$add": ["$subtotal", "$tax"]}, 2]}}},
+        ]
+        
+        try:
+            cart = await self._apply_cart_update(user_id, pipeline)
+        except DuplicateKeyError:
+            # Another request created the cart first; apply the change to it
+            cart = await self._apply_cart_update(user_id, pipeline)
+        
+        return CartResponse(**cart)
+    
+    async def _apply_cart_update(self, user_id: str, pipeline: list) -> dict:
+        return await self.carts.find_one_and_update(
             {"user_id": user_id},
-            {"$set": cart_dict},
-            upsert=True
+            pipeline,
+            projection={"_id": 0},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
         )
-        
-        return await self.get_cart(user_id)
 
 
 class WishlistService:
@@ -126,17 +162,12 @@ class WishlistService:
         self.product_service = ProductService()
     
     async def get_wishlist(self, user_id: str) -> WishlistResponse:
-        """Get user's wishlist"""
+        """Get user's wishlist, or an empty one if they have never added anything"""
         wishlist = await self.wishlists.find_one({"user_id": user_id}, {"_id": 0})
         
         if not wishlist:
-            wishlist = {
-                "id": str(uuid.uuid4()),
-                "user_id": user_id,
-                "items": [],
-                "updated_at": datetime.now(timezone.utc).isoformat(),
-            }
-            await self.wishlists.insert_one(wishlist)
+            # Not persisted; the first add creates the document with this same ID
+            return WishlistResponse(id=wishlist_id(user_id), user_id=user_id)
         
         return WishlistResponse(**wishlist)
     
@@ -147,53 +178,88 @@ class WishlistService:
         if not product:
             raise ValueError("Product not found")
         
-        wishlist = await self.get_wishlist(user_id)
+        now = datetime.now(timezone.utc).isoformat()
+        items = {"$ifNull": ["$items", []]}
         
-        # Check if already in wishlist
-        if any(item.product_id == product_id for item in wishlist.items):
-            return wishlist
+        # Append unless already present, creating the wishlist on first add
+        pipeline = [
+            {"$set": {
+                "id": {"$ifNull": ["$id", wishlist_id(user_id)]},
+                "items": {"$cond": [
+                    {"$in": [{"$literal": product_id}, {"$ifNull": ["$items.product_id", []]}]},
+                    items,
+                    {"$concatArrays": [items, [{"$literal": {"product_id": product_id, "added_at": now}}]]}
+                ]},
+                "updated_at": now,
+            }},
+        ]
         
-        # Add item
-        await self.wishlists.update_one(
-            {"user_id": user_id},
-            {
-                "$push": {
-                    "items": {
-                        "product_id": product_id,
-                        "added_at": datetime.now(timezone.utc).isoformat()
-                    }
-                },
-                "$set": {"updated_at": datetime.now(timezone.utc).isoformat()}
-            }
-        )
+        try:
+            wishlist = await self._apply_wishlist_update(user_id, pipeline)
+        except DuplicateKeyError:
+            # Another request created the wishlist first; apply the change to it
+            wishlist = await self._apply_wishlist_update(user_id, pipeline)
         
-        return await self.get_wishlist(user_id)
+        wishlist_cache.invalidate("membership", user_id)
+        return WishlistResponse(**wishlist)
     
     async def remove_from_wishlist(self, user_id: str, product_id: str) -> WishlistResponse:
         """Remove item from wishlist"""
-        await self.wishlists.update_one(
+        wishlist = await self.wishlists.find_one_and_update(
             {"user_id": user_id},
             {
                 "$pull": {"items": {"product_id": product_id}},
                 "$set": {"updated_at": datetime.now(timezone.utc).isoformat()}
-            }
+            },
+            projection={"_id": 0},
+            return_document=ReturnDocument.AFTER
         )
         
-        return await self.get_wishlist(user_id)
+        wishlist_cache.invalidate("membership", user_id)
+        if not wishlist:
+            return WishlistResponse(id=wishlist_id(user_id), user_id=user_id)
+        return WishlistResponse(**wishlist)
     
     async def is_in_wishlist(self, user_id: str, product_id: str) -> bool:
         """Check if product is in wishlist"""
-        wishlist = await self.get_wishlist(user_id)
-        return any(item.product_id == product_id for item in wishlist.items)
+        return product_id in await self.get_wishlist_product_ids(user_id)
+    
+    async def check_wishlist(self, user_id: str, product_ids: List[str]) -> Dict[str, bool]:
+        """Check which of many products are in the wishlist"""
+        members = await self.get_wishlist_product_ids(user_id)
+        return {product_id: product_id in members for product_id in product_ids}
+    
+    async def get_wishlist_product_ids(self, user_id: str) -> FrozenSet[str]:
+        """IDs of the products in the user's wishlist, cached per user"""
+        return await wishlist_cache.get_or_load(
+            "membership", user_id,
+            lambda: self._load_wishlist_product_ids(user_id)
+        )
+    
+    async def _load_wishlist_product_ids(self, user_id: str) -> FrozenSet[str]:
+        wishlist = await self.wishlists.find_one(
+            {"user_id": user_id},
+            {"_id": 0, "items.product_id": 1}
+        )
+        if not wishlist:
+            return frozenset()
+        return frozenset(item["product_id"] for item in wishlist.get("items", []))
+    
+    async def _apply_wishlist_update(self, user_id: str, pipeline: list) -> dict:
+        return await self.wishlists.find_one_and_update(
+            {"user_id": user_id},
+            pipeline,
+            projection={"_id": 0},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
     
     async def get_wishlist_products(self, user_id: str):
         """Get full product details for wishlist items"""
         wishlist = await self.get_wishlist(user_id)
-        products = []
-        
-        for item in wishlist.items:
-            product = await self.product_service.get_product_by_id(item.product_id)
-            if product:
-                products.append(product)
         
+        # Deleted or deactivated products are left out
+        products, _ = await self.product_service.get_products_by_ids(
+            [item.product_id for item in wishlist.items]
+        )
         return products
@@ -0,0 +1,307 @@
+"""
+"Frequently bought together" from order history.
+
+A batch build streams paid orders into sparse order x product matrices B, one
+batch of orders at a time, and sums C = B^T B over the batches. The diagonal
+of C holds how many orders contain each product, and the off-diagonal entries
+count orders containing both. Companions are ranked by lift,
+P(a and b) / (P(a) P(b)) = C[a, b] * N / (C[a, a] * C[b, b]), which favours
+pairs bought together more often than their popularity alone explains. Each
+product's order count and top companions are stored in one `co_purchases`
+document, so serving them is one indexed lookup. Pair counts are stored one
+pair per document in `co_purchase_pairs`.
+
+`record_order` folds each newly confirmed order into the stored counts with
+`$inc` and re-ranks the companions of the products in it from their most
+frequent pairs. Lists of other products pick up the new popularity counts on
+the next batch build. A build runs in one process at a time, under a lease.
+It counts the orders confirmed before it started and leaves documents that
+`record_order` changed since then alone, so it neither overwrites nor repeats
+their increments.
+"""
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+import asyncio
+import logging
+import uuid
+import numpy as np
+from scipy import sparse
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from config.database import get_db, COLLECTIONS
+from config.settings import settings
+from models.order import OrderStatus, PaymentStatus
+from utils.leases import Lease
+
+logger = logging.getLogger(__name__)
+
+# Document holding the number of orders counted (N in the lift formula)
+ALL_ORDERS_KEY = "__all__"
+
+# Orders that count as purchases
+PURCHASED_ORDERS_QUERY = {
+    "payment_status": PaymentStatus.COMPLETED.value,
+    "status": {"$nin": [OrderStatus.CANCELLED.value, OrderStatus.REFUNDED.value]},
+}
+
+# Orders counted per sparse matrix product during a build
+COUNT_BATCH_ORDERS = 10000
+
+# Co-purchase rebuilds, held by one process at a time
+REBUILD_LEASE = "co_purchases_rebuild"
+
+# MongoDB duplicate key error code
+DUPLICATE_KEY_ERROR = 11000
+
+def rank_companions(
+    order_count: int,
+    co_counts: Dict[str, int],
+    companion_order_counts: Dict[str, int],
+    total_orders: int,
+) -> List[dict]:
+    """Top companions of one product by lift, with at least the minimum support"""
+    companions = []
+    for other_id, count in co_counts.items():
+        other_count = companion_order_counts.get(other_id)
+        if count < settings.CO_PURCHASE_MIN_SUPPORT or not other_count or not order_count:
+            continue
+        lift = count * total_orders / (order_count * other_count)
+        companions.append({"product_id": other_id, "count": count, "lift": round(lift, 4)})
+
+    companions.sort(key=lambda c: (c["lift"], c["count"]), reverse=True)
+    return companions[:settings.CO_PURCHASE_TOP_N]
+
+class CoOccurrenceCounter:
+    """Co-occurrence counts B^T B summed over batches of baskets"""
+    def __init__(self):
+        self.product_ids: List[str] = []
+        self.positions: Dict[str, int] = {}
+        self.matrix = sparse.csr_matrix((0, 0), dtype=np.int64)
+        self.order_count = 0
+
+    def add(self, baskets: List[List[str]]):
+        """Count one batch of baskets"""
+        rows, columns = [], []
+        for row, basket in enumerate(baskets):
+            for product_id in set(basket):
+                column = self.positions.get(product_id)
+                if column is None:
+                    column = self.positions[product_id] = len(self.product_ids)
+                    self.product_ids.append(product_id)
+                rows.append(row)
+                columns.append(column)
+
+        n = len(self.product_ids)
+        baskets_matrix = sparse.csr_matrix(
+            (np.ones(len(rows), dtype=np.int64), (np.array(rows, dtype=np.int64), np.array(columns, dtype=np.int64))),
+            shape=(len(baskets), n)
+        )
+        self.matrix.resize((n, n))
+        self.matrix = (self.matrix + baskets_matrix.T @ baskets_matrix).tocsr()
+        self.order_count += len(baskets)
+
+class CoPurchaseService:
+    def __init__(self):
+        self.db = get_db()
+        self.orders = self.db[COLLECTIONS['orders']]
+        self.co_purchases = self.db[COLLECTIONS['co_purchases']]
+        self.pairs = self.db[COLLECTIONS['co_purchase_pairs']]
+
+    async def get_companion_ids(self, product_id: str) -> List[str]:
+        """IDs of products frequently bought with a product, best first"""
+        doc = await self.co_purchases.find_one({"product_id": product_id}, {"_id": 0, "companions": 1})
+        return [c["product_id"] for c in doc["companions"]] if doc else []
+
+    async def get_companion_ids_for_basket(self, product_ids: List[str]) -> List[str]:
+        """IDs of products frequently bought with any of `product_ids`, best first, excluding them"""
+        in_basket = set(product_ids)
+        best: Dict[str, tuple] = {}
+        async for doc in self.co_purchases.find({"product_id": {"$in": list(in_basket)}}, {"_id": 0, "companions": 1}):
+            for companion in doc["companions"]:
+                if companion["product_id"] in in_basket:
+                    continue
+                rank = (companion["lift"], companion["count"])
+                if rank > best.get(companion["product_id"], (0, 0)):
+                    best[companion["product_id"]] = rank
+        return sorted(best, key=best.get, reverse=True)
+
+    async def rebuild(self, batch_size: int = 1000) -> Optional[int]:
+        """Recompute every product's co-purchase counts and companions
+        
+        Returns the order count, or None if another process is rebuilding.
+        """
+        async with Lease(REBUILD_LEASE).hold() as acquired:
+            if not acquired:
+                logger.info("Co-purchase rebuild skipped: another process is rebuilding")
+                return None
+            return await self._rebuild(batch_size)
+
+    async def _rebuild(self, batch_size: int) -> int:
+        # Orders confirmed from here on are counted by record_order. Paid orders still
+        # pending will be too, once confirmed; orders past pending without a
+        # confirmation time (from before it was recorded) never will be
+        started = datetime.now(timezone.utc).isoformat()
+        query = {
+            **PURCHASED_ORDERS_QUERY,
+            "$or": [
+                {"confirmed_at": {"$lt": started}},
+                {"confirmed_at": {"$exists": False}, "status": {"$ne": OrderStatus.PENDING.value}},
+            ],
+        }
+
+        counter = CoOccurrenceCounter()
+        baskets = []
+        async for order in self.orders.find(query, {"_id": 0, "items.product_id": 1}).batch_size(batch_size):
+            basket = [item["product_id"] for item in order.get("items", [])]
+            if basket:
+                baskets.append(basket)
+            if len(baskets) >= COUNT_BATCH_ORDERS:
+                await asyncio.to_thread(counter.add, baskets)
+                baskets = []
+        if baskets:
+            await asyncio.to_thread(counter.add, baskets)
+
+        product_ids, matrix = counter.product_ids, counter.matrix
+        order_counts = matrix.diagonal()
+        total_orders = counter.order_count
+        counts_by_id = {product_id: int(order_counts[i]) for i, product_id in enumerate(product_ids)}
+
+        build_id = str(uuid.uuid4())
+        now = datetime.now(timezone.utc).isoformat()
+        # Documents record_order changed since the build started keep their live counts
+        unchanged = {"$or": [{"updated_at": {"$lt": started}}, {"updated_at": {"$exists": False}}]}
+
+        products = [UpdateOne(
+            {"product_id": ALL_ORDERS_KEY, **unchanged},
+            {"$set": {"order_count": total_orders, "build_id": build_id, "updated_at": now}},
+            upsert=True
+        )]
+        pairs = []
+        for i, product_id in enumerate(product_ids):
+            lo, hi = matrix.indptr[i], matrix.indptr[i + 1]
+            co_counts = {
+                product_ids[j]: int(count)
+                for j, count in zip(matrix.indices[lo:hi], matrix.data[lo:hi])
+                if j != i
+            }
+            products.append(UpdateOne({"product_id": product_id, **unchanged}, {
+                "$set": {
+                    "order_count": counts_by_id[product_id],
+                    "companions": rank_companions(counts_by_id[product_id], co_counts, counts_by_id, total_orders),
+                    "build_id": build_id,
+                    "updated_at": now,
+                },
+                # Pair counts used to be kept on the product's document
+                "$unset": {"co_counts": ""},
+            }, upsert=True))
+            pairs.extend(
+                UpdateOne(
+                    {"product_id": product_id, "other_id": other_id, **unchanged},
+                    {"$set": {"count": count, "build_id": build_id, "updated_at": now}},
+                    upsert=True
+                )
+                for other_id, count in co_counts.items()
+            )
+            if len(products) >= batch_size:
+                await self._write_unchanged(self.co_purchases, products)
+                products = []
+            if len(pairs) >= batch_size:
+                await self._write_unchanged(self.pairs, pairs)
+                pairs = []
+        await self._write_unchanged(self.co_purchases, products)
+        await self._write_unchanged(self.pairs, pairs)
+
+        # Sweep what this build did not write, except documents created since it started
+        stale = {"build_id": {"$ne": build_id}, "updated_at": {"$lt": started}}
+        await self.co_purchases.delete_many(stale)
+        await self.pairs.delete_many(stale)
+        logger.info(f"Co-purchases rebuilt from {total_orders} orders over {len(product_ids)} products")
+        return total_orders
+
+    async def _write_unchanged(self, collection, updates: List[UpdateOne]):
+        """Apply build writes, skipping documents changed since the build started
+        
+        Those fail the update's filter, so their upsert collides with the
+        existing document on the unique key; the duplicate key errors are expected.
+        """
+        if not updates:
+            return
+        try:
+            await collection.bulk_write(updates, ordered=False)
+        except BulkWriteError as e:
+            if any(error["code"] != DUPLICATE_KEY_ERROR for error in e.details["writeErrors"]):
+                raise
+
+    async def refresh_periodically(self, interval_seconds: int):
+        """Rebuild now and then every `interval_seconds` until cancelled"""
+        while True:
+            try:
+                await self.rebuild()
+            except Exception as e:
+                logger.error(f"Co-purchase rebuild failed: {e}")
+            await asyncio.sleep(interval_seconds)
+
+    async def record_order(self, product_ids: List[str]):
+        """Fold one confirmed order into the counts and re-rank the companions of its products"""
+        basket = list(dict.fromkeys(product_ids))
+        now = datetime.now(timezone.utc).isoformat()
+
+        await self.co_purchases.bulk_write([
+            UpdateOne(
+                {"product_id": product_id},
+                {"$inc": {"order_count": 1}, "$set": {"updated_at": now}},
+                upsert=True
+            )
+            for product_id in [ALL_ORDERS_KEY, *basket]
+        ], ordered=False)
+
+        if len(basket) < 2:
+            return
+
+        await self.pairs.bulk_write([
+            UpdateOne(
+                {"product_id": product_id, "other_id": other_id},
+                {"$inc": {"count": 1}, "$set": {"updated_at": now}},
+                upsert=True
+            )
+            for product_id in basket for other_id in basket if other_id != product_id
+        ], ordered=False)
+
+        await self._rerank(basket)
+
+    async def _rerank(self, basket: List[str]):
+        """Re-rank the companions of `basket` from each product's most frequent pairs"""
+        docs = await self.co_purchases.find(
+            {"product_id": {"$in": basket + [ALL_ORDERS_KEY]}},
+            {"_id": 0, "product_id": 1, "order_count": 1}
+        ).to_list(None)
+        by_id = {doc["product_id"]: doc.get("order_count", 0) for doc in docs}
+        total_orders = by_id.get(ALL_ORDERS_KEY, 0)
+
+        candidates = await asyncio.gather(*(
+            self.pairs.find(
+                {"product_id": product_id, "count": {"$gte": settings.CO_PURCHASE_MIN_SUPPORT}},
+                {"_id": 0, "other_id": 1, "count": 1}
+            ).sort("count", -1).limit(settings.CO_PURCHASE_RANK_CANDIDATES).to_list(None)
+            for product_id in basket
+        ))
+        co_counts = {
+            product_id: {pair["other_id"]: pair["count"] for pair in pairs}
+            for product_id, pairs in zip(basket, candidates)
+        }
+
+        companion_ids = {other_id for counts in co_counts.values() for other_id in counts}
+        counts_by_id = {
+            doc["product_id"]: doc.get("order_count", 0)
+            async for doc in self.co_purchases.find(
+                {"product_id": {"$in": list(companion_ids)}},
+                {"_id": 0, "product_id": 1, "order_count": 1}
+            )
+        }
+
+        await self.co_purchases.bulk_write([
+            UpdateOne({"product_id": product_id}, {"$set": {"companions": rank_companions(
+                by_id.get(product_id, 0), co_counts[product_id], counts_by_id, total_orders
+            )}})
+            for product_id in basket
+        ], ordered=False)
@@ -1,16 +1,33 @@
-from typing import Optional
+from typing import Optional, Dict
 from datetime import datetime, timezone
 import uuid
+from pymongo import ReturnDocument, UpdateOne
 from config.database import get_db, COLLECTIONS
 from models.inventory import InventoryResponse, InventoryAdjustment, StockMovement
+from utils.cache import catalog_cache
+from utils.singleflight import coalesced
+
+# Unreserved stock of an inventory document, for use in $expr conditions
+AVAILABLE_STOCK_EXPR = {"$subtract": ["$quantity", {"$ifNull": ["$reserved", 0]}]}
+
+class InsufficientStockError(ValueError):
+    """Raised when a batch reservation cannot be satisfied.
+
+    `shortages` maps each product that could not be reserved to its
+    available stock (0 when it has no inventory record).
+    """
+    def __init__(self, shortages: Dict[str, int]):
+        super().__init__("Insufficient stock")
+        self.shortages = shortages
 
 class InventoryService:
     def __init__(self):
         self.db = get_db()
         self.inventory = self.db[COLLECTIONS['inventory']]
         self.products = self.db[COLLECTIONS['products']]
-        self.movements = self.db['stock_movements']
+        self.movements = self.db[COLLECTIONS['stock_movements']]
     
+    @coalesced
     async def get_inventory(self, product_id: str) -> Optional[InventoryResponse]:
         """Get inventory for a product"""
         inv = await self.inventory.find_one({"product_id": product_id}, {"_id": 0})
@@ -20,20 +37,9 @@ class InventoryService:
         # Get product name
         product = await self.products.find_one({"id": product_id}, {"_id": 0, "name": 1})
         
-        available = inv["quantity"] - inv.get("reserved", 0)
-        
-        return InventoryResponse(
-            id=inv["id"],
-            product_id=product_id,
-            product_name=product["name"] if product else None,
-            quantity=inv["quantity"],
-            reserved=inv.get("reserved", 0),
-            available=available,
-            low_stock_threshold=inv.get("low_stock_threshold", 10),
-            is_low_stock=available <= inv.get("low_stock_threshold", 10),
-            is_out_of_stock=available <= 0,
-        )
+        return self._build_response(inv, product["name"] if product else None)
     
+    @coalesced
     async def get_available_stock(self, product_id: str) -> int:
         """Get available stock (total - reserved)"""
         inv = await self.inventory.find_one({"product_id": product_id}, {"_id": 0})
@@ -49,35 +55,25 @@ class InventoryService:
         user_id: Optional[str] = None
     ) -> InventoryResponse:
         """Adjust inventory quantity"""
-        inv = await self.inventory.find_one({"product_id": product_id}, {"_id": 0})
+        # Apply the adjustment only if quantity stays non-negative
+        inv = await self.inventory.find_one_and_update(
+            {"product_id": product_id, "quantity": {"$gte": -adjustment}},
+            {
+                "$inc": {"quantity": adjustment},
+                "$set": {"updated_at": datetime.now(timezone.utc).isoformat()}
+            },
+            projection={"_id": 0},
+            return_document=ReturnDocument.AFTER
+        )
         
         if not inv:
-            raise ValueError("Inventory record not found")
-        
-        previous_qty = inv["quantity"]
-        new_qty = previous_qty + adjustment
+            await self._raise_update_failed(product_id)
         
-        if new_qty < 0:
-            raise ValueError("Insufficient stock")
-        
-        # Update inventory
-        await self.inventory.update_one(
-            {"product_id": product_id},
-            {"$set": {
-                "quantity": new_qty,
-                "updated_at": datetime.now(timezone.utc).isoformat()
-            }}
-        )
+        new_qty = inv["quantity"]
+        previous_qty = new_qty - adjustment
         
         # Update product stock
-        await self.products.update_one(
-            {"id": product_id},
-            {"$set": {
-                "stock": new_qty,
-                "in_stock": new_qty > 0,
-                "updated_at": datetime.now(timezone.utc).isoformat()
-            }}
-        )
+        product = await self._apply_product_stock_change(product_id, inv)
         
         # Record movement
         await self._record_movement(
@@ -89,27 +85,27 @@ class InventoryService:
             created_by=user_id
         )
         
-        return await self.get_inventory(product_id)
+        return self._build_response(inv, product["name"] if product else None)
     
     async def reserve_stock(self, product_id: str, quantity: int, order_id: str) -> bool:
         """Reserve stock for an order"""
-        inv = await self.inventory.find_one({"product_id": product_id}, {"_id": 0})
-        
-        if not inv:
-            raise ValueError("Inventory record not found")
-        
-        available = inv["quantity"] - inv.get("reserved", 0)
-        if available < quantity:
-            raise ValueError("Insufficient stock")
-        
-        await self.inventory.update_one(
-            {"product_id": product_id},
+        # Reserve only if enough unreserved stock remains, atomically
+        inv = await self.inventory.find_one_and_update(
+            {
+                "product_id": product_id,
+                "$expr": {"$gte": [AVAILABLE_STOCK_EXPR, quantity]}
+            },
             {
                 "$inc": {"reserved": quantity},
                 "$set": {"updated_at": datetime.now(timezone.utc).isoformat()}
-            }
+            },
+            projection={"_id": 0},
+            return_document=ReturnDocument.AFTER
         )
         
+        if not inv:
+            await self._raise_update_failed(product_id)
+        
         # Record movement
         await self._record_movement(
             product_id=product_id,
@@ -122,35 +118,101 @@ class InventoryService:
         
         return True
     
+    async def reserve_stock_batch(self, quantities: Dict[str, int], order_id: str):
+        """Reserve stock for every line of an order, all or nothing
+        
+        All lines are reserved with one unordered bulk write. Each line also
+        records a hold keyed by the order ID, so a retry cannot reserve twice
+        and a partial failure can be undone exactly.
+        """
+        now = datetime.now(timezone.utc).isoformat()
+        hold = f"holds.{order_id}"
+        
+        try:
+            result = await self.inventory.bulk_write([
+                UpdateOne(
+                    {
+                        "product_id": product_id,
+                        hold: {"$exists": False},
+                        "$expr": {"$gte": [AVAILABLE_STOCK_EXPR, quantity]}
+                    },
+                    {
+                        "$inc": {"reserved": quantity},
+                        "$set": {hold: quantity, "updated_at": now}
+                    }
+                )
+                for product_id, quantity in quantities.items()
+            ], ordered=False)
+        except Exception:
+            # Lines may have reserved before the write failed; their holds say which
+            await self.release_stock_batch(quantities, order_id)
+            raise
+        
+        inventories = await self.inventory.find(
+            {"product_id": {"$in": list(quantities)}},
+            {"_id": 0, "product_id": 1, "quantity": 1, "reserved": 1, "holds": 1}
+        ).to_list(len(quantities))
+        
+        if result.modified_count < len(quantities):
+            # Undo the lines that did reserve, then report the ones that could not
+            await self.release_stock_batch(quantities, order_id)
+            by_product = {inv["product_id"]: inv for inv in inventories}
+            shortages = {}
+            for product_id in quantities:
+                inv = by_product.get(product_id)
+                if inv is None or order_id not in inv.get("holds", {}):
+                    shortages[product_id] = inv["quantity"] - inv.get("reserved", 0) if inv else 0
+            raise InsufficientStockError(shortages)
+        
+        # Record movements
+        await self.movements.insert_many([
+            self._movement_document(
+                product_id=inv["product_id"],
+                quantity_change=0,
+                previous_quantity=inv["quantity"],
+                new_quantity=inv["quantity"],
+                reason="Reserved for order",
+                reference_id=order_id
+            )
+            for inv in inventories
+        ])
+    
+    async def release_stock_batch(self, quantities: Dict[str, int], order_id: str):
+        """Release the holds `reserve_stock_batch` placed for an order"""
+        hold = f"holds.{order_id}"
+        await self.inventory.bulk_write([
+            UpdateOne(
+                {"product_id": product_id, hold: {"$exists": True}},
+                {"$inc": {"reserved": -quantity}, "$unset": {hold: ""}}
+            )
+            for product_id, quantity in quantities.items()
+        ], ordered=False)
+    
     async def confirm_reservation(self, product_id: str, quantity: int, order_id: str) -> bool:
         """Confirm reservation - deduct from actual stock"""
-        inv = await self.inventory.find_one({"product_id": product_id}, {"_id": 0})
+        # Deduct only if the stock is there, so quantity never goes negative
+        inv = await self.inventory.find_one_and_update(
+            {"product_id": product_id, "quantity": {"$gte": quantity}},
+            [
+                {"$set": {
+                    "quantity": {"$subtract": ["$quantity", quantity]},
+                    "reserved": {"$max": [0, {"$subtract": [{"$ifNull": ["$reserved", 0]}, quantity]}]},
+                    "updated_at": datetime.now(timezone.utc).isoformat()
+                }},
+                {"$unset": f"holds.{order_id}"},
+            ],
+            projection={"_id": 0},
+            return_document=ReturnDocument.AFTER
+        )
         
         if not inv:
-            raise ValueError("Inventory record not found")
+            await self._raise_update_failed(product_id)
         
-        previous_qty = inv["quantity"]
-        new_qty = previous_qty - quantity
-        new_reserved = max(0, inv.get("reserved", 0) - quantity)
-        
-        await self.inventory.update_one(
-            {"product_id": product_id},
-            {"$set": {
-                "quantity": new_qty,
-                "reserved": new_reserved,
-                "updated_at": datetime.now(timezone.utc).isoformat()
-            }}
-        )
+        new_qty = inv["quantity"]
+        previous_qty = new_qty + quantity
         
         # Update product stock
-        await self.products.update_one(
-            {"id": product_id},
-            {"$set": {
-                "stock": new_qty,
-                "in_stock": new_qty > 0,
-                "updated_at": datetime.now(timezone.utc).isoformat()
-            }}
-        )
+        await self._apply_product_stock_change(product_id, inv)
         
         # Record movement
         await self._record_movement(
@@ -166,22 +228,21 @@ class InventoryService:
     
     async def release_reservation(self, product_id: str, quantity: int, order_id: str) -> bool:
         """Release reserved stock (e.g., order cancelled)"""
-        await self.inventory.update_one(
+        # Release without letting reserved go negative
+        inv = await self.inventory.find_one_and_update(
             {"product_id": product_id},
-            {
-                "$inc": {"reserved": -quantity},
-                "$set": {"updated_at": datetime.now(timezone.utc).isoformat()}
-            }
-        )
-        
-        # Make sure reserved doesn't go negative
-        await self.inventory.update_one(
-            {"product_id": product_id, "reserved": {"$lt": 0}},
-            {"$set": {"reserved": 0}}
+            [
+                {"$set": {
+                    "reserved": {"$max": [0, {"$subtract": [{"$ifNull": ["$reserved", 0]}, quantity]}]},
+                    "updated_at": datetime.now(timezone.utc).isoformat()
+                }},
+                {"$unset": f"holds.{order_id}"},
+            ],
+            projection={"_id": 0},
+            return_document=ReturnDocument.AFTER
         )
         
         # Record movement
-        inv = await self.inventory.find_one({"product_id": product_id}, {"_id": 0})
         await self._record_movement(
             product_id=product_id,
             quantity_change=0,
@@ -193,6 +254,54 @@ class InventoryService:
         
         return True
     
+    async def _apply_product_stock_change(self, product_id: str, inv: dict) -> Optional[dict]:
+        """Copy the quantity of an updated inventory document onto the product, returning its name"""
+        # Set from the inventory rather than increment, so the product cannot drift from it;
+        # the inventory's update time keeps a slower, older change from overwriting a newer one
+        synced_at = inv["updated_at"]
+        product = await self.products.find_one_and_update(
+            {
+                "id": product_id,
+                "$or": [{"stock_synced_at": {"$lte": synced_at}}, {"stock_synced_at": {"$exists": False}}]
+            },
+            {"$set": {
+                "stock": inv["quantity"],
+                "in_stock": inv["quantity"] > 0,
+                "stock_synced_at": synced_at,
+                "updated_at": datetime.now(timezone.utc).isoformat()
+            }},
+            projection={"_id": 0, "name": 1}
+        )
+        if product is None:
+            product = await self.products.find_one({"id": product_id}, {"_id": 0, "name": 1})
+        catalog_cache.invalidate("product", product_id)
+        catalog_cache.invalidate("detail", product_id)
+        return product
+    
+    async def _raise_update_failed(self, product_id: str):
+        """Explain why a guarded inventory update matched nothing"""
+        if not await self.inventory.find_one({"product_id": product_id}, {"_id": 1}):
+            raise ValueError("Inventory record not found")
+        raise ValueError("Insufficient stock")
+    
+    def _build_response(self, inv: dict, product_name: Optional[str]) -> InventoryResponse:
+        """Build an InventoryResponse from an inventory document"""
+        available = inv["quantity"] - inv.get("reserved", 0)
+        
+        return InventoryResponse(
+            id=inv["id"],
+            product_id=inv["product_id"],
+            product_name=product_name,
+            quantity=inv["quantity"],
+            reserved=inv.get("reserved", 0),
+            available=available,
+            low_stock_threshold=inv.get("low_stock_threshold", 10),
+            is_low_stock=available <= inv.get("low_stock_threshold", 10),
+            is_out_of_stock=available <= 0,
+            updated_at=inv.get("updated_at") or datetime.now(timezone.utc),
+        )
+    
+    @coalesced
     async def get_low_stock_products(self) -> list:
         """Get all products with low stock"""
         pipeline = [
@@ -212,7 +321,7 @@ class InventoryService:
                     "product_name": "$product.name",
                     "quantity": 1,
                     "reserved": 1,
-                    "available": {"$subtract": ["$quantity", {"$ifNull": ["$reserved", 0]}]},
+                    "available": AVAILABLE_STOCK_EXPR,
                     "low_stock_threshold": 1,
                 }
             },
@@ -237,7 +346,24 @@ class InventoryService:
         created_by: Optional[str] = None
     ):
         """Record a stock movement"""
-        movement = {
+        movement = self._movement_document(
+            product_id, quantity_change, previous_quantity, new_quantity,
+            reason, reference_id, created_by
+        )
+        await self.movements.insert_one(movement)
+    
+    def _movement_document(
+        self,
+        product_id: str,
+        quantity_change: int,
+        previous_quantity: int,
+        new_quantity: int,
+        reason: str,
+        reference_id: Optional[str] = None,
+        created_by: Optional[str] = None
+    ) -> dict:
+        """Build a stock movement document"""
+        return {
             "id": str(uuid.uuid4()),
             "product_id": product_id,
             "quantity_change": quantity_change,
@@ -248,4 +374,3 @@ class InventoryService:
             "created_by": created_by,
             "created_at": datetime.now(timezone.utc).isoformat(),
         }
-        await self.movements.insert_one(movement)
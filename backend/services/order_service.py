@@ -1,18 +1,23 @@
 from typing import Optional, List
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
+import asyncio
 import uuid
 import random
 import string
+import logging
 from config.database import get_db, COLLECTIONS
 from config.settings import settings
 from models.order import (
     OrderCreate, OrderResponse, OrderListResponse, OrderStatus, 
-    PaymentStatus, OrderItem, OrderStatusUpdate
+    PaymentStatus, PaymentMethod, OrderItem, OrderStatusUpdate
 )
 from services.cart_service import CartService
-from services.inventory_service import InventoryService
+from services.inventory_service import InventoryService, InsufficientStockError
+from services.co_purchase_service import CoPurchaseService
 from utils.email import EmailService
 
+logger = logging.getLogger(__name__)
+
 class OrderService:
     def __init__(self):
         self.db = get_db()
@@ -20,6 +25,7 @@ class OrderService:
         self.users = self.db[COLLECTIONS['users']]
         self.cart_service = CartService()
         self.inventory_service = InventoryService()
+        self.co_purchase_service = CoPurchaseService()
     
     def _generate_order_number(self) -> str:
         """Generate unique order number"""
@@ -35,11 +41,18 @@ class OrderService:
         if not cart.items:
             raise ValueError("Cart is empty")
         
-        # Check inventory for all items
+        order_id = str(uuid.uuid4())
+        
+        # Reserve inventory for every item at once; nothing is held if any item is short
+        quantities = {}
         for item in cart.items:
-            available = await self.inventory_service.get_available_stock(item.product_id)
-            if available < item.quantity:
-                raise ValueError(f"Insufficient stock for {item.name}. Available: {available}")
+            quantities[item.product_id] = quantities.get(item.product_id, 0) + item.quantity
+        
+        try:
+            await self.inventory_service.reserve_stock_batch(quantities, order_id)
+        except InsufficientStockError as e:
+            item = next(item for item in cart.items if item.product_id in e.shortages)
+            raise ValueError(f"Insufficient stock for {item.name}. Available: {e.shortages[item.product_id]}")
         
         # Create order items
         order_items = [
@@ -61,7 +74,6 @@ class OrderService:
         total = round(subtotal + tax + shipping_fee - cart.discount, 2)
         
         # Create order
-        order_id = str(uuid.uuid4())
         order_number = self._generate_order_number()
         
         order_dict = {
@@ -88,15 +100,12 @@ class OrderService:
             "delivered_at": None,
         }
         
-        await self.orders.insert_one(order_dict)
-        
-        # Reserve inventory
-        for item in cart.items:
-            await self.inventory_service.reserve_stock(
-                item.product_id, 
-                item.quantity,
-                order_id
-            )
+        try:
+            await self.orders.insert_one(order_dict)
+        except Exception:
+            # Don't leave stock held for an order that was never created
+            await self.inventory_service.release_stock_batch(quantities, order_id)
+            raise
         
         return OrderResponse(**order_dict)
     
@@ -192,22 +201,30 @@ class OrderService:
         return order
     
     async def confirm_order(self, order_id: str) -> Optional[OrderResponse]:
-        """Confirm order after payment"""
-        order = await self.get_order(order_id)
-        if not order:
-            return None
-        
-        # Update order status
-        update_dict = {
-            "status": OrderStatus.CONFIRMED.value,
-            "payment_status": PaymentStatus.COMPLETED.value,
-            "updated_at": datetime.now(timezone.utc).isoformat(),
-        }
-        
-        await self.orders.update_one(
-            {"id": order_id},
-            {"$set": update_dict}
+        """Confirm order after payment
+        
+        Only a pending order moves to confirmed, atomically, so stock is
+        deducted and the purchase counted once however often this is called.
+        Raises ValueError for a cancelled order.
+        """
+        now = datetime.now(timezone.utc).isoformat()
+        order = await self.orders.find_one_and_update(
+            {"id": order_id, "status": OrderStatus.PENDING.value},
+            {"$set": {
+                "status": OrderStatus.CONFIRMED.value,
+                "payment_status": PaymentStatus.COMPLETED.value,
+                "confirmed_at": now,
+                "updated_at": now,
+            }},
+            projection={"_id": 0}
         )
+        if not order:
+            # Missing, confirmed already, or cancelled, which a payment must not revive
+            existing = await self.get_order(order_id)
+            if existing and existing.status in (OrderStatus.CANCELLED, OrderStatus.REFUNDED):
+                raise ValueError(f"Cannot confirm order with status: {existing.status.value}")
+            return existing
+        order = OrderResponse(**order)
         
         # Confirm inventory reservation (deduct from actual stock)
         for item in order.items:
@@ -220,6 +237,12 @@ class OrderService:
         # Clear user's cart
         await self.cart_service.clear_cart(order.user_id)
         
+        # Count the purchase for "frequently bought together"; a failure here must not fail the order
+        try:
+            await self.co_purchase_service.record_order([item.product_id for item in order.items])
+        except Exception as e:
+            logger.error(f"Failed to record co-purchases for order {order_id}: {e}")
+        
         # Send confirmation email
         user = await self.users.find_one({"id": order.user_id}, {"_id": 0})
         if user and user.get("email"):
@@ -264,3 +287,56 @@ class OrderService:
         )
         
         return await self.get_order(order_id)
+    
+    async def expire_pending_orders(self) -> int:
+        """Cancel unpaid orders older than PENDING_ORDER_EXPIRY_MINUTES and release their stock
+        
+        Cash on delivery orders are paid on delivery, so they are left pending.
+        Returns the number of orders expired.
+        """
+        cutoff = datetime.now(timezone.utc) - timedelta(minutes=settings.PENDING_ORDER_EXPIRY_MINUTES)
+        stale = self.orders.find(
+            {
+                "status": OrderStatus.PENDING.value,
+                "payment_status": PaymentStatus.PENDING.value,
+                "payment_method": {"$ne": PaymentMethod.COD.value},
+                "created_at": {"$lt": cutoff.isoformat()},
+            },
+            {"_id": 0, "id": 1, "items": 1}
+        )
+        
+        expired = 0
+        async for order in stale:
+            # Only if still unpaid and pending, so an order paid or cancelled since is left alone
+            result = await self.orders.update_one(
+                {
+                    "id": order["id"],
+                    "status": OrderStatus.PENDING.value,
+                    "payment_status": PaymentStatus.PENDING.value,
+                },
+                {"$set": {
+                    "status": OrderStatus.CANCELLED.value,
+                    "updated_at": datetime.now(timezone.utc).isoformat(),
+                }}
+            )
+            if not result.modified_count:
+                continue
+            
+            quantities = {}
+            for item in order["items"]:
+                quantities[item["product_id"]] = quantities.get(item["product_id"], 0) + item["quantity"]
+            await self.inventory_service.release_stock_batch(quantities, order["id"])
+            expired += 1
+        
+        if expired:
+            logger.info(f"Expired {expired} unpaid orders")
+        return expired
+    
+    async def expire_pending_periodically(self, interval_seconds: int):
+        """Expire unpaid orders now and then every `interval_seconds` until cancelled"""
+        while True:
+            try:
+                await self.expire_pending_orders()
+            except Exception as e:
+                logger.error(f"Expiring unpaid orders failed: {e}")
+            await asyncio.sleep(interval_seconds)
@@ -7,7 +7,7 @@ from config.database import get_db, COLLECTIONS
 from config.settings import settings
 from models.order import (
     PaymentCreate, RazorpayOrderResponse, PaymentVerify, 
-    PaymentResponse, PaymentStatus
+    PaymentResponse, PaymentStatus, OrderStatus
 )
 
 # Import razorpay if available
@@ -45,6 +45,9 @@ class PaymentService:
         if order["payment_status"] == PaymentStatus.COMPLETED.value:
             raise ValueError("Order already paid")
         
+        if order["status"] != OrderStatus.PENDING.value:
+            raise ValueError(f"Cannot pay for order with status: {order['status']}")
+        
         amount_paise = int(order["total"] * 100)  # Convert to paise
         
         if self.razorpay_client:
@@ -113,6 +116,9 @@ class PaymentService:
         if payment["status"] == PaymentStatus.COMPLETED.value:
             raise ValueError("Payment already completed")
         
+        if payment["status"] == PaymentStatus.REFUNDED.value:
+            raise ValueError("Payment was refunded")
+        
         # Verify signature
         if self.razorpay_client and settings.RAZORPAY_KEY_SECRET:
             try:
@@ -133,6 +139,11 @@ class PaymentService:
             # In real scenario, verify the signature
             pass
         
+        # Update order payment status; an order cancelled (or expired) meanwhile is refunded
+        if not await self._mark_order_paid(payment["order_id"], payment_data.razorpay_payment_id):
+            await self._refund(payment, payment_data.razorpay_payment_id)
+            raise ValueError("Order was cancelled before payment completed; the payment has been refunded")
+        
         # Update payment record
         await self.payments.update_one(
             {"id": payment["id"]},
@@ -144,18 +155,41 @@ class PaymentService:
             }}
         )
         
-        # Update order payment status
-        await self.orders.update_one(
-            {"id": payment["order_id"]},
+        updated_payment = await self.payments.find_one({"id": payment["id"]}, {"_id": 0})
+        return PaymentResponse(**updated_payment)
+    
+    async def _mark_order_paid(self, order_id: str, razorpay_payment_id: str) -> bool:
+        """Record a payment on its order, if the order is still pending
+        
+        Expiry only cancels orders whose payment is pending, so once this
+        succeeds the order keeps its reserved stock. False if the order was
+        cancelled or paid by another payment first.
+        """
+        result = await self.orders.update_one(
+            {"id": order_id, "status": OrderStatus.PENDING.value},
             {"$set": {
                 "payment_status": PaymentStatus.COMPLETED.value,
-                "payment_id": payment_data.razorpay_payment_id,
+                "payment_id": razorpay_payment_id,
                 "updated_at": datetime.now(timezone.utc).isoformat()
             }}
         )
-        
-        updated_payment = await self.payments.find_one({"id": payment["id"]}, {"_id": 0})
-        return PaymentResponse(**updated_payment)
+        if result.matched_count:
+            return True
+        # Already recorded, e.g. by verification before the webhook arrived
+        return await self.orders.count_documents({"id": order_id, "payment_id": razorpay_payment_id}, limit=1) > 0
+    
+    async def _refund(self, payment: dict, razorpay_payment_id: str):
+        """Refund a payment whose order can no longer be fulfilled, once"""
+        result = await self.payments.update_one(
+            {"id": payment["id"], "status": {"$ne": PaymentStatus.REFUNDED.value}},
+            {"$set": {
+                "status": PaymentStatus.REFUNDED.value,
+                "razorpay_payment_id": razorpay_payment_id,
+                "refunded_at": datetime.now(timezone.utc).isoformat(),
+            }}
+        )
+        if result.modified_count and self.razorpay_client:
+            self.razorpay_client.payment.refund(razorpay_payment_id, {"amount": int(payment["amount"] * 100)})
     
     async def get_payment_by_order(self, order_id: str) -> Optional[PaymentResponse]:
         """Get payment record for an order"""
@@ -185,25 +219,20 @@ class PaymentService:
             razorpay_order_id = payment_entity.get("order_id")
             razorpay_payment_id = payment_entity.get("id")
             
-            await self.payments.update_one(
-                {"razorpay_order_id": razorpay_order_id},
-                {"$set": {
-                    "status": PaymentStatus.COMPLETED.value,
-                    "razorpay_payment_id": razorpay_payment_id,
-                    "completed_at": datetime.now(timezone.utc).isoformat(),
-                }}
-            )
-            
-            # Update order
             payment = await self.payments.find_one({"razorpay_order_id": razorpay_order_id}, {"_id": 0})
-            if payment:
-                await self.orders.update_one(
-                    {"id": payment["order_id"]},
-                    {"$set": {
-                        "payment_status": PaymentStatus.COMPLETED.value,
-                        "payment_id": razorpay_payment_id,
-                    }}
-                )
+            if payment and payment["status"] != PaymentStatus.REFUNDED.value:
+                # Update order; an order cancelled (or expired) meanwhile is refunded
+                if not await self._mark_order_paid(payment["order_id"], razorpay_payment_id):
+                    await self._refund(payment, razorpay_payment_id)
+                else:
+                    await self.payments.update_one(
+                        {"id": payment["id"]},
+                        {"$set": {
+                            "status": PaymentStatus.COMPLETED.value,
+                            "razorpay_payment_id": razorpay_payment_id,
+                            "completed_at": datetime.now(timezone.utc).isoformat(),
+                        }}
+                    )
         
         elif event == "payment.failed":
             razorpay_order_id = payment_entity.get("order_id")
@@ -0,0 +1,182 @@
+"""
+Incremental parsing of product import files.
+
+CSV and NDJSON bodies arrive as a stream of byte chunks and are turned into
+rows as complete records arrive, so an import never holds the whole file.
+A CSV record ends at a newline outside quotes; quoted fields may span lines.
+Rows are numbered from 1, not counting the CSV header.
+
+`product_from_row` turns a row into a `ProductCreate`. List fields are JSON
+arrays in NDJSON or "|"-separated in either format, and the category is
+given as `category_id` or as `category` (name or slug), resolved against a
+`CategoryMap` loaded once per import.
+"""
+from typing import AsyncIterable, AsyncIterator, Dict, List, Optional, Tuple
+import codecs
+import csv
+import json
+from pydantic import ValidationError
+from models.product import ProductCreate
+
+IMPORT_FORMATS = ("csv", "ndjson")
+
+# Request content types of each format
+CONTENT_TYPES = {
+    "text/csv": "csv",
+    "application/csv": "csv",
+    "application/x-ndjson": "ndjson",
+    "application/ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+    "application/json-lines": "ndjson",
+}
+
+LIST_FIELDS = ("images", "features")
+LIST_SEPARATOR = "|"
+
+# One row: its number, its fields, or why it could not be read
+ImportRow = Tuple[int, Optional[dict], Optional[str]]
+
+def format_for_content_type(content_type: Optional[str]) -> Optional[str]:
+    """Import format of a request content type, if it names one"""
+    if not content_type:
+        return None
+    return CONTENT_TYPES.get(content_type.split(";")[0].strip().lower())
+
+async def _lines(chunks: AsyncIterable[bytes]) -> AsyncIterator[str]:
+    """Decoded lines, newline included, as their bytes arrive; a BOM is dropped"""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    pending = ""
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        lines = pending.split("\n")
+        # The last line may still be incomplete
+        pending = lines.pop()
+        for line in lines:
+            yield line + "\n"
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+async def _csv_records(chunks: AsyncIterable[bytes]) -> AsyncIterator[str]:
+    """Complete CSV records; a record continues while it has an open quote"""
+    record = ""
+    async for line in _lines(chunks):
+        record += line
+        if record.count('"') % 2 == 0:
+            yield record
+            record = ""
+    if record:
+        yield record
+
+async def csv_rows(chunks: AsyncIterable[bytes]) -> AsyncIterator[ImportRow]:
+    """Rows of a CSV file with a header line, as dicts keyed by column name"""
+    header = None
+    row_number = 0
+    async for record in _csv_records(chunks):
+        values = next(csv.reader([record]), [])
+        if not any(value.strip() for value in values):
+            continue
+        if header is None:
+            header = [name.strip().lower() for name in values]
+            continue
+        row_number += 1
+        if len(values) > len(header):
+            yield row_number, None, f"Expected {len(header)} columns, found {len(values)}"
+            continue
+        yield row_number, {name: value for name, value in zip(header, values)}, None
+
+async def ndjson_rows(chunks: AsyncIterable[bytes]) -> AsyncIterator[ImportRow]:
+    """Rows of a newline-delimited JSON file, one object per line"""
+    row_number = 0
+    async for line in _lines(chunks):
+        if not line.strip():
+            continue
+        row_number += 1
+        try:
+            fields = json.loads(line)
+        except ValueError as e:
+            yield row_number, None, f"Invalid JSON: {e}"
+            continue
+        if not isinstance(fields, dict):
+            yield row_number, None, "Expected a JSON object"
+            continue
+        yield row_number, fields, None
+
+def parse_rows(chunks: AsyncIterable[bytes], import_format: str) -> AsyncIterator[ImportRow]:
+    """Rows of an import file in `import_format` ("csv" or "ndjson")"""
+    if import_format == "csv":
+        return csv_rows(chunks)
+    if import_format == "ndjson":
+        return ndjson_rows(chunks)
+    raise ValueError(f"Unsupported import format: {import_format}")
+
+class CategoryMap:
+    """Category IDs by ID, lowercase name and slug, and category names by ID"""
+
+    def __init__(self, categories: List[dict]):
+        self.names: Dict[str, str] = {}
+        self._ids: Dict[str, str] = {}
+        for category in categories:
+            self.names[category["id"]] = category["name"]
+        # IDs win over slugs, and slugs over names, when they collide
+        for category in categories:
+            self._ids.setdefault(category["name"].strip().lower(), category["id"])
+        for category in categories:
+            if category.get("slug"):
+                self._ids[category["slug"]] = category["id"]
+        for category in categories:
+            self._ids[category["id"]] = category["id"]
+
+    def resolve(self, value: str) -> Optional[str]:
+        """ID of the category a row names by ID, slug or name"""
+        value = value.strip()
+        return self._ids.get(value) or self._ids.get(value.lower())
+
+def _clean(value):
+    if isinstance(value, str):
+        value = value.strip()
+        return value or None
+    return value
+
+def product_from_row(fields: dict, categories: CategoryMap) -> ProductCreate:
+    """Validate one import row, raising ValueError with a readable reason"""
+    data = {key.strip().lower(): _clean(value) for key, value in fields.items() if isinstance(key, str)}
+    data = {key: value for key, value in data.items() if value is not None}
+
+    for field in LIST_FIELDS:
+        value = data.get(field)
+        if isinstance(value, str):
+            data[field] = [item.strip() for item in value.split(LIST_SEPARATOR) if item.strip()]
+
+    category = data.pop("category", None)
+    category_id = data.get("category_id") or category
+    if category_id is None:
+        raise ValueError("category_id or category is required")
+    resolved = categories.resolve(str(category_id))
+    if resolved is None:
+        raise ValueError(f"Unknown category: {category_id}")
+    data["category_id"] = resolved
+
+    try:
+        product = ProductCreate.model_validate(data)
+    except ValidationError as e:
+        raise ValueError("; ".join(
+            f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in e.errors()
+        ))
+
+    if product.price <= 0:
+        raise ValueError("price: must be greater than 0")
+    if product.original_price is not None and product.original_price < 0:
+        raise ValueError("original_price: must not be negative")
+    if product.stock < 0:
+        raise ValueError("stock: must not be negative")
+    return product
+
+def row_sku(fields: Optional[dict]) -> Optional[str]:
+    """The SKU a row gives, for its error report"""
+    if not fields:
+        return None
+    sku = fields.get("sku")
+    if sku is None:
+        return None
+    return str(sku).strip() or None
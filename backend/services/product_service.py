@@ -1,14 +1,64 @@
-from typing import Optional, List
+from typing import AsyncIterable, Dict, Optional, List, Tuple
+from collections import Counter
 from datetime import datetime, timezone
+import asyncio
+import logging
 import uuid
 import re
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError
 from config.database import get_db, COLLECTIONS
+from config.settings import settings
+from config.indexes import PRODUCT_SORT_OPTIONS
+from utils.pagination import encode_cursor, decode_cursor, keyset_filter
+from services.search_service import search_index
+from services.autocomplete_service import autocomplete_index
+from services.inventory_service import InventoryService
+from services.related_service import RelatedProductsService, RELATED_TEXT_FIELDS, related_index
+from services.co_purchase_service import CoPurchaseService
+from services.product_import import ImportRow, CategoryMap, product_from_row, row_sku
+from utils.cache import catalog_cache
+from utils.singleflight import coalesced
+from models.order import PaymentStatus
 from models.product import (
     ProductCreate, ProductUpdate, ProductResponse, ProductListResponse,
     CategoryCreate, CategoryResponse, CategoryWithSubs, SubCategory,
-    ReviewCreate, ReviewResponse
+    ReviewCreate, ReviewResponse, ReviewSummary, ProductWithReviews,
+    ProductFacets, BrandFacet, CategoryFacet, PriceRangeFacet,
+    AutocompleteSuggestion, AutocompleteResponse, ProductImportError, ProductImportResponse
 )
 
+logger = logging.getLogger(__name__)
+
+# Lower bounds of the price histogram buckets; the last bucket is open-ended
+PRICE_BUCKET_BOUNDARIES = [0, 500, 1000, 2500, 5000, 10000, 25000, 50000]
+
+# Star ratings reviews can give; keys of a product's rating_histogram
+RATING_STARS = ["1", "2", "3", "4", "5"]
+
+# Most helpful review IDs kept in each product's review summary, and what "most helpful"
+# means: most helpful votes, then newest. Any write that changes a review's helpful_count
+# has to refresh its product's top_review_ids with `_top_review_ids`.
+TOP_REVIEWS = 3
+TOP_REVIEWS_SORT = [("helpful_count", -1), ("created_at", -1)]
+
+# Sizes of the lists in the product detail bundle
+DETAIL_REVIEWS = 10
+DETAIL_RELATED_PRODUCTS = 8
+
+# Imports of up to this many products update the search and autocomplete indexes one
+# product at a time, and related products in one background pass; larger imports rebuild them
+IMPORT_INCREMENTAL_INDEX_LIMIT = 100
+
+# MongoDB duplicate key error code
+DUPLICATE_KEY_ERROR = 11000
+
+# Index rebuilds started by imports, referenced until they finish
+_import_rebuilds = set()
+
+def empty_rating_histogram() -> dict:
+    return {star: 0 for star in RATING_STARS}
+
 class ProductService:
     def __init__(self):
         self.db = get_db()
@@ -16,6 +66,10 @@ class ProductService:
         self.categories = self.db[COLLECTIONS['categories']]
         self.reviews = self.db[COLLECTIONS['reviews']]
         self.inventory = self.db[COLLECTIONS['inventory']]
+        self.orders = self.db[COLLECTIONS['orders']]
+        self.inventory_service = InventoryService()
+        self.related_service = RelatedProductsService()
+        self.co_purchase_service = CoPurchaseService()
     
     # ============ Categories ============
     
@@ -36,10 +90,20 @@ class ProductService:
         }
         
         await self.categories.insert_one(category_dict)
+        autocomplete_index.index_category(category_dict)
+        catalog_cache.invalidate("categories")
         return CategoryResponse(**category_dict)
     
     async def get_categories(self, include_subcategories: bool = True) -> List[CategoryWithSubs]:
         """Get all categories with optional subcategories"""
+        return await catalog_cache.get_or_load(
+            "categories", include_subcategories,
+            lambda: self._load_categories(include_subcategories)
+        )
+    
+    @coalesced
+    async def _load_categories(self, include_subcategories: bool) -> List[CategoryWithSubs]:
+        """Load categories from the database"""
         # Get main categories (no parent)
         main_categories = await self.categories.find(
             {"parent_id": None}, {"_id": 0}
@@ -72,6 +136,14 @@ class ProductService:
     
     async def get_category_by_id(self, category_id: str) -> Optional[CategoryResponse]:
         """Get category by ID"""
+        return await catalog_cache.get_or_load(
+            "category", category_id,
+            lambda: self._load_category(category_id)
+        )
+    
+    @coalesced
+    async def _load_category(self, category_id: str) -> Optional[CategoryResponse]:
+        """Load a category from the database"""
         category = await self.categories.find_one({"id": category_id}, {"_id": 0})
         if not category:
             return None
@@ -79,16 +151,10 @@ class ProductService:
     
     # ============ Products ============
     
-    async def create_product(self, product_data: ProductCreate) -> ProductResponse:
-        """Create a new product"""
+    def _product_document(self, product_data: ProductCreate, category_name: str, now: str) -> dict:
+        """Build a new product's document"""
         product_id = str(uuid.uuid4())
-        sku = product_data.sku or f"SKU-{product_id[:8].upper()}"
-        
-        # Get category name
-        category = await self.get_category_by_id(product_data.category_id)
-        category_name = category.name if category else "General"
-        
-        product_dict = {
+        return {
             "id": product_id,
             "name": product_data.name,
             "description": product_data.description,
@@ -97,7 +163,7 @@ class ProductService:
             "category_id": product_data.category_id,
             "category_name": category_name,
             "brand": product_data.brand,
-            "sku": sku,
+            "sku": product_data.sku or f"SKU-{product_id[:8].upper()}",
             "images": product_data.images,
             "image": product_data.images[0] if product_data.images else None,
             "features": product_data.features,
@@ -105,22 +171,42 @@ class ProductService:
             "in_stock": product_data.stock > 0,
             "rating": 0.0,
             "review_count": 0,
+            "rating_sum": 0,
+            "rating_histogram": empty_rating_histogram(),
+            "verified_review_count": 0,
+            "top_review_ids": [],
             "is_active": True,
-            "created_at": datetime.now(timezone.utc).isoformat(),
-            "updated_at": datetime.now(timezone.utc).isoformat(),
+            "created_at": now,
+            "updated_at": now,
         }
-        
-        await self.products.insert_one(product_dict)
-        
-        # Create inventory record
-        await self.inventory.insert_one({
+    
+    def _inventory_document(self, product_id: str, stock: int, now: str) -> dict:
+        """Build a new product's inventory record"""
+        return {
             "id": str(uuid.uuid4()),
             "product_id": product_id,
-            "quantity": product_data.stock,
+            "quantity": stock,
             "reserved": 0,
             "low_stock_threshold": 10,
-            "updated_at": datetime.now(timezone.utc).isoformat(),
-        })
+            "updated_at": now,
+        }
+    
+    async def create_product(self, product_data: ProductCreate) -> ProductResponse:
+        """Create a new product"""
+        # Get category name
+        category = await self.get_category_by_id(product_data.category_id)
+        category_name = category.name if category else "General"
+        
+        now = datetime.now(timezone.utc).isoformat()
+        product_dict = self._product_document(product_data, category_name, now)
+        
+        await self.products.insert_one(product_dict)
+        search_index.index_product(product_dict)
+        autocomplete_index.index_product(product_dict)
+        await self.related_service.refresh_product(product_dict)
+        
+        # Create inventory record
+        await self.inventory.insert_one(self._inventory_document(product_dict["id"], product_data.stock, now))
         
         # Update category product count
         await self.categories.update_one(
@@ -128,8 +214,205 @@ class ProductService:
             {"$inc": {"product_count": 1}}
         )
         
+        catalog_cache.invalidate("category", product_data.category_id)
+        catalog_cache.invalidate("categories")
+        catalog_cache.invalidate("brands")
+        
         return ProductResponse(**product_dict)
     
+    async def import_products(
+        self,
+        rows: AsyncIterable[ImportRow],
+        batch_size: Optional[int] = None,
+        dry_run: bool = False,
+        max_errors: Optional[int] = None,
+        refresh_indexes: bool = True
+    ) -> ProductImportResponse:
+        """Create products from a stream of import rows
+        
+        Rows are validated and written in batches: one SKU lookup, one
+        unordered insert_many each into products and inventory, and one
+        category count update per batch, with the next batch validated while
+        the previous one is written. Categories are resolved from one map
+        loaded at the start. A row that fails validation, repeats a SKU or
+        fails to insert is reported and skipped; the other rows are imported.
+        `max_errors` caps the errors returned, not the rows that may fail.
+        """
+        batch_size = batch_size or settings.PRODUCT_IMPORT_BATCH_SIZE
+        max_errors = settings.PRODUCT_IMPORT_MAX_ERRORS if max_errors is None else max_errors
+        categories = CategoryMap(
+            await self.categories.find({}, {"_id": 0, "id": 1, "name": 1, "slug": 1}).to_list(None)
+        )
+        
+        result = ProductImportResponse(received=0, imported=0, failed=0, dry_run=dry_run)
+        seen_skus = set()
+        touched_categories = set()
+        # Products to index one at a time; None once the import is too large for that
+        imported_products: Optional[List[dict]] = []
+        
+        async def finish(write: asyncio.Task, errors: List[ProductImportError]):
+            nonlocal imported_products
+            inserted, write_errors = await write
+            result.imported += len(inserted)
+            for error in sorted(errors + write_errors, key=lambda error: error.row):
+                result.failed += 1
+                if len(result.errors) < max_errors:
+                    result.errors.append(error)
+            if dry_run:
+                return
+            touched_categories.update(product["category_id"] for product in inserted)
+            if imported_products is not None:
+                imported_products.extend(inserted)
+                if len(imported_products) > IMPORT_INCREMENTAL_INDEX_LIMIT:
+                    imported_products = None
+        
+        batch: List[Tuple[int, ProductCreate]] = []
+        errors: List[ProductImportError] = []
+        # The previous batch's write and its validation errors
+        pending: Optional[Tuple[asyncio.Task, List[ProductImportError]]] = None
+        try:
+            async for row, fields, error in rows:
+                result.received += 1
+                if error is None:
+                    try:
+                        product = product_from_row(fields, categories)
+                        if product.sku:
+                            if product.sku in seen_skus:
+                                raise ValueError("Duplicate SKU in this import")
+                            seen_skus.add(product.sku)
+                        batch.append((row, product))
+                    except ValueError as e:
+                        error = str(e)
+                if error is not None:
+                    errors.append(ProductImportError(row=row, sku=row_sku(fields), error=error))
+                
+                if len(batch) + len(errors) >= batch_size:
+                    if pending:
+                        await finish(*pending)
+                    pending = (asyncio.create_task(self._import_batch(batch, categories, dry_run)), errors)
+                    batch, errors = [], []
+            
+            if pending:
+                await finish(*pending)
+            pending = None
+            if batch or errors:
+                await finish(asyncio.create_task(self._import_batch(batch, categories, dry_run)), errors)
+        finally:
+            # Don't leave a write running behind a failed read
+            if pending and not pending[0].done():
+                await asyncio.gather(pending[0], return_exceptions=True)
+        
+        if result.imported and not dry_run:
+            for category_id in touched_categories:
+                catalog_cache.invalidate("category", category_id)
+            catalog_cache.invalidate("categories")
+            catalog_cache.invalidate("brands")
+            if refresh_indexes:
+                await self._index_imported_products(imported_products)
+        
+        logger.info(
+            f"Product import{' (dry run)' if dry_run else ''}: {result.received} rows, "
+            f"{result.imported} imported, {result.failed} failed"
+        )
+        return result
+    
+    async def _import_batch(
+        self, batch: List[Tuple[int, ProductCreate]], categories: CategoryMap, dry_run: bool
+    ) -> Tuple[List[dict], List[ProductImportError]]:
+        """Write one batch of validated rows, returning the inserted products and the rows that failed"""
+        errors = []
+        skus = [product.sku for _, product in batch if product.sku]
+        existing = set()
+        if skus:
+            existing = {
+                doc["sku"] for doc in
+                await self.products.find({"sku": {"$in": skus}}, {"_id": 0, "sku": 1}).to_list(None)
+            }
+        
+        now = datetime.now(timezone.utc).isoformat()
+        documents = []
+        rows = []
+        for row, product in batch:
+            if product.sku in existing:
+                errors.append(ProductImportError(row=row, sku=product.sku, error="SKU already exists"))
+                continue
+            documents.append(self._product_document(product, categories.names[product.category_id], now))
+            rows.append(row)
+        
+        if dry_run or not documents:
+            return documents, errors
+        
+        # Inventory first, so no product is ever left without its record; records
+        # of products that then fail to insert are deleted
+        failed = set()
+        try:
+            await self.inventory.insert_many(
+                [self._inventory_document(product["id"], product["stock"], now) for product in documents],
+                ordered=False
+            )
+            try:
+                await self.products.insert_many(documents, ordered=False)
+            except BulkWriteError as e:
+                for write_error in e.details.get("writeErrors", []):
+                    index = write_error["index"]
+                    failed.add(index)
+                    message = "SKU already exists" if write_error.get("code") == DUPLICATE_KEY_ERROR else write_error.get("errmsg", "Insert failed")
+                    errors.append(ProductImportError(row=rows[index], sku=documents[index]["sku"], error=message))
+        except Exception:
+            await self._delete_orphaned_inventory([product["id"] for product in documents])
+            raise
+        if failed:
+            await self.inventory.delete_many({"product_id": {"$in": [documents[index]["id"] for index in failed]}})
+        
+        inserted = [document for index, document in enumerate(documents) if index not in failed]
+        if inserted:
+            category_counts = Counter(product["category_id"] for product in inserted)
+            await self.categories.bulk_write([
+                UpdateOne({"id": category_id}, {"$inc": {"product_count": count}})
+                for category_id, count in category_counts.items()
+            ], ordered=False)
+        return inserted, errors
+    
+    async def _delete_orphaned_inventory(self, product_ids: List[str]):
+        """Delete the inventory records of `product_ids` that have no product"""
+        existing = {
+            product["id"] for product in
+            await self.products.find({"id": {"$in": product_ids}}, {"_id": 0, "id": 1}).to_list(len(product_ids))
+        }
+        orphaned = [product_id for product_id in product_ids if product_id not in existing]
+        if orphaned:
+            await self.inventory.delete_many({"product_id": {"$in": orphaned}})
+    
+    async def _index_imported_products(self, products: Optional[List[dict]]):
+        """Bring in-memory indexes and related lists up to date after an import
+        
+        `products` is None when the import was too large to index one product
+        at a time: search and autocomplete are rebuilt from MongoDB in the
+        background, and so are related products if this process holds their
+        index. Other processes only read related lists; the next scheduled
+        rebuild includes the products.
+        """
+        if products is not None:
+            for product in products:
+                search_index.index_product(product)
+                autocomplete_index.index_product(product)
+            await self.related_service.refresh_products(products)
+            return
+        
+        async def rebuild_indexes():
+            try:
+                await search_index.rebuild(self.products)
+                await autocomplete_index.rebuild(self.products, self.categories)
+                if related_index.ready:
+                    await self.related_service.rebuild()
+            except Exception as e:
+                logger.error(f"Index rebuild after import failed: {e}")
+        
+        task = asyncio.create_task(rebuild_indexes())
+        _import_rebuilds.add(task)
+        task.add_done_callback(_import_rebuilds.discard)
+    
+    @coalesced
     async def get_products(
         self,
         page: int = 1,
@@ -140,9 +423,20 @@ class ProductService:
         min_price: Optional[float] = None,
         max_price: Optional[float] = None,
         sort_by: str = "default",
-        in_stock_only: bool = False
+        in_stock_only: bool = False,
+        cursor: Optional[str] = None,
+        include_total: bool = True,
+        facets: bool = False
     ) -> ProductListResponse:
-        """Get products with filtering, sorting, and pagination"""
+        """Get products with filtering, sorting, and pagination
+        
+        Passing `cursor` (an empty string for the first page) switches to
+        keyset pagination: `page` is ignored and each response carries the
+        `next_cursor` to request the following page with.
+        
+        With `facets`, brand, category, price and stock counts for the
+        filtered result set are returned alongside the page.
+        """
         query = {"is_active": True}
         
         # Filters
@@ -152,12 +446,18 @@ class ProductService:
         if brand:
             query["brand"] = brand
         
+        ranked_ids = None
         if search:
-            query["$or"] = [
-                {"name": {"$regex": search, "$options": "i"}},
-                {"description": {"$regex": search, "$options": "i"}},
-                {"brand": {"$regex": search, "$options": "i"}},
-            ]
+            if search_index.ready:
+                # Every match comes from the in-memory index; MongoDB applies the other filters
+                ranked_ids = [pid for pid, _ in search_index.search(search)]
+            else:
+                pattern = re.escape(search)
+                query["$or"] = [
+                    {"name": {"$regex": pattern, "$options": "i"}},
+                    {"description": {"$regex": pattern, "$options": "i"}},
+                    {"brand": {"$regex": pattern, "$options": "i"}},
+                ]
         
         if min_price is not None:
             query["price"] = query.get("price", {})
@@ -170,40 +470,306 @@ class ProductService:
         if in_stock_only:
             query["in_stock"] = True
         
-        # Sorting
-        sort_options = {
-            "default": [("created_at", -1)],
-            "price_asc": [("price", 1)],
-            "price_desc": [("price", -1)],
-            "rating": [("rating", -1)],
-            "newest": [("created_at", -1)],
-            "name_asc": [("name", 1)],
-            "name_desc": [("name", -1)],
-        }
-        sort = sort_options.get(sort_by, sort_options["default"])
+        # Sorting (each option is backed by an index, see config/indexes.py)
+        if sort_by not in PRODUCT_SORT_OPTIONS:
+            sort_by = "default"
+        sort = PRODUCT_SORT_OPTIONS[sort_by]
+        
+        # Search results keep relevance order unless another sort (or a cursor) was asked for
+        if ranked_ids is not None and sort_by == "default" and cursor is None:
+            return await self._get_products_by_relevance(query, ranked_ids, page, page_size, include_total, facets)
+        if ranked_ids is not None:
+            query["id"] = {"$in": ranked_ids}
+        
+        if cursor is not None:
+            return await self._get_products_by_cursor(query, sort, sort_by, cursor, page_size, include_total, facets)
+        
+        skip = (page - 1) * page_size
+        if facets:
+            return await self._get_products_with_facets(query, sort, skip, page, page_size)
+        
+        # Count total alongside the page query
+        page_query = self.products.find(query, {"_id": 0}).sort(sort).skip(skip).limit(page_size).to_list(page_size)
+        products, total = await asyncio.gather(page_query, self._count_products(query, include_total))
+        
+        return ProductListResponse(
+            products=[ProductResponse(**p) for p in products],
+            total=total,
+            page=page,
+            page_size=page_size,
+            total_pages=(total + page_size - 1) // page_size if total is not None else None
+        )
+    
+    async def _get_products_by_cursor(
+        self,
+        query: dict,
+        sort: list,
+        sort_by: str,
+        cursor: str,
+        page_size: int,
+        include_total: bool,
+        facets: bool = False
+    ) -> ProductListResponse:
+        """Get the page of products following `cursor` (keyset pagination)"""
+        page_query = query
+        if cursor:
+            values = decode_cursor(cursor, sort_by, sort)
+            page_query = {"$and": [query, keyset_filter(sort, values)]}
         
-        # Count total
-        total = await self.products.count_documents(query)
+        # Fetch one extra row to learn whether another page exists
+        rows = self.products.find(page_query, {"_id": 0}).sort(sort).limit(page_size + 1).to_list(page_size + 1)
+        products, total, facet_counts = await asyncio.gather(
+            rows, self._count_products(query, include_total), self._get_facets(query, facets)
+        )
+        
+        next_cursor = None
+        if len(products) > page_size:
+            products = products[:page_size]
+            next_cursor = encode_cursor(sort_by, sort, products[-1])
+        
+        return ProductListResponse(
+            products=[ProductResponse(**p) for p in products],
+            total=total,
+            page=None,
+            page_size=page_size,
+            total_pages=(total + page_size - 1) // page_size if total is not None else None,
+            next_cursor=next_cursor,
+            facets=facet_counts
+        )
+    
+    async def _get_products_by_relevance(
+        self,
+        query: dict,
+        ranked_ids: List[str],
+        page: int,
+        page_size: int,
+        include_total: bool = True,
+        facets: bool = False
+    ) -> ProductListResponse:
+        """Get a page of search results in search index relevance order
         
-        # Get paginated results
+        The other filters are applied to the ranked matches a batch at a time,
+        until the page is filled (or, for the total, every match is checked).
+        """
         skip = (page - 1) * page_size
-        products = await self.products.find(query, {"_id": 0}).sort(sort).skip(skip).limit(page_size).to_list(page_size)
+        ordered_ids, exhausted = await self._filter_ranked_ids(
+            query, ranked_ids, None if include_total else skip + page_size
+        )
+        page_ids = ordered_ids[skip:skip + page_size]
+        products, facet_counts = await asyncio.gather(
+            self.products.find({"id": {"$in": page_ids}}, {"_id": 0}).to_list(len(page_ids)),
+            self._get_facets({**query, "id": {"$in": ranked_ids}}, facets)
+        )
+        position = {pid: i for i, pid in enumerate(page_ids)}
+        products.sort(key=lambda p: position[p["id"]])
         
+        total = len(ordered_ids) if exhausted else None
         return ProductListResponse(
             products=[ProductResponse(**p) for p in products],
             total=total,
             page=page,
             page_size=page_size,
-            total_pages=(total + page_size - 1) // page_size
+            total_pages=(total + page_size - 1) // page_size if total is not None else None,
+            facets=facet_counts
         )
     
+    async def _filter_ranked_ids(self, query: dict, ranked_ids: List[str], needed: Optional[int]) -> Tuple[List[str], bool]:
+        """The ranked IDs matching `query`, in rank order, and whether every one was checked
+        
+        Checks SEARCH_CANDIDATE_BATCH_SIZE IDs per query, stopping once
+        `needed` match (None checks them all).
+        """
+        batch_size = settings.SEARCH_CANDIDATE_BATCH_SIZE
+        matched = []
+        for start in range(0, len(ranked_ids), batch_size):
+            if needed is not None and len(matched) >= needed:
+                return matched, False
+            batch = ranked_ids[start:start + batch_size]
+            found = {
+                p["id"] for p in
+                await self.products.find({**query, "id": {"$in": batch}}, {"_id": 0, "id": 1}).to_list(len(batch))
+            }
+            matched.extend(pid for pid in batch if pid in found)
+        return matched, True
+    
+    async def _get_products_with_facets(
+        self,
+        query: dict,
+        sort: list,
+        skip: int,
+        page: int,
+        page_size: int
+    ) -> ProductListResponse:
+        """Get a page, its total and the facet counts in one aggregation"""
+        pipeline = [
+            {"$match": query},
+            {"$sort": dict(sort)},  # Before $facet so the sort index is used
+            {"$facet": {
+                "page": [{"$skip": skip}, {"$limit": page_size}, {"$project": {"_id": 0}}],
+                "total": [{"$count": "count"}],
+                **self._facet_stages(),
+            }},
+        ]
+        
+        result = (await self.products.aggregate(pipeline, allowDiskUse=True).to_list(1))[0]
+        total = result["total"][0]["count"] if result["total"] else 0
+        
+        return ProductListResponse(
+            products=[ProductResponse(**p) for p in result["page"]],
+            total=total,
+            page=page,
+            page_size=page_size,
+            total_pages=(total + page_size - 1) // page_size,
+            facets=self._parse_facets(result)
+        )
+    
+    async def _get_facets(self, query: dict, enabled: bool = True) -> Optional[ProductFacets]:
+        """Get facet counts for `query` on their own, or None when not requested"""
+        if not enabled:
+            return None
+        pipeline = [{"$match": query}, {"$facet": self._facet_stages()}]
+        result = (await self.products.aggregate(pipeline, allowDiskUse=True).to_list(1))[0]
+        return self._parse_facets(result)
+    
+    def _facet_stages(self) -> dict:
+        """`$facet` sub-pipelines for brand, category, price and stock counts"""
+        return {
+            "brands": [
+                {"$match": {"brand": {"$nin": [None, ""]}}},
+                {"$group": {"_id": "$brand", "count": {"$sum": 1}}},
+                {"$sort": {"count": -1, "_id": 1}},
+            ],
+            "categories": [
+                {"$group": {"_id": "$category_id", "name": {"$first": "$category_name"}, "count": {"$sum": 1}}},
+                {"$sort": {"count": -1, "_id": 1}},
+            ],
+            "price_ranges": [
+                # Only numeric prices in range, so the default bucket holds nothing but the top range
+                {"$match": {"price": {"$type": "number", "$gte": PRICE_BUCKET_BOUNDARIES[0]}}},
+                {"$bucket": {
+                    "groupBy": "$price",
+                    "boundaries": PRICE_BUCKET_BOUNDARIES,
+                    "default": PRICE_BUCKET_BOUNDARIES[-1],  # Prices at or above the last boundary
+                    "output": {"count": {"$sum": 1}},
+                }},
+            ],
+            "stock": [
+                {"$group": {"_id": "$in_stock", "count": {"$sum": 1}}},
+            ],
+        }
+    
+    def _parse_facets(self, result: dict) -> ProductFacets:
+        """Convert `$facet` output into ProductFacets"""
+        upper_bounds = dict(zip(PRICE_BUCKET_BOUNDARIES, PRICE_BUCKET_BOUNDARIES[1:]))
+        stock = {row["_id"]: row["count"] for row in result["stock"]}
+        
+        return ProductFacets(
+            brands=[BrandFacet(brand=row["_id"], count=row["count"]) for row in result["brands"]],
+            categories=[
+                CategoryFacet(id=row["_id"], name=row.get("name"), count=row["count"])
+                for row in result["categories"] if row["_id"]
+            ],
+            price_ranges=[
+                PriceRangeFacet(min=row["_id"], max=upper_bounds.get(row["_id"]), count=row["count"])
+                for row in result["price_ranges"]
+            ],
+            in_stock=stock.get(True, 0),
+            out_of_stock=stock.get(False, 0),
+        )
+    
+    async def _count_products(self, query: dict, include_total: bool) -> Optional[int]:
+        """Count products matching `query`, or None when the total was not requested"""
+        if not include_total:
+            return None
+        return await self.products.count_documents(query)
+    
     async def get_product_by_id(self, product_id: str) -> Optional[ProductResponse]:
         """Get product by ID"""
+        return await catalog_cache.get_or_load(
+            "product", product_id,
+            lambda: self._load_product(product_id)
+        )
+    
+    @coalesced
+    async def _load_product(self, product_id: str) -> Optional[ProductResponse]:
+        """Load an active product from the database"""
         product = await self.products.find_one({"id": product_id, "is_active": True}, {"_id": 0})
         if not product:
             return None
         return ProductResponse(**product)
     
+    async def get_product_detail(self, product_id: str) -> Optional[ProductWithReviews]:
+        """Get everything a product page shows in one call
+        
+        Bundles the product, its first page of reviews, review summary,
+        available stock and related products, cached as one entry.
+        """
+        return await catalog_cache.get_or_load(
+            "detail", product_id,
+            lambda: self._load_product_detail(product_id)
+        )
+    
+    @coalesced
+    async def _load_product_detail(self, product_id: str) -> Optional[ProductWithReviews]:
+        """Load the product page bundle, fetching its parts concurrently"""
+        product = await self.get_product_by_id(product_id)
+        if not product:
+            return None
+        
+        reviews, available_stock, related_products = await asyncio.gather(
+            self.get_product_reviews(product_id, 1, DETAIL_REVIEWS),
+            self.inventory_service.get_available_stock(product_id),
+            self.get_related_products(product, DETAIL_RELATED_PRODUCTS),
+        )
+        
+        return ProductWithReviews(
+            **product.model_dump(),
+            reviews=reviews,
+            review_summary=self._build_review_summary(product),
+            available_stock=available_stock,
+            related_products=related_products,
+        )
+    
+    async def get_related_products(self, product: ProductResponse, limit: int) -> List[ProductResponse]:
+        """Most similar products by content, falling back to top-rated products in the same category"""
+        related_ids = await self.related_service.get_related_ids(product.id)
+        if related_ids:
+            products, _ = await self.get_products_by_ids(related_ids[:limit])
+            if products:
+                return products
+        
+        products = await self.products.find(
+            {"category_id": product.category_id, "is_active": True, "id": {"$ne": product.id}},
+            {"_id": 0}
+        ).sort([("rating", -1), ("id", -1)]).limit(limit).to_list(limit)
+        return [ProductResponse(**p) for p in products]
+    
+    async def get_frequently_bought_together(self, product_id: str, limit: int) -> List[ProductResponse]:
+        """Products most often bought in the same order as a product"""
+        companion_ids = await self.co_purchase_service.get_companion_ids(product_id)
+        products, _ = await self.get_products_by_ids(companion_ids[:limit])
+        return products
+    
+    async def get_products_by_ids(self, product_ids: List[str]) -> Tuple[List[ProductResponse], List[str]]:
+        """Get many products by ID with at most one query
+        
+        Returns the active products in the order of `product_ids` (duplicates
+        collapsed) and the IDs that are missing or inactive. Cached products
+        are served from the catalog cache; the rest are loaded with one `$in`
+        query and cached.
+        """
+        unique_ids = list(dict.fromkeys(product_ids))
+        found = await catalog_cache.get_or_load_many("product", unique_ids, self._load_products)
+        
+        products = [found[product_id] for product_id in unique_ids if product_id in found]
+        missing = [product_id for product_id in unique_ids if product_id not in found]
+        return products, missing
+    
+    async def _load_products(self, product_ids: List[str]) -> Dict[str, ProductResponse]:
+        """Load active products by ID with one query"""
+        cursor = self.products.find({"id": {"$in": product_ids}, "is_active": True}, {"_id": 0})
+        return {doc["id"]: ProductResponse(**doc) async for doc in cursor}
+    
     async def update_product(self, product_id: str, update_data: ProductUpdate) -> Optional[ProductResponse]:
         """Update a product"""
         update_dict = {k: v for k, v in update_data.model_dump().items() if v is not None}
@@ -216,6 +782,7 @@ class ProductService:
         # Handle stock update
         if "stock" in update_dict:
             update_dict["in_stock"] = update_dict["stock"] > 0
+            update_dict["stock_synced_at"] = update_dict["updated_at"]
             # Also update inventory
             await self.inventory.update_one(
                 {"product_id": product_id},
@@ -226,15 +793,35 @@ class ProductService:
         if "images" in update_dict and update_dict["images"]:
             update_dict["image"] = update_dict["images"][0]
         
-        result = await self.products.update_one(
+        # The updated document comes back from the write itself: a read after it
+        # could join a coalesced load that started before the write
+        updated = await self.products.find_one_and_update(
             {"id": product_id},
-            {"$set": update_dict}
+            {"$set": update_dict},
+            projection={"_id": 0},
+            return_document=ReturnDocument.AFTER
         )
         
-        if result.matched_count == 0:
+        if updated is None:
             return None
         
-        return await self.get_product_by_id(product_id)
+        catalog_cache.invalidate("product", product_id)
+        catalog_cache.invalidate("detail", product_id)
+        catalog_cache.invalidate("brands")
+        
+        product = ProductResponse(**updated) if updated.get("is_active") else None
+        if product:
+            catalog_cache.set("product", product_id, product)
+            search_index.index_product(product.model_dump())
+            autocomplete_index.index_product(product.model_dump())
+            if any(field in update_dict for field in (*RELATED_TEXT_FIELDS, "is_active")):
+                await self.related_service.refresh_product(product.model_dump())
+        else:
+            search_index.remove_product(product_id)
+            autocomplete_index.remove_product(product_id)
+            await self.related_service.remove_product(product_id)
+        
+        return product
     
     async def delete_product(self, product_id: str) -> bool:
         """Soft delete a product"""
@@ -242,10 +829,29 @@ class ProductService:
             {"id": product_id},
             {"$set": {"is_active": False, "updated_at": datetime.now(timezone.utc).isoformat()}}
         )
+        search_index.remove_product(product_id)
+        autocomplete_index.remove_product(product_id)
+        await self.related_service.remove_product(product_id)
+        catalog_cache.invalidate("product", product_id)
+        catalog_cache.invalidate("detail", product_id)
+        catalog_cache.invalidate("brands")
         return result.modified_count > 0
     
     async def get_brands(self) -> List[str]:
         """Get all unique brands"""
+        return await catalog_cache.get_or_load("brands", "all", self._load_brands)
+    
+    def autocomplete(self, query: str, limit: int) -> AutocompleteResponse:
+        """Complete a partially typed search to product names, brands and categories"""
+        completions = autocomplete_index.complete(query, limit)
+        return AutocompleteResponse(query=query, **{
+            kind: [AutocompleteSuggestion(text=text, id=None if kind == "brands" else entry_id) for entry_id, text in entries]
+            for kind, entries in completions.items()
+        })
+    
+    @coalesced
+    async def _load_brands(self) -> List[str]:
+        """Load the distinct active brands from the database"""
         brands = await self.products.distinct("brand", {"is_active": True, "brand": {"$ne": None}})
         return sorted([b for b in brands if b])
     
@@ -255,18 +861,27 @@ class ProductService:
         """Add a review to a product"""
         review_id = str(uuid.uuid4())
         
-        # Check if user already reviewed this product
-        existing = await self.reviews.find_one({
-            "product_id": review_data.product_id,
-            "user_id": user_id
-        })
+        # Check if user already reviewed this product, and whether they bought it
+        # (for the verified purchase badge)
+        existing, purchase = await asyncio.gather(
+            self.reviews.find_one(
+                {"product_id": review_data.product_id, "user_id": user_id},
+                {"_id": 1}
+            ),
+            self.orders.find_one(
+                {
+                    "user_id": user_id,
+                    "items.product_id": review_data.product_id,
+                    "payment_status": PaymentStatus.COMPLETED.value
+                },
+                {"_id": 1}
+            )
+        )
         
         if existing:
             raise ValueError("You have already reviewed this product")
         
-        # Check if user purchased this product (for verified purchase badge)
-        # This would require checking orders - simplified for now
-        verified_purchase = False
+        verified_purchase = purchase is not None
         
         review_dict = {
             "id": review_id,
@@ -284,11 +899,12 @@ class ProductService:
         
         await self.reviews.insert_one(review_dict)
         
-        # Update product rating
-        await self._update_product_rating(review_data.product_id)
+        # Update product rating and review summary
+        await self._update_review_summary(review_data.product_id, review_dict)
         
         return ReviewResponse(**review_dict)
     
+    @coalesced
     async def get_product_reviews(self, product_id: str, page: int = 1, page_size: int = 10) -> List[ReviewResponse]:
         """Get reviews for a product"""
         skip = (page - 1) * page_size
@@ -298,24 +914,148 @@ class ProductService:
         
         return [ReviewResponse(**r) for r in reviews]
     
-    async def _update_product_rating(self, product_id: str):
-        """Update product's average rating"""
+    async def get_review_summary(self, product_id: str) -> Optional[ReviewSummary]:
+        """Get the precomputed review summary of a product"""
+        product = await self.get_product_by_id(product_id)
+        if not product:
+            return None
+        return self._build_review_summary(product)
+    
+    def _build_review_summary(self, product: ProductResponse) -> ReviewSummary:
+        return ReviewSummary(
+            product_id=product.id,
+            review_count=product.review_count,
+            average_rating=product.rating,
+            rating_histogram={**empty_rating_histogram(), **product.rating_histogram},
+            verified_review_count=product.verified_review_count,
+            verified_share=round(product.verified_review_count / product.review_count, 4) if product.review_count else 0.0,
+            top_review_ids=product.top_review_ids,
+        )
+    
+    async def _update_review_summary(self, product_id: str, review: dict):
+        """Fold one new review into the product's rating aggregates and review summary
+        
+        The running sum, count, star histogram and verified count are
+        incremented and the average recomputed in one atomic update, without
+        reading the product's other reviews. Only the top reviews are read,
+        from the reviews index. Products rated before these fields existed
+        start from their stored average; `recompute_ratings` makes them exact.
+        
+        The update only applies if no other review was folded in since the
+        review count was read, so the top reviews written were read after
+        every earlier update; otherwise it is retried.
+        """
+        rating = review["rating"]
+        star = str(rating)
+        while True:
+            product = await self.products.find_one({"id": product_id}, {"_id": 0, "review_count": 1})
+            if product is None:
+                return
+            # Read after the count, so it includes every review folded in up to that count
+            top_review_ids = await self._top_review_ids(product_id)
+            result = await self.products.update_one(
+                {"id": product_id, "review_count": product.get("review_count")},
+                [
+                    {"$set": {
+                        "rating_sum": {"$add": [
+                            {"$ifNull": ["$rating_sum", {"$multiply": [
+                                {"$ifNull": ["$rating", 0]}, {"$ifNull": ["$review_count", 0]}
+                            ]}]},
+                            rating
+                        ]},
+                        "review_count": {"$add": [{"$ifNull": ["$review_count", 0]}, 1]},
+                        "rating_histogram": {"$mergeObjects": [
+                            {"$literal": empty_rating_histogram()},
+                            {"$ifNull": ["$rating_histogram", {}]},
+                            {star: {"$add": [{"$ifNull": [f"$rating_histogram.{star}", 0]}, 1]}}
+                        ]},
+                        "verified_review_count": {"$add": [
+                            {"$ifNull": ["$verified_review_count", 0]},
+                            1 if review["verified_purchase"] else 0
+                        ]},
+                        "top_review_ids": {"$literal": top_review_ids},
+                    }},
+                    {"$set": {"rating": {"$round": [{"$divide": ["$rating_sum", "$review_count"]}, 1]}}},
+                ]
+            )
+            if result.matched_count:
+                break
+        catalog_cache.invalidate("product", product_id)
+        catalog_cache.invalidate("detail", product_id)
+    
+    async def _top_review_ids(self, product_id: str) -> List[str]:
+        """IDs of a product's most helpful reviews, in TOP_REVIEWS_SORT order"""
+        reviews = await self.reviews.find(
+            {"product_id": product_id}, {"_id": 0, "id": 1}
+        ).sort(TOP_REVIEWS_SORT).limit(TOP_REVIEWS).to_list(TOP_REVIEWS)
+        return [review["id"] for review in reviews]
+    
+    async def recompute_ratings(self, product_ids: Optional[List[str]] = None, batch_size: int = 1000) -> int:
+        """Rebuild rating aggregates and review summaries from the reviews collection
+        
+        Repairs drift in the incrementally maintained fields. Covers every
+        product, or only `product_ids`. Each product written is stamped with
+        the run's repair ID, so products with reviews in their summary that
+        were not stamped have no reviews left and are reset. Returns the
+        number of products written.
+        """
+        repair_id = str(uuid.uuid4())
+        match = {"product_id": {"$in": product_ids}} if product_ids is not None else {}
         pipeline = [
-            {"$match": {"product_id": product_id}},
+            {"$match": match},
+            # Follows the (product_id, helpful_count, created_at) index, so each product's
+            # reviews reach $group already in top review order
+            {"$sort": {"product_id": 1, **dict(TOP_REVIEWS_SORT)}},
             {"$group": {
-                "_id": None,
-                "avg_rating": {"$avg": "$rating"},
-                "count": {"$sum": 1}
-            }}
+                "_id": "$product_id",
+                "review_ids": {"$push": "$id"},
+                "rating_sum": {"$sum": "$rating"},
+                "review_count": {"$sum": 1},
+                "verified_review_count": {"$sum": {"$cond": ["$verified_purchase", 1, 0]}},
+                **{f"stars_{star}": {"$sum": {"$cond": [{"$eq": ["$rating", int(star)]}, 1, 0]}} for star in RATING_STARS},
+            }},
+            {"$project": {
+                "rating_sum": 1,
+                "review_count": 1,
+                "verified_review_count": 1,
+                "top_review_ids": {"$slice": ["$review_ids", TOP_REVIEWS]},
+                **{f"stars_{star}": 1 for star in RATING_STARS},
+            }},
         ]
         
-        result = await self.reviews.aggregate(pipeline).to_list(1)
+        updated = 0
+        batch = []
+        async for row in self.reviews.aggregate(pipeline, allowDiskUse=True):
+            histogram = {star: row[f"stars_{star}"] for star in RATING_STARS}
+            batch.append(UpdateOne({"id": row["_id"]}, {"$set": {
+                "rating": round(row["rating_sum"] / row["review_count"], 1),
+                "rating_sum": row["rating_sum"],
+                "review_count": row["review_count"],
+                "rating_histogram": histogram,
+                "verified_review_count": row["verified_review_count"],
+                "top_review_ids": row["top_review_ids"],
+                "rating_repair_id": repair_id,
+            }}))
+            if len(batch) >= batch_size:
+                updated += (await self.products.bulk_write(batch, ordered=False)).modified_count
+                batch = []
+        if batch:
+            updated += (await self.products.bulk_write(batch, ordered=False)).modified_count
         
-        if result:
-            avg_rating = round(result[0]["avg_rating"], 1)
-            count = result[0]["count"]
-            
-            await self.products.update_one(
-                {"id": product_id},
-                {"$set": {"rating": avg_rating, "review_count": count}}
-            )
+        # Reset products that have no reviews left
+        unreviewed = {"rating_repair_id": {"$ne": repair_id}, "review_count": {"$ne": 0}}
+        if product_ids is not None:
+            unreviewed["id"] = {"$in": product_ids}
+        result = await self.products.update_many(unreviewed, {"$set": {
+            "rating": 0.0,
+            "rating_sum": 0,
+            "review_count": 0,
+            "rating_histogram": empty_rating_histogram(),
+            "verified_review_count": 0,
+            "top_review_ids": [],
+        }})
+        updated += result.modified_count
+        
+        catalog_cache.invalidate("product")
+        catalog_cache.invalidate("detail")
+        return updated
@@ -0,0 +1,517 @@
+"""
+Content-based "related products" from TF-IDF similarity.
+
+Every active product is turned into a TF-IDF vector over its name,
+description, features, brand and category name, and the top-K most
+cosine-similar products are precomputed in row batches with sparse matrix
+products. The lists are stored in the `related_products` collection, so
+serving them is one indexed lookup.
+
+A full rebuild runs from `scripts/build_related_products.py`, or in the
+background of the API, under a lease so one process rebuilds at a time.
+Product edits are queued in `related_product_edits` by whichever process
+makes them. One API process at a time, under another lease, holds the
+vectors and neighbour lists in memory: it loads them from the products and
+the stored lists, then applies the queued edits in the background,
+recomputing only the rows whose lists the edited products enter or leave.
+"""
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+import asyncio
+import logging
+import math
+import time
+import uuid
+import numpy as np
+from scipy import sparse
+from pymongo import DeleteOne, UpdateOne
+from config.database import get_db, COLLECTIONS
+from config.settings import settings
+from services.search_service import tokenize
+from utils.leases import Lease
+
+logger = logging.getLogger(__name__)
+
+# Term frequency weight per product field
+RELATED_TEXT_FIELDS = {
+    "name": 3.0,
+    "brand": 2.0,
+    "category_name": 2.0,
+    "features": 1.0,
+    "description": 1.0,
+}
+
+# Terms in more than this share of products say little about similarity but
+# make the similarity products dense (and the build quadratic), so they are
+# dropped. Terms in up to MIN_DOCUMENT_FREQUENCY_CUTOFF products are always
+# kept, so small catalogs keep the terms their products share.
+MAX_DOCUMENT_FREQUENCY = 0.1
+MIN_DOCUMENT_FREQUENCY_CUTOFF = 100
+
+# Rows re-vectorized since the matrix was last compacted are kept aside and
+# folded into it in one pass once there are this many
+COMPACT_ROWS = 256
+
+# Related list rebuilds, and the in-memory index that applies edits, each held by one process at a time
+REBUILD_LEASE = "related_products_rebuild"
+INDEX_LEASE = "related_products_index"
+
+# Queued edits applied per pass
+EDIT_BATCH = 500
+
+def product_terms(product: dict) -> Counter:
+    """Weighted term counts of a product's text fields"""
+    terms = Counter()
+    for field, weight in RELATED_TEXT_FIELDS.items():
+        value = product.get(field)
+        if isinstance(value, list):
+            value = " ".join(v for v in value if isinstance(v, str))
+        for token in tokenize(value):
+            terms[token] += weight
+    return terms
+
+class TfidfModel:
+    """Vocabulary and IDF weights fitted on a product catalog"""
+    def __init__(self):
+        self.vocabulary: Dict[str, int] = {}
+        self.idf = np.zeros(0, dtype=np.float32)
+
+    def fit_transform(self, documents: List[Counter]) -> sparse.csr_matrix:
+        n = len(documents)
+        document_frequency = Counter()
+        for terms in documents:
+            document_frequency.update(terms.keys())
+
+        max_df = max(MIN_DOCUMENT_FREQUENCY_CUTOFF, int(n * MAX_DOCUMENT_FREQUENCY))
+        kept = sorted(term for term, df in document_frequency.items() if df <= max_df)
+        self.vocabulary = {term: i for i, term in enumerate(kept)}
+        # Smoothed IDF, as in scikit-learn
+        self.idf = np.array(
+            [math.log((1 + n) / (1 + document_frequency[term])) + 1 for term in kept],
+            dtype=np.float32
+        )
+        return self.transform(documents)
+
+    def transform(self, documents: List[Counter]) -> sparse.csr_matrix:
+        """L2-normalized TF-IDF rows; terms outside the vocabulary are ignored"""
+        indptr = [0]
+        indices = []
+        data = []
+        for terms in documents:
+            for term, count in terms.items():
+                column = self.vocabulary.get(term)
+                if column is not None:
+                    indices.append(column)
+                    data.append((1 + math.log(count)) * self.idf[column])
+            indptr.append(len(indices))
+
+        matrix = sparse.csr_matrix(
+            (np.array(data, dtype=np.float32), np.array(indices, dtype=np.int32), np.array(indptr, dtype=np.int64)),
+            shape=(len(documents), len(self.vocabulary))
+        )
+        norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+        norms[norms == 0] = 1.0
+        return sparse.diags(1 / norms).dot(matrix).tocsr().astype(np.float32)
+
+def _top_k(columns: np.ndarray, values: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Best `k` (column, value) pairs by value, padded with -1 / 0"""
+    neighbors = np.full(k, -1, dtype=np.int32)
+    scores = np.zeros(k, dtype=np.float32)
+    if len(values) > k:
+        best = np.argpartition(-values, k - 1)[:k]
+        columns, values = columns[best], values[best]
+    order = np.argsort(-values, kind="stable")
+    neighbors[:len(order)] = columns[order]
+    scores[:len(order)] = values[order]
+    return neighbors, scores
+
+def top_k_neighbors(matrix: sparse.csr_matrix, k: int, batch_size: int = 512) -> Tuple[np.ndarray, np.ndarray]:
+    """Top-k cosine neighbours of every row of an L2-normalized matrix.
+
+    Similarities are computed one block of rows at a time, so memory stays
+    bounded by `batch_size` rows of the (sparse) similarity matrix.
+    """
+    n = matrix.shape[0]
+    neighbors = np.full((n, k), -1, dtype=np.int32)
+    scores = np.zeros((n, k), dtype=np.float32)
+    transposed = matrix.T.tocsr()
+
+    for start in range(0, n, batch_size):
+        block = (matrix[start:start + batch_size] @ transposed).tocsr()
+        for offset in range(block.shape[0]):
+            row = start + offset
+            lo, hi = block.indptr[offset], block.indptr[offset + 1]
+            columns, values = block.indices[lo:hi], block.data[lo:hi]
+            keep = (columns != row) & (values > 0)
+            neighbors[row], scores[row] = _top_k(columns[keep], values[keep], k)
+
+    return neighbors, scores
+
+class RelatedProductsIndex:
+    """In-memory TF-IDF vectors and top-k neighbour lists for the catalog"""
+    def __init__(self, k: int):
+        self.k = k
+        self.ready = False
+        # Serializes changes; set when edits are queued, to apply them without waiting for the next poll
+        self.lock = asyncio.Lock()
+        self.edits_queued = asyncio.Event()
+        self.model = TfidfModel()
+        self.ids: List[str] = []
+        self.positions: Dict[str, int] = {}
+        # Vectors as of the last compaction, and the rows changed or added since
+        self.matrix = sparse.csr_matrix((0, 0), dtype=np.float32)
+        self.buffer: Dict[int, sparse.csr_matrix] = {}
+        # Neighbour lists of the first len(ids) rows; the rest is spare capacity
+        self._neighbors = np.full((0, k), -1, dtype=np.int32)
+        self._scores = np.zeros((0, k), dtype=np.float32)
+
+    @property
+    def neighbors(self) -> np.ndarray:
+        return self._neighbors[:len(self.ids)]
+
+    @property
+    def scores(self) -> np.ndarray:
+        return self._scores[:len(self.ids)]
+
+    def build(self, products: List[dict]):
+        """Fit the model on `products` and compute every neighbour list"""
+        self.ids = [product["id"] for product in products]
+        self.positions = {product_id: i for i, product_id in enumerate(self.ids)}
+        self.matrix = self.model.fit_transform([product_terms(product) for product in products])
+        self.buffer = {}
+        self._neighbors, self._scores = top_k_neighbors(self.matrix, self.k)
+        self.ready = True
+
+    def load(self, products: List[dict], stored: Dict[str, List[dict]]):
+        """Fit the model on `products` and take the neighbour lists from `stored` (by product ID)
+
+        Much cheaper than `build`, which computes every list. Listed products
+        that are gone are skipped; products without a stored list start empty.
+        """
+        self.ids = [product["id"] for product in products]
+        self.positions = {product_id: i for i, product_id in enumerate(self.ids)}
+        self.matrix = self.model.fit_transform([product_terms(product) for product in products])
+        self.buffer = {}
+        self._neighbors = np.full((len(self.ids), self.k), -1, dtype=np.int32)
+        self._scores = np.zeros((len(self.ids), self.k), dtype=np.float32)
+        for row, product_id in enumerate(self.ids):
+            entries = [
+                (self.positions[entry["product_id"]], entry["score"])
+                for entry in stored.get(product_id, ())
+                if entry["product_id"] in self.positions
+            ][:self.k]
+            for i, (neighbor, score) in enumerate(entries):
+                self._neighbors[row, i] = neighbor
+                self._scores[row, i] = score
+        self.ready = True
+
+    def reset(self):
+        """Drop the in-memory state, e.g. when another process takes the index over"""
+        self.swap(RelatedProductsIndex(k=self.k))
+
+    def swap(self, fresh: "RelatedProductsIndex"):
+        """Adopt the state of an index built off to the side"""
+        self.model = fresh.model
+        self.ids = fresh.ids
+        self.positions = fresh.positions
+        self.matrix = fresh.matrix
+        self.buffer = fresh.buffer
+        self._neighbors = fresh._neighbors
+        self._scores = fresh._scores
+        self.ready = fresh.ready
+
+    def related(self, row: int) -> List[dict]:
+        return [
+            {"product_id": self.ids[neighbor], "score": round(float(score), 4)}
+            for neighbor, score in zip(self.neighbors[row], self.scores[row])
+            if neighbor >= 0
+        ]
+
+    def update_product(self, product: dict) -> List[int]:
+        """Re-vectorize a created or edited product; returns the rows whose lists changed"""
+        vector = self.model.transform([product_terms(product)])
+        return self._set_row(product["id"], vector)
+
+    def remove_product(self, product_id: str) -> List[int]:
+        """Drop a product from every list; returns the rows whose lists changed"""
+        if product_id not in self.positions:
+            return []
+        empty = sparse.csr_matrix((1, self.matrix.shape[1]), dtype=np.float32)
+        return self._set_row(product_id, empty)
+
+    def _set_row(self, product_id: str, vector: sparse.csr_matrix) -> List[int]:
+        row = self.positions.get(product_id)
+        if row is None:
+            row = len(self.ids)
+            self._grow(row + 1)
+            self.ids.append(product_id)
+            self.positions[product_id] = row
+        self.buffer[row] = vector
+        if len(self.buffer) >= COMPACT_ROWS:
+            self._compact()
+
+        neighbors, scores = self.neighbors, self.scores
+        similarities = self._similarities(row)
+        changed = {row}
+        neighbors[row], scores[row] = self._row_top_k(row, similarities)
+
+        # Rows that listed this product: its score changed, so recompute them fully
+        holders = set(np.nonzero((neighbors == row).any(axis=1))[0].tolist()) - {row}
+        for holder in holders:
+            neighbors[holder], scores[holder] = self._row_top_k(holder, self._similarities(holder))
+        changed |= holders
+
+        # Rows it now beats the weakest entry of: insert it
+        for other in np.nonzero(similarities > scores[:, -1])[0].tolist():
+            if other == row or other in holders:
+                continue
+            columns = np.append(neighbors[other][neighbors[other] >= 0], row)
+            values = np.append(scores[other][neighbors[other] >= 0], similarities[other])
+            neighbors[other], scores[other] = _top_k(columns, values, self.k)
+            changed.add(other)
+
+        return sorted(changed)
+
+    def _grow(self, size: int):
+        """Make room for `size` neighbour lists, doubling the capacity so appends stay cheap"""
+        capacity = self._neighbors.shape[0]
+        if size <= capacity:
+            return
+        capacity = max(size, 2 * capacity, 1024)
+        neighbors = np.full((capacity, self.k), -1, dtype=np.int32)
+        scores = np.zeros((capacity, self.k), dtype=np.float32)
+        neighbors[:len(self.ids)] = self.neighbors
+        scores[:len(self.ids)] = self.scores
+        self._neighbors, self._scores = neighbors, scores
+
+    def _compact(self):
+        """Fold the buffered rows into the matrix"""
+        n, width = len(self.ids), self.matrix.shape[1]
+        rows = sorted(self.buffer)
+        base = self.matrix
+        replaced = [row for row in rows if row < base.shape[0]]
+        if replaced:
+            keep = np.ones(base.shape[0], dtype=np.float32)
+            keep[replaced] = 0
+            base = sparse.diags(keep).dot(base).tocsr()
+        base = sparse.vstack([base, sparse.csr_matrix((n - base.shape[0], width), dtype=np.float32)])
+        buffered = sparse.vstack([self.buffer[row] for row in rows]).tocoo()
+        buffered = sparse.csr_matrix(
+            (buffered.data, (np.array(rows)[buffered.row], buffered.col)), shape=(n, width)
+        )
+        self.matrix = (base + buffered).tocsr().astype(np.float32)
+        self.matrix.eliminate_zeros()
+        self.buffer = {}
+
+    def _vector(self, row: int) -> sparse.csr_matrix:
+        vector = self.buffer.get(row)
+        return vector if vector is not None else self.matrix[row]
+
+    def _similarities(self, row: int) -> np.ndarray:
+        vector = self._vector(row)
+        similarities = np.zeros(len(self.ids), dtype=np.float32)
+        similarities[:self.matrix.shape[0]] = (self.matrix @ vector.T).toarray().ravel()
+        # Buffered rows supersede their compacted versions
+        for other, buffered in self.buffer.items():
+            similarities[other] = buffered.multiply(vector).sum()
+        return similarities
+
+    def _row_top_k(self, row: int, similarities: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        columns = np.nonzero(similarities > 0)[0]
+        columns = columns[columns != row]
+        return _top_k(columns.astype(np.int32), similarities[columns], self.k)
+
+# Shared per-process index; ready only in the process holding INDEX_LEASE (or one that just rebuilt)
+related_index = RelatedProductsIndex(k=settings.RELATED_PRODUCTS_K)
+
+class RelatedProductsService:
+    def __init__(self):
+        self.db = get_db()
+        self.products = self.db[COLLECTIONS['products']]
+        self.related = self.db[COLLECTIONS['related_products']]
+        self.edits = self.db[COLLECTIONS['related_product_edits']]
+
+    async def get_related_ids(self, product_id: str) -> Optional[List[str]]:
+        """Stored related product IDs, best first, or None if not computed yet"""
+        doc = await self.related.find_one({"product_id": product_id}, {"_id": 0, "related": 1})
+        if doc is None:
+            return None
+        return [entry["product_id"] for entry in doc["related"]]
+
+    async def rebuild(self, batch_size: int = 1000) -> Optional[int]:
+        """Recompute every product's related list and store them
+        
+        Returns the product count, or None if another process is rebuilding.
+        Queued edits are left for the process holding the index, which
+        applies them again harmlessly.
+        """
+        async with Lease(REBUILD_LEASE).hold() as acquired:
+            if not acquired:
+                logger.info("Related products rebuild skipped: another process is rebuilding")
+                return None
+            async with related_index.lock:
+                count = await self._rebuild(batch_size)
+
+        logger.info(f"Related products rebuilt for {count} products")
+        return count
+
+    async def _rebuild(self, batch_size: int) -> int:
+        started = datetime.now(timezone.utc).isoformat()
+        products = await self._active_products(batch_size)
+
+        fresh = RelatedProductsIndex(k=related_index.k)
+        await asyncio.to_thread(fresh.build, products)
+
+        # Lists of products that are gone are swept by build ID; lists written
+        # since the build started are newer than it and kept
+        build_id = str(uuid.uuid4())
+        await self._store(fresh, range(len(fresh.ids)), build_id, batch_size)
+        await self.related.delete_many({"build_id": {"$ne": build_id}, "updated_at": {"$lt": started}})
+
+        related_index.swap(fresh)
+        return len(products)
+
+    async def load(self, batch_size: int = 1000) -> int:
+        """Load the in-memory index from the products and their stored lists, returning the product count"""
+        async with related_index.lock:
+            products = await self._active_products(batch_size)
+            stored = {
+                doc["product_id"]: doc["related"]
+                async for doc in self.related.find({}, {"_id": 0, "product_id": 1, "related": 1}).batch_size(batch_size)
+            }
+            fresh = RelatedProductsIndex(k=related_index.k)
+            await asyncio.to_thread(fresh.load, products, stored)
+            related_index.swap(fresh)
+        logger.info(f"Related products index loaded for {len(products)} products")
+        return len(products)
+
+    async def _active_products(self, batch_size: int) -> List[dict]:
+        projection = {"_id": 0, "id": 1, **{field: 1 for field in RELATED_TEXT_FIELDS}}
+        return await self.products.find({"is_active": True}, projection).batch_size(batch_size).to_list(None)
+
+    async def maintain(self, poll_seconds: int, refresh_seconds: int):
+        """Hold the in-memory index whenever no other process does, until cancelled
+
+        The holder loads the index (or rebuilds it, with a positive
+        `refresh_seconds`, and again every `refresh_seconds`) and applies
+        queued edits every `poll_seconds`, or as soon as it queues one itself.
+        """
+        lease = Lease(INDEX_LEASE)
+        wait_seconds = poll_seconds or refresh_seconds
+        while True:
+            try:
+                async with lease.hold() as acquired:
+                    if acquired:
+                        await self._maintain(lease, wait_seconds, refresh_seconds)
+            except Exception as e:
+                logger.error(f"Related products index failed: {e}")
+            # Lost the lease (or failed): stop writing from a copy another process may now hold
+            related_index.reset()
+            await asyncio.sleep(wait_seconds)
+
+    async def _maintain(self, lease: Lease, wait_seconds: int, refresh_seconds: int):
+        if refresh_seconds <= 0 or await self.rebuild() is None:
+            await self.load()
+        rebuilt_at = time.monotonic()
+        while lease.held:
+            related_index.edits_queued.clear()
+            try:
+                if refresh_seconds > 0 and time.monotonic() - rebuilt_at >= refresh_seconds:
+                    await self.rebuild()
+                    rebuilt_at = time.monotonic()
+                await self.apply_queued_edits()
+            except Exception as e:
+                logger.error(f"Failed to update related products: {e}")
+            try:
+                await asyncio.wait_for(related_index.edits_queued.wait(), wait_seconds)
+            except asyncio.TimeoutError:
+                pass
+
+    async def refresh_product(self, product: dict):
+        """Update related lists after a product was created or its text fields changed"""
+        if not product.get("is_active", True):
+            await self.remove_product(product["id"])
+            return
+        await self._queue([product["id"]])
+
+    async def refresh_products(self, products: List[dict]):
+        """Update related lists after a batch of products was created"""
+        await self._queue([product["id"] for product in products if product.get("is_active", True)])
+
+    async def remove_product(self, product_id: str):
+        """Remove a deactivated product from related lists"""
+        await self._queue([product_id])
+        await self.related.delete_one({"product_id": product_id})
+
+    async def _queue(self, product_ids: List[str]):
+        """Queue edits for the process holding the index, off the request path"""
+        if not product_ids or settings.RELATED_PRODUCTS_EDIT_POLL_SECONDS <= 0:
+            # No process applies edits; the next rebuild reads the products as they are
+            return
+        now = datetime.now(timezone.utc).isoformat()
+        await self.edits.bulk_write([
+            UpdateOne({"product_id": product_id}, {"$set": {"queued_at": now, "edit_id": str(uuid.uuid4())}}, upsert=True)
+            for product_id in product_ids
+        ], ordered=False)
+        related_index.edits_queued.set()
+
+    async def apply_queued_edits(self) -> int:
+        """Apply queued edits to the in-memory index and store the changed lists, returning the edit count
+
+        An edit applies the product as it is now, so edits queued again for
+        it in the meantime are applied too; only the entries read are dequeued.
+        """
+        applied = 0
+        while related_index.ready:
+            queued = await self.edits.find({}, {"_id": 0, "product_id": 1, "edit_id": 1}).sort("queued_at", 1).to_list(EDIT_BATCH)
+            if not queued:
+                break
+            product_ids = [edit["product_id"] for edit in queued]
+            projection = {"_id": 0, "id": 1, **{field: 1 for field in RELATED_TEXT_FIELDS}}
+            products = {
+                product["id"]: product
+                async for product in self.products.find({"id": {"$in": product_ids}, "is_active": True}, projection)
+            }
+            # The product, or None if it is gone or inactive
+            edits = {product_id: products.get(product_id) for product_id in product_ids}
+            async with related_index.lock:
+                if not related_index.ready:
+                    break
+                rows = await asyncio.to_thread(self._edit_index, edits)
+                await self._store(related_index, rows)
+            removed = [product_id for product_id, product in edits.items() if product is None]
+            if removed:
+                # A list stored while the product was being deactivated is dropped here
+                await self.related.delete_many({"product_id": {"$in": removed}})
+            await self.edits.bulk_write([
+                DeleteOne({"product_id": edit["product_id"], "edit_id": edit["edit_id"]}) for edit in queued
+            ], ordered=False)
+            applied += len(queued)
+        return applied
+
+    @staticmethod
+    def _edit_index(edits: Dict[str, Optional[dict]]) -> List[int]:
+        changed = set()
+        for product_id, product in edits.items():
+            if product is None:
+                changed.update(related_index.remove_product(product_id))
+            else:
+                changed.update(related_index.update_product(product))
+        # Removed products keep their row, but their lists are deleted, not stored
+        return sorted(row for row in changed if edits.get(related_index.ids[row], True) is not None)
+
+    async def _store(self, index: RelatedProductsIndex, rows: Iterable[int], build_id: Optional[str] = None, batch_size: int = 1000):
+        """Write the related lists of `rows`"""
+        now = datetime.now(timezone.utc).isoformat()
+        batch = []
+        for row in rows:
+            fields = {"related": index.related(row), "updated_at": now}
+            if build_id:
+                fields["build_id"] = build_id
+            batch.append(UpdateOne({"product_id": index.ids[row]}, {"$set": fields}, upsert=True))
+            if len(batch) >= batch_size:
+                await self.related.bulk_write(batch, ordered=False)
+                batch = []
+        if batch:
+            await self.related.bulk_write(batch, ordered=False)
@@ -0,0 +1,235 @@
+from typing import Dict, List, Optional, Tuple
+import asyncio
+import bisect
+import heapq
+import logging
+import math
+import re
+
+logger = logging.getLogger(__name__)
+
+# Runs of letters and digits in any script (\w without the underscore)
+TOKEN_PATTERN = re.compile(r"[^\W_]+", re.UNICODE)
+
+# Sorts after every character, to bound a prefix range in the sorted vocabulary
+MAX_CHARACTER = "\U0010ffff"
+
+# Term frequency weight per indexed field (a simple BM25F)
+FIELD_WEIGHTS = {
+    "name": 3.0,
+    "brand": 2.0,
+    "description": 1.0,
+}
+
+# Cap on vocabulary terms a trailing query prefix may expand to; the most common are kept
+MAX_PREFIX_EXPANSIONS = 50
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Lowercase and split text into letter and digit tokens"""
+    if not text:
+        return []
+    return TOKEN_PATTERN.findall(text.lower())
+
+class SearchIndex:
+    """In-memory inverted index over active products with BM25 ranking.
+
+    The index lives in the API process: it is rebuilt from MongoDB at startup
+    (and periodically, to pick up writes made by other workers) and kept
+    current by `ProductService` on create, update and delete; edits made
+    while a rebuild runs are replayed onto the new index before it is swapped
+    in. Query terms are
+    ANDed; the last term also matches as a prefix so partially typed words
+    still find results.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.ready = False
+        self._postings: Dict[str, Dict[str, float]] = {}
+        self._doc_terms: Dict[str, Dict[str, float]] = {}
+        self._doc_lengths: Dict[str, float] = {}
+        self._total_length = 0.0
+        self._vocabulary: List[str] = []
+        # Edits made during each running rebuild: product (or None if removed) by ID
+        self._edit_logs: List[Dict[str, Optional[dict]]] = []
+
+    @property
+    def size(self) -> int:
+        return len(self._doc_lengths)
+
+    # ============ Indexing ============
+
+    def _log_edit(self, product_id: str, product: Optional[dict]):
+        for edits in self._edit_logs:
+            edits[product_id] = product
+
+    def index_product(self, product: dict):
+        """Add or replace a product; inactive products are removed"""
+        product_id = product["id"]
+        self._log_edit(product_id, product)
+        self._remove(product_id)
+
+        if not product.get("is_active", True):
+            return
+
+        terms: Dict[str, float] = {}
+        for field, weight in FIELD_WEIGHTS.items():
+            for token in tokenize(product.get(field)):
+                terms[token] = terms.get(token, 0.0) + weight
+
+        if not terms:
+            return
+
+        for term, tf in terms.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = {}
+                bisect.insort(self._vocabulary, term)
+            postings[product_id] = tf
+
+        length = sum(terms.values())
+        self._doc_terms[product_id] = terms
+        self._doc_lengths[product_id] = length
+        self._total_length += length
+
+    def remove_product(self, product_id: str):
+        """Remove a product from the index if present"""
+        self._log_edit(product_id, None)
+        self._remove(product_id)
+
+    def _remove(self, product_id: str):
+        terms = self._doc_terms.pop(product_id, None)
+        if terms is None:
+            return
+
+        for term in terms:
+            postings = self._postings[term]
+            del postings[product_id]
+            if not postings:
+                del self._postings[term]
+                idx = bisect.bisect_left(self._vocabulary, term)
+                del self._vocabulary[idx]
+
+        self._total_length -= self._doc_lengths.pop(product_id)
+
+    async def rebuild(self, collection, batch_size: int = 1000):
+        """Rebuild the index from the products collection.
+
+        The new index is built off to the side and swapped in at the end, so
+        searches keep working against the old one while the rebuild runs.
+        Products indexed or removed meanwhile may have been read before the
+        change, so those edits are replayed onto the new index before the swap.
+        """
+        fresh = SearchIndex(self.k1, self.b)
+        projection = {"_id": 0, "id": 1, "is_active": 1, **{field: 1 for field in FIELD_WEIGHTS}}
+
+        edits: Dict[str, Optional[dict]] = {}
+        self._edit_logs.append(edits)
+        try:
+            count = 0
+            async for product in collection.find({"is_active": True}, projection).batch_size(batch_size):
+                fresh.index_product(product)
+                count += 1
+                if count % batch_size == 0:
+                    # Let other requests run between batches
+                    await asyncio.sleep(0)
+        finally:
+            self._edit_logs.remove(edits)
+
+        for product_id, product in edits.items():
+            if product is None:
+                fresh.remove_product(product_id)
+            else:
+                fresh.index_product(product)
+
+        self._postings = fresh._postings
+        self._doc_terms = fresh._doc_terms
+        self._doc_lengths = fresh._doc_lengths
+        self._total_length = fresh._total_length
+        self._vocabulary = fresh._vocabulary
+        self.ready = True
+        logger.info(
+            f"Search index rebuilt with {count} products and {len(self._vocabulary)} terms "
+            f"({len(edits)} edits replayed)"
+        )
+
+    async def refresh_periodically(self, collection, interval_seconds: int):
+        """Rebuild now and then every `interval_seconds` (only once if 0) until cancelled"""
+        while True:
+            try:
+                await self.rebuild(collection)
+            except Exception as e:
+                logger.error(f"Search index refresh failed: {e}")
+            if interval_seconds <= 0:
+                return
+            await asyncio.sleep(interval_seconds)
+
+    # ============ Querying ============
+
+    def _expand_prefix(self, prefix: str) -> List[str]:
+        """Vocabulary terms starting with `prefix`, the ones in most products first"""
+        start = bisect.bisect_left(self._vocabulary, prefix)
+        end = bisect.bisect_left(self._vocabulary, prefix + MAX_CHARACTER, start)
+        terms = self._vocabulary[start:end]
+        if len(terms) <= MAX_PREFIX_EXPANSIONS:
+            return terms
+        return heapq.nlargest(MAX_PREFIX_EXPANSIONS, terms, key=lambda term: len(self._postings[term]))
+
+    def _idf(self, df: int) -> float:
+        n = len(self._doc_lengths)
+        return math.log(1 + (n - df + 0.5) / (df + 0.5))
+
+    def search(self, query: str, limit: Optional[int] = None) -> List[Tuple[str, float]]:
+        """Return `(product_id, score)` pairs for products matching every query term, best first"""
+        tokens = list(dict.fromkeys(tokenize(query)))
+        if not tokens or not self._doc_lengths:
+            return []
+
+        # Each query token becomes a group of alternative terms; a document
+        # must match at least one term from every group
+        groups = [[token] if token in self._postings else [] for token in tokens[:-1]]
+        groups.append(self._expand_prefix(tokens[-1]))
+        if any(not group for group in groups):
+            return []
+
+        group_docs = []
+        for group in groups:
+            if len(group) == 1:
+                group_docs.append(self._postings[group[0]].keys())
+            else:
+                docs = set()
+                for term in group:
+                    docs.update(self._postings[term])
+                group_docs.append(docs)
+
+        # Intersect starting from the rarest group
+        group_docs.sort(key=len)
+        candidates = set(group_docs[0])
+        for docs in group_docs[1:]:
+            candidates.intersection_update(docs)
+            if not candidates:
+                return []
+
+        avg_length = self._total_length / len(self._doc_lengths)
+        k1, b = self.k1, self.b
+        scores = dict.fromkeys(candidates, 0.0)
+
+        for group in groups:
+            for term in group:
+                postings = self._postings[term]
+                idf = self._idf(len(postings))
+                if len(postings) < len(candidates):
+                    matches = ((pid, tf) for pid, tf in postings.items() if pid in candidates)
+                else:
+                    matches = ((pid, postings[pid]) for pid in candidates if pid in postings)
+                for product_id, tf in matches:
+                    norm = k1 * (1 - b + b * self._doc_lengths[product_id] / avg_length)
+                    scores[product_id] += idf * tf * (k1 + 1) / (tf + norm)
+
+        if limit:
+            return heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+# Shared per-process index used by ProductService
+search_index = SearchIndex()
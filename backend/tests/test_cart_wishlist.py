@@ -37,6 +37,16 @@ class TestCart:
         assert "item_count" in data
         assert isinstance(data["items"], list)
     
+    def test_get_cart_recommendations(self, authenticated_client):
+        """Test cart recommendations exclude products already in the cart"""
+        cart = authenticated_client.get(f"{BASE_URL}/api/cart").json()
+        
+        response = authenticated_client.get(f"{BASE_URL}/api/cart/recommendations")
+        assert response.status_code == 200, f"Get cart recommendations failed: {response.text}"
+        
+        in_cart = {item["product_id"] for item in cart["items"]}
+        assert not in_cart & {p["id"] for p in response.json()}
+    
     def test_add_to_cart(self, authenticated_client, sample_product_id):
         """Test adding item to cart"""
         if not sample_product_id:
@@ -61,6 +71,31 @@ class TestCart:
         product_ids = [item["product_id"] for item in data["items"]]
         assert sample_product_id in product_ids, "Product not found in cart"
     
+    def test_update_cart_item_recalculates_totals(self, authenticated_client, sample_product_id):
+        """Test changing a quantity updates the line and the totals in the response"""
+        if not sample_product_id:
+            pytest.skip("No sample product available")
+        
+        authenticated_client.post(f"{BASE_URL}/api/cart/items", json={"product_id": sample_product_id, "quantity": 1})
+        response = authenticated_client.put(f"{BASE_URL}/api/cart/items/{sample_product_id}", json={"quantity": 3})
+        
+        # Status assertion
+        assert response.status_code == 200, f"Update cart item failed: {response.text}"
+        
+        # Data assertions
+        data = response.json()
+        line = next(item for item in data["items"] if item["product_id"] == sample_product_id)
+        assert line["quantity"] == 3
+        assert data["item_count"] == sum(item["quantity"] for item in data["items"])
+        subtotal = sum(item["price"] * item["quantity"] for item in data["items"])
+        assert data["subtotal"] == pytest.approx(subtotal, abs=0.01)
+        assert data["total"] == pytest.approx(data["subtotal"] + data["tax"], abs=0.01)
+        
+        # Removing the line drops it from the cart
+        response = authenticated_client.delete(f"{BASE_URL}/api/cart/items/{sample_product_id}")
+        assert response.status_code == 200
+        assert sample_product_id not in [item["product_id"] for item in response.json()["items"]]
+    
     def test_add_to_cart_invalid_product(self, authenticated_client):
         """Test adding non-existent product to cart fails"""
         item_data = {
@@ -101,6 +136,15 @@ class TestWishlist:
         assert "items" in data
         assert isinstance(data["items"], list)
     
+    def test_get_wishlist_id_is_stable(self, authenticated_client):
+        """Test repeated reads return the same wishlist ID, stored or not"""
+        first = authenticated_client.get(f"{BASE_URL}/api/wishlist")
+        second = authenticated_client.get(f"{BASE_URL}/api/wishlist")
+        
+        assert first.status_code == 200
+        assert second.status_code == 200
+        assert first.json()["id"] == second.json()["id"]
+    
     def test_add_to_wishlist(self, authenticated_client, sample_product_id):
         """Test adding item to wishlist"""
         if not sample_product_id:
@@ -148,3 +192,55 @@ class TestWishlist:
         data = response.json()
         assert "in_wishlist" in data
         assert isinstance(data["in_wishlist"], bool)
+    
+    def test_get_wishlist_products(self, authenticated_client, sample_product_id):
+        """Test wishlist products are returned in wishlist order"""
+        if not sample_product_id:
+            pytest.skip("No sample product available")
+        
+        authenticated_client.post(f"{BASE_URL}/api/wishlist/items", json={"product_id": sample_product_id})
+        
+        wishlist = authenticated_client.get(f"{BASE_URL}/api/wishlist").json()
+        response = authenticated_client.get(f"{BASE_URL}/api/wishlist/products")
+        
+        # Status assertion
+        assert response.status_code == 200, f"Get wishlist products failed: {response.text}"
+        
+        # Data assertions
+        product_ids = [product["id"] for product in response.json()]
+        assert sample_product_id in product_ids
+        wishlist_ids = [item["product_id"] for item in wishlist["items"]]
+        assert product_ids == [pid for pid in wishlist_ids if pid in product_ids]
+    
+    def test_check_many_in_wishlist(self, authenticated_client, sample_product_id):
+        """Test bulk wishlist membership check"""
+        if not sample_product_id:
+            pytest.skip("No sample product available")
+        
+        authenticated_client.post(f"{BASE_URL}/api/wishlist/items", json={"product_id": sample_product_id})
+        
+        response = authenticated_client.post(
+            f"{BASE_URL}/api/wishlist/check",
+            json={"product_ids": [sample_product_id, "non-existent-product-id"]}
+        )
+        
+        # Status assertion
+        assert response.status_code == 200, f"Bulk wishlist check failed: {response.text}"
+        
+        # Data assertions
+        data = response.json()["in_wishlist"]
+        assert data[sample_product_id] is True
+        assert data["non-existent-product-id"] is False
+        
+        # Removing the product is reflected immediately
+        authenticated_client.delete(f"{BASE_URL}/api/wishlist/items/{sample_product_id}")
+        response = authenticated_client.post(
+            f"{BASE_URL}/api/wishlist/check",
+            json={"product_ids": [sample_product_id]}
+        )
+        assert response.json()["in_wishlist"][sample_product_id] is False
+    
+    def test_check_many_in_wishlist_requires_ids(self, authenticated_client):
+        """Test bulk wishlist check rejects an empty list"""
+        response = authenticated_client.post(f"{BASE_URL}/api/wishlist/check", json={"product_ids": []})
+        assert response.status_code == 422
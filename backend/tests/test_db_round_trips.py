@@ -0,0 +1,81 @@
+"""
+MongoDB round-trip budget tests - Read the X-DB-Round-Trips header each response carries
+The server under test must run with DB_STATS_HEADERS=true (it is off by default)
+Budgets are upper bounds: cache hits make fewer round trips, and a request that joins
+another request's coalesced read reports 0, since the commands are counted for the
+request that issued them
+"""
+import pytest
+import os
+
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL', '').rstrip('/')
+
+
+def round_trips(response) -> int:
+    """MongoDB commands the server sent while handling a request"""
+    assert "X-DB-Round-Trips" in response.headers, "Server is not reporting DB stats; start it with DB_STATS_HEADERS=true"
+    return int(response.headers["X-DB-Round-Trips"])
+
+
+class TestCatalogRoundTrips:
+    """Round-trip budgets of catalog reads"""
+
+    def test_health_round_trips(self, api_client):
+        """Test health check pings the database once"""
+        response = api_client.get(f"{BASE_URL}/api/health")
+        assert response.status_code == 200
+        assert round_trips(response) <= 1
+        assert float(response.headers["X-DB-Time-Ms"]) >= 0
+
+    def test_product_list_round_trips(self, api_client):
+        """Test a product listing page is one find and one count"""
+        response = api_client.get(f"{BASE_URL}/api/products?page_size=12")
+        assert response.status_code == 200
+        assert round_trips(response) <= 2
+
+    def test_product_round_trips(self, api_client, sample_product_id):
+        """Test a single product is at most one query"""
+        if not sample_product_id:
+            pytest.skip("No sample product available")
+
+        response = api_client.get(f"{BASE_URL}/api/products/{sample_product_id}")
+        assert response.status_code == 200
+        assert round_trips(response) <= 1
+
+    def test_product_detail_round_trips(self, api_client, sample_product_id):
+        """Test the product page bundle stays within its budget"""
+        if not sample_product_id:
+            pytest.skip("No sample product available")
+
+        response = api_client.get(f"{BASE_URL}/api/products/{sample_product_id}/detail")
+        assert response.status_code == 200
+        # Product, reviews, stock, related IDs, related products (or the category fallback)
+        assert round_trips(response) <= 6
+
+    def test_autocomplete_round_trips(self, api_client):
+        """Test autocomplete is answered from memory"""
+        response = api_client.get(f"{BASE_URL}/api/products/autocomplete", params={"q": "a"})
+        assert response.status_code == 200
+        assert round_trips(response) == 0
+
+
+class TestCartRoundTrips:
+    """Round-trip budgets of cart and wishlist reads"""
+
+    def test_get_cart_round_trips(self, authenticated_client):
+        """Test the cart is one query"""
+        response = authenticated_client.get(f"{BASE_URL}/api/cart")
+        assert response.status_code == 200
+        assert round_trips(response) <= 1
+
+    def test_wishlist_check_round_trips(self, authenticated_client, sample_product_id):
+        """Test a page of wishlist badges is at most one query"""
+        if not sample_product_id:
+            pytest.skip("No sample product available")
+
+        response = authenticated_client.post(
+            f"{BASE_URL}/api/wishlist/check",
+            json={"product_ids": [sample_product_id, "non-existent-id-12345"]}
+        )
+        assert response.status_code == 200
+        assert round_trips(response) <= 1
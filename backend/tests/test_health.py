@@ -32,3 +32,33 @@ class TestHealthCheck:
         response = api_client.get(f"{BASE_URL}/api/docs")
         # API docs should return 200 (HTML page)
         assert response.status_code == 200
+    
+    def test_stats_endpoint(self, api_client):
+        """Test runtime stats expose catalog cache counters"""
+        response = api_client.get(f"{BASE_URL}/api/stats")
+        assert response.status_code == 200
+        
+        cache = response.json()["catalog_cache"]
+        for counter in ("entries", "bytes", "hits", "misses", "evictions", "invalidations"):
+            assert counter in cache
+        
+        coalesced = response.json()["coalesced_reads"]
+        for counter in ("executed", "coalesced", "in_flight"):
+            assert counter in coalesced
+        
+        hasher = response.json()["password_hasher"]
+        for counter in ("workers", "active", "queue_depth", "max_queue_depth", "completed"):
+            assert counter in hasher
+    
+    def test_metrics_endpoint(self, api_client):
+        """Test Prometheus metrics record requests by route template"""
+        api_client.get(f"{BASE_URL}/api/health")
+        response = api_client.get(f"{BASE_URL}/api/metrics")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        
+        body = response.text
+        assert "# TYPE http_request_duration_seconds histogram" in body
+        assert 'http_request_duration_seconds_count{method="GET",route="/api/health",status="200"}' in body
+        assert "# TYPE http_response_size_bytes histogram" in body
+        assert "# TYPE http_requests_in_flight gauge" in body
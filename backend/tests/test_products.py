@@ -2,7 +2,9 @@
 Products API tests - List, filter, sort, get single product, reviews
 """
 import pytest
+import json
 import os
+import uuid
 
 BASE_URL = os.environ.get('REACT_APP_BACKEND_URL', '').rstrip('/')
 
@@ -98,6 +100,71 @@ class TestProductsList:
             assert product["price"] >= min_price, f"Product price {product['price']} below min"
             assert product["price"] <= max_price, f"Product price {product['price']} above max"
 
+    
+    def test_get_products_with_facets(self, api_client):
+        """Test facet counts are returned for the filtered result set"""
+        response = api_client.get(f"{BASE_URL}/api/products?facets=true&in_stock_only=true")
+        
+        assert response.status_code == 200, f"Get products with facets failed: {response.text}"
+        
+        data = response.json()
+        facets = data["facets"]
+        assert facets is not None
+        assert facets["out_of_stock"] == 0
+        assert facets["in_stock"] == data["total"]
+        assert sum(c["count"] for c in facets["categories"]) == data["total"]
+        assert sum(b["count"] for b in facets["price_ranges"]) == data["total"]
+    
+    def test_get_products_without_facets(self, api_client):
+        """Test facets are omitted unless requested"""
+        response = api_client.get(f"{BASE_URL}/api/products")
+        
+        assert response.status_code == 200
+        assert response.json()["facets"] is None
+
+class TestProductsCursorPagination:
+    """Keyset (cursor) pagination tests"""
+    
+    def test_cursor_pages_match_offset_listing(self, api_client):
+        """Test walking cursor pages yields the same rows as the offset listing"""
+        response = api_client.get(f"{BASE_URL}/api/products?sort_by=price_asc&page_size=50")
+        assert response.status_code == 200
+        expected_ids = [p["id"] for p in response.json()["products"]]
+        
+        seen_ids = []
+        cursor = ""
+        while cursor is not None and len(seen_ids) < len(expected_ids):
+            response = api_client.get(
+                f"{BASE_URL}/api/products",
+                params={"sort_by": "price_asc", "page_size": 5, "cursor": cursor, "include_total": "false"}
+            )
+            assert response.status_code == 200, f"Cursor page failed: {response.text}"
+            
+            data = response.json()
+            assert data["total"] is None
+            assert len(data["products"]) <= 5
+            seen_ids.extend(p["id"] for p in data["products"])
+            cursor = data["next_cursor"]
+        
+        assert seen_ids[:len(expected_ids)] == expected_ids
+    
+    def test_invalid_cursor_returns_400(self, api_client):
+        """Test a malformed cursor is rejected"""
+        response = api_client.get(f"{BASE_URL}/api/products?cursor=not-a-cursor")
+        
+        assert response.status_code == 400
+    
+    def test_cursor_from_other_sort_returns_400(self, api_client):
+        """Test a cursor cannot be reused with a different sort order"""
+        response = api_client.get(f"{BASE_URL}/api/products?sort_by=price_asc&page_size=1&cursor=")
+        assert response.status_code == 200
+        
+        cursor = response.json()["next_cursor"]
+        if not cursor:
+            pytest.skip("Not enough products for a second page")
+        
+        response = api_client.get(f"{BASE_URL}/api/products?sort_by=name_asc&cursor={cursor}")
+        assert response.status_code == 400
 
 class TestProductsCategories:
     """Category endpoint tests"""
@@ -147,6 +214,125 @@ class TestProductsBrands:
         assert isinstance(data, list)
 
 
+class TestProductsAutocomplete:
+    """Typeahead endpoint tests"""
+    
+    def test_autocomplete_matches_product_name(self, api_client, sample_product_id):
+        """Test a product's name prefix suggests that product"""
+        if not sample_product_id:
+            pytest.skip("No sample product available")
+        
+        product = api_client.get(f"{BASE_URL}/api/products/{sample_product_id}").json()
+        response = api_client.get(
+            f"{BASE_URL}/api/products/autocomplete",
+            params={"q": product["name"], "limit": 10}
+        )
+        
+        # Status assertion
+        assert response.status_code == 200, f"Autocomplete failed: {response.text}"
+        
+        # Data assertions
+        data = response.json()
+        assert data["query"] == product["name"]
+        assert len(data["products"]) <= 10
+        assert any(s["text"] == product["name"] for s in data["products"])
+        assert isinstance(data["brands"], list)
+        assert isinstance(data["categories"], list)
+    
+    def test_autocomplete_requires_query(self, api_client):
+        """Test autocomplete rejects an empty query"""
+        response = api_client.get(f"{BASE_URL}/api/products/autocomplete", params={"q": ""})
+        assert response.status_code == 422
+
+
+class TestProductsImport:
+    """Bulk import endpoint tests"""
+    
+    def test_import_csv_dry_run_reports_row_errors(self, authenticated_client):
+        """Test a dry run validates every row and reports the bad ones by row number"""
+        categories = authenticated_client.get(f"{BASE_URL}/api/products/categories").json()
+        if not categories:
+            pytest.skip("No categories available")
+        category = categories[0]["name"]
+        
+        body = (
+            "name,price,category,stock,features\n"
+            f"Import Test Lamp,49.99,{category},5,Warm light|USB powered\n"
+            f"Import Test Chair,not-a-price,{category},5,\n"
+            "Import Test Desk,199,No Such Category,1,\n"
+        )
+        response = authenticated_client.post(
+            f"{BASE_URL}/api/products/import",
+            params={"dry_run": "true"},
+            data=body.encode(),
+            headers={"Content-Type": "text/csv"}
+        )
+        
+        # Status assertion
+        assert response.status_code == 200, f"Import failed: {response.text}"
+        
+        # Data assertions
+        data = response.json()
+        assert data["dry_run"] is True
+        assert data["received"] == 3
+        assert data["imported"] == 1
+        assert data["failed"] == 2
+        assert [error["row"] for error in data["errors"]] == [2, 3]
+        assert "price" in data["errors"][0]["error"]
+        assert "Unknown category" in data["errors"][1]["error"]
+    
+    def test_import_ndjson_creates_products(self, authenticated_client):
+        """Test an NDJSON import creates products and rejects a repeated SKU"""
+        categories = authenticated_client.get(f"{BASE_URL}/api/products/categories").json()
+        if not categories:
+            pytest.skip("No categories available")
+        
+        marker = uuid.uuid4().hex[:8]
+        sku = f"TEST-IMPORT-{marker.upper()}"
+        row = {"name": f"Import Test Kettle {marker}", "price": 39.5, "category_id": categories[0]["id"], "sku": sku, "stock": 3}
+        body = json.dumps(row) + "\n"
+        response = authenticated_client.post(
+            f"{BASE_URL}/api/products/import",
+            data=body.encode(),
+            headers={"Content-Type": "application/x-ndjson"}
+        )
+        assert response.status_code == 200, f"Import failed: {response.text}"
+        assert response.json()["imported"] == 1
+        
+        # Importing the same SKU again fails that row
+        response = authenticated_client.post(
+            f"{BASE_URL}/api/products/import",
+            params={"format": "ndjson", "dry_run": "true"},
+            data=body.encode()
+        )
+        assert response.status_code == 200
+        data = response.json()
+        assert data["imported"] == 0
+        assert data["errors"] == [{"row": 1, "sku": sku, "error": "SKU already exists"}]
+        
+        # Deactivate the product so test runs don't grow the catalog
+        response = authenticated_client.get(f"{BASE_URL}/api/products", params={"search": marker})
+        assert response.status_code == 200
+        product_ids = [product["id"] for product in response.json()["products"] if product["sku"] == sku]
+        assert len(product_ids) == 1, "Imported product not found"
+        response = authenticated_client.delete(f"{BASE_URL}/api/products/{product_ids[0]}")
+        assert response.status_code == 204
+    
+    def test_import_requires_format(self, authenticated_client):
+        """Test a body in an unknown format is rejected"""
+        response = authenticated_client.post(f"{BASE_URL}/api/products/import", json=[{"name": "x"}])
+        assert response.status_code == 415
+    
+    def test_import_requires_auth(self, api_client):
+        """Test importing requires a signed-in user"""
+        response = api_client.post(
+            f"{BASE_URL}/api/products/import",
+            data=b"name,price,category\n",
+            headers={"Content-Type": "text/csv"}
+        )
+        assert response.status_code in [401, 403]
+
+
 class TestSingleProduct:
     """Single product endpoint tests"""
     
@@ -176,6 +362,41 @@ class TestSingleProduct:
         
         assert response.status_code == 404
 
+    
+    def test_get_product_detail(self, api_client, sample_product_id):
+        """Test the product page bundle"""
+        if not sample_product_id:
+            pytest.skip("No sample product available")
+        
+        response = api_client.get(f"{BASE_URL}/api/products/{sample_product_id}/detail")
+        
+        # Status assertion
+        assert response.status_code == 200, f"Get product detail failed: {response.text}"
+        
+        # Data assertions
+        data = response.json()
+        assert data["id"] == sample_product_id
+        assert isinstance(data["reviews"], list)
+        assert data["review_summary"]["product_id"] == sample_product_id
+        assert "available_stock" in data
+        assert sample_product_id not in [p["id"] for p in data["related_products"]]
+    
+    def test_get_product_detail_not_found(self, api_client):
+        """Test product detail for a non-existent product returns 404"""
+        response = api_client.get(f"{BASE_URL}/api/products/non-existent-id-12345/detail")
+        assert response.status_code == 404
+    
+    def test_get_frequently_bought_together(self, api_client, sample_product_id):
+        """Test frequently bought together never includes the product itself"""
+        if not sample_product_id:
+            pytest.skip("No sample product available")
+        
+        response = api_client.get(f"{BASE_URL}/api/products/{sample_product_id}/frequently-bought-together?limit=4")
+        assert response.status_code == 200, f"Get frequently bought together failed: {response.text}"
+        
+        data = response.json()
+        assert len(data) <= 4
+        assert sample_product_id not in [p["id"] for p in data]
 
 class TestProductReviews:
     """Product reviews endpoint tests"""
@@ -199,3 +420,52 @@ class TestProductReviews:
             assert "id" in review
             assert "rating" in review
             assert "user_name" in review
+    
+    def test_product_rating_histogram(self, authenticated_client):
+        """Test the rating histogram agrees with the review count"""
+        # A fresh product, since products reviewed before histograms existed lack one until repaired
+        categories = authenticated_client.get(f"{BASE_URL}/api/products/categories").json()
+        if not categories:
+            pytest.skip("No categories available")
+        response = authenticated_client.post(f"{BASE_URL}/api/products", json={
+            "name": f"Histogram Test Lamp {uuid.uuid4().hex[:8]}", "price": 12.0, "category_id": categories[0]["id"]
+        })
+        assert response.status_code == 201, f"Create product failed: {response.text}"
+        product_id = response.json()["id"]
+        
+        try:
+            response = authenticated_client.post(
+                f"{BASE_URL}/api/products/{product_id}/reviews",
+                json={"product_id": product_id, "rating": 4, "title": "Bright enough"}
+            )
+            assert response.status_code == 201, f"Add review failed: {response.text}"
+            
+            response = authenticated_client.get(f"{BASE_URL}/api/products/{product_id}")
+            assert response.status_code == 200
+            data = response.json()
+            assert data["rating_histogram"] == {"1": 0, "2": 0, "3": 0, "4": 1, "5": 0}
+            assert sum(data["rating_histogram"].values()) == data["review_count"] == 1
+        finally:
+            authenticated_client.delete(f"{BASE_URL}/api/products/{product_id}")
+    
+    def test_get_review_summary(self, api_client, sample_product_id):
+        """Test the review summary endpoint"""
+        if not sample_product_id:
+            pytest.skip("No sample product available")
+        
+        response = api_client.get(f"{BASE_URL}/api/products/{sample_product_id}/reviews/summary")
+        
+        # Status assertion
+        assert response.status_code == 200, f"Get review summary failed: {response.text}"
+        
+        # Data assertions
+        data = response.json()
+        assert data["product_id"] == sample_product_id
+        assert set(data["rating_histogram"]) == {"1", "2", "3", "4", "5"}
+        assert 0.0 <= data["verified_share"] <= 1.0
+        assert isinstance(data["top_review_ids"], list)
+    
+    def test_get_review_summary_not_found(self, api_client):
+        """Test review summary for a non-existent product returns 404"""
+        response = api_client.get(f"{BASE_URL}/api/products/non-existent-id-12345/reviews/summary")
+        assert response.status_code == 404
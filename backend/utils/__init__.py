@@ -1,12 +1,14 @@
 # Utils module
 from utils.auth import (
     hash_password, verify_password, create_access_token, 
-    decode_token, get_current_user, get_optional_user
+    decode_token, get_current_user, get_optional_user,
+    PasswordHasher, password_hasher
 )
-from utils.email import EmailService
+from utils.email import EmailService, EmailOutbox, email_outbox
 
 __all__ = [
     'hash_password', 'verify_password', 'create_access_token',
     'decode_token', 'get_current_user', 'get_optional_user',
-    'EmailService'
+    'PasswordHasher', 'password_hasher', 'EmailService',
+    'EmailOutbox', 'email_outbox'
 ]
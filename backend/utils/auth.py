@@ -1,5 +1,7 @@
 from passlib.context import CryptContext
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
+import asyncio
 from jose import JWTError, jwt
 from fastapi import HTTPException, status, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
@@ -16,6 +18,54 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against a hash"""
     return pwd_context.verify(plain_password, hashed_password)
 
+class PasswordHasher:
+    """Runs bcrypt on a bounded thread pool instead of the event loop.
+    
+    bcrypt takes tens of milliseconds per call by design; run inline it
+    stalls every other request on the worker. At most `max_workers` hashes
+    run at once, the rest queue for a thread, and `queue_depth` reports how
+    many are waiting.
+    """
+    def __init__(self, max_workers: int):
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="password-hasher")
+        self.pending = 0
+        self.max_queue_depth = 0
+        self.completed = 0
+    
+    @property
+    def queue_depth(self) -> int:
+        """Calls waiting for a free thread"""
+        return max(0, self.pending - self.max_workers)
+    
+    async def hash(self, password: str) -> str:
+        """Hash a password using bcrypt"""
+        return await self._run(hash_password, password)
+    
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        """Verify a password against a hash"""
+        return await self._run(verify_password, plain_password, hashed_password)
+    
+    async def _run(self, fn, *args):
+        self.pending += 1
+        self.max_queue_depth = max(self.max_queue_depth, self.queue_depth)
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        finally:
+            self.pending -= 1
+            self.completed += 1
+    
+    def stats(self) -> dict:
+        return {
+            "workers": self.max_workers,
+            "active": min(self.pending, self.max_workers),
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "completed": self.completed,
+        }
+
+password_hasher = PasswordHasher(max_workers=settings.PASSWORD_HASH_WORKERS)
+
 def create_access_token(data: dict, expires_delta: timedelta = None) -> str:
     """Create a JWT access token"""
     to_encode = data.copy()
@@ -0,0 +1,254 @@
+"""
+Bounded in-process read-through cache with per-namespace TTLs and LRU eviction.
+
+Entries are keyed by `(namespace, key)`. Each namespace has its own TTL, the
+cache as a whole is capped by entry count and by an estimate of the memory
+held, and the least recently used entries are evicted first. Services
+invalidate entries explicitly when they write, so TTLs only bound staleness
+for writes made by other worker processes. A load that was running when its
+entry was invalidated may have read the data from before the write, so its
+result is returned to its caller but not cached. For the same reason an
+invalidation makes coalesced reads in flight (see `utils.singleflight`)
+unjoinable, so callers after the write start a fresh read.
+"""
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Set, Tuple
+from collections import OrderedDict
+import sys
+import time
+from pydantic import BaseModel
+from config.settings import settings
+from utils.singleflight import SingleFlight, read_group
+
+_MISSING = object()
+
+def estimate_size(value: Any) -> int:
+    """Rough size in bytes of a cached value"""
+    if isinstance(value, BaseModel):
+        return len(value.model_dump_json())
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return sys.getsizeof(value) + sum(estimate_size(item) for item in value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_size(k) + estimate_size(v) for k, v in value.items())
+    return sys.getsizeof(value)
+
+class AsyncLRUCache:
+    def __init__(
+        self,
+        max_entries: int,
+        max_bytes: int,
+        ttls: Optional[Dict[str, float]] = None,
+        default_ttl: float = 60.0,
+        flights: Optional[SingleFlight] = None,
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttls = ttls or {}
+        self.default_ttl = default_ttl
+        # Coalesced reads of the cached data, forgotten on every invalidation
+        self.flights = flights
+
+        self._entries: "OrderedDict[Tuple[str, Hashable], Tuple[Any, float, int]]" = OrderedDict()
+        self._namespace_keys: Dict[str, Set[Hashable]] = {}
+        self._bytes = 0
+        # Invalidation counters: per namespace, and per entry while loads of it run
+        self._namespace_generations: Dict[str, int] = {}
+        self._loading: Dict[Tuple[str, Hashable], list] = {}
+        self._clears = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, namespace: str, key: Hashable, default: Any = None) -> Any:
+        """Return a live cached value, or `default` on a miss"""
+        value = self._lookup(namespace, key)
+        return default if value is _MISSING else value
+
+    def set(self, namespace: str, key: Hashable, value: Any, ttl: Optional[float] = None):
+        """Store a value, evicting least recently used entries if over capacity"""
+        entry_key = (namespace, key)
+        if entry_key in self._entries:
+            self._remove(entry_key)
+
+        size = estimate_size(value)
+        if size > self.max_bytes:
+            return
+
+        ttl = ttl if ttl is not None else self.ttls.get(namespace, self.default_ttl)
+        self._entries[entry_key] = (value, time.monotonic() + ttl, size)
+        self._namespace_keys.setdefault(namespace, set()).add(key)
+        self._bytes += size
+
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    async def get_or_load(self, namespace: str, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """Return the cached value, or await `loader()` and cache its result.
+
+        `None` results are returned but not cached, and neither are results
+        of loads the entry was invalidated during.
+        """
+        value = self._lookup(namespace, key)
+        if value is not _MISSING:
+            return value
+
+        loadings = self._start_loads(namespace, [key])
+        started = self._generation(namespace, loadings[0])
+        try:
+            value = await loader()
+        finally:
+            self._finish_loads(namespace, [key])
+
+        if value is not None and self._generation(namespace, loadings[0]) == started:
+            self.set(namespace, key, value)
+        return value
+
+    async def get_or_load_many(
+        self, namespace: str, keys: List[Hashable], loader: Callable[[List[Hashable]], Awaitable[Dict[Hashable, Any]]]
+    ) -> Dict[Hashable, Any]:
+        """Return the cached values of `keys`, loading the missing ones with one `loader(missing)` call.
+
+        The loader returns the values it found by key. They are cached as by
+        `get_or_load`: not if None, nor if their key was invalidated meanwhile.
+        """
+        found = {}
+        missing = []
+        for key in keys:
+            value = self._lookup(namespace, key)
+            if value is _MISSING:
+                missing.append(key)
+            else:
+                found[key] = value
+        if not missing:
+            return found
+
+        loadings = self._start_loads(namespace, missing)
+        started = [self._generation(namespace, loading) for loading in loadings]
+        try:
+            loaded = await loader(missing)
+        finally:
+            self._finish_loads(namespace, missing)
+
+        for key, loading, generation in zip(missing, loadings, started):
+            value = loaded.get(key)
+            if value is not None and self._generation(namespace, loading) == generation:
+                self.set(namespace, key, value)
+        found.update(loaded)
+        return found
+
+    def _start_loads(self, namespace: str, keys: List[Hashable]) -> List[list]:
+        loadings = []
+        for key in keys:
+            # [loads running, invalidations since the first of them started]
+            loading = self._loading.setdefault((namespace, key), [0, 0])
+            loading[0] += 1
+            loadings.append(loading)
+        return loadings
+
+    def _finish_loads(self, namespace: str, keys: List[Hashable]):
+        for key in keys:
+            loading = self._loading[(namespace, key)]
+            loading[0] -= 1
+            if not loading[0]:
+                del self._loading[(namespace, key)]
+
+    def _generation(self, namespace: str, loading: list) -> Tuple[int, int, int]:
+        return self._clears, self._namespace_generations.get(namespace, 0), loading[1]
+
+    def invalidate(self, namespace: str, key: Hashable = _MISSING):
+        """Drop one key, or every key in the namespace when no key is given"""
+        if key is _MISSING:
+            keys = list(self._namespace_keys.get(namespace, ()))
+            self._namespace_generations[namespace] = self._namespace_generations.get(namespace, 0) + 1
+        else:
+            keys = [key] if key in self._namespace_keys.get(namespace, ()) else []
+            loading = self._loading.get((namespace, key))
+            if loading is not None:
+                loading[1] += 1
+
+        for k in keys:
+            self._remove((namespace, k))
+            self.invalidations += 1
+        if self.flights is not None:
+            self.flights.forget_all()
+
+    def clear(self):
+        """Drop every entry (counters are kept)"""
+        self._entries.clear()
+        self._namespace_keys.clear()
+        self._bytes = 0
+        self._clears += 1
+        if self.flights is not None:
+            self.flights.forget_all()
+
+    def stats(self) -> dict:
+        """Counters and occupancy, for sizing the cache"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+        }
+
+    def _lookup(self, namespace: str, key: Hashable) -> Any:
+        entry_key = (namespace, key)
+        entry = self._entries.get(entry_key)
+        if entry is None:
+            self.misses += 1
+            return _MISSING
+
+        value, expires_at, _ = entry
+        if expires_at <= time.monotonic():
+            self._remove(entry_key)
+            self.expirations += 1
+            self.misses += 1
+            return _MISSING
+
+        self._entries.move_to_end(entry_key)
+        self.hits += 1
+        return value
+
+    def _remove(self, entry_key: Tuple[str, Hashable]):
+        _, _, size = self._entries.pop(entry_key)
+        self._bytes -= size
+        namespace, key = entry_key
+        keys = self._namespace_keys.get(namespace)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._namespace_keys[namespace]
+
+# Catalog data (products, categories, brands, product page bundles) shared by every service in the process
+catalog_cache = AsyncLRUCache(
+    max_entries=settings.CATALOG_CACHE_MAX_ENTRIES,
+    max_bytes=settings.CATALOG_CACHE_MAX_BYTES,
+    ttls={
+        "product": settings.CATALOG_CACHE_PRODUCT_TTL,
+        "category": settings.CATALOG_CACHE_CATEGORY_TTL,
+        "categories": settings.CATALOG_CACHE_CATEGORY_TTL,
+        "brands": settings.CATALOG_CACHE_BRANDS_TTL,
+        "detail": settings.CATALOG_CACHE_DETAIL_TTL,
+    },
+    flights=read_group,
+)
+
+# Per-user wishlist membership (frozensets of product IDs), for product grid badges
+wishlist_cache = AsyncLRUCache(
+    max_entries=settings.WISHLIST_CACHE_MAX_ENTRIES,
+    max_bytes=settings.WISHLIST_CACHE_MAX_BYTES,
+    ttls={"membership": settings.WISHLIST_CACHE_TTL},
+)
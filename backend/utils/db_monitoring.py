@@ -0,0 +1,95 @@
+"""
+MongoDB command monitoring attributed to the current request.
+
+`CommandMonitor` is a pymongo `CommandListener` registered on the Motor
+client. Motor runs pymongo calls on its executor threads inside a copy of the
+caller's context, so the listener sees the `RequestDBStats` that
+`MetricsMiddleware` put in a contextvar for the request and adds each
+command's round trip and time to it. Commands outside a request
+(startup, background jobs) only reach the global metrics. A read coalesced
+by `@coalesced` is attributed to the request that issued it.
+
+Commands slower than `SLOW_QUERY_MS` are logged with the shape of their
+filter: field names and operators kept, values replaced by "?", so the log
+groups by query pattern without recording customer data.
+"""
+from typing import Any, Dict, Tuple
+import json
+import logging
+from pymongo import monitoring
+from config.settings import settings
+from utils.metrics import command_duration, db_request_stats
+
+logger = logging.getLogger(__name__)
+
+# Where each command keeps the filter its slow-query log line shows
+FILTER_FIELDS = {
+    "find": "filter",
+    "count": "query",
+    "distinct": "query",
+    "findAndModify": "query",
+}
+BULK_FILTER_FIELDS = {
+    "update": "updates",
+    "delete": "deletes",
+}
+
+def query_shape(value: Any) -> Any:
+    """A filter or pipeline with field names and operators kept and every value replaced by "?"."""
+    if isinstance(value, dict):
+        return {key: query_shape(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        shapes = [query_shape(item) for item in value if isinstance(item, (dict, list, tuple))]
+        return shapes or "?"
+    return "?"
+
+def command_filter(command_name: str, command: dict) -> Any:
+    """The filter (or aggregation pipeline) a command runs, if it has one"""
+    if command_name in FILTER_FIELDS:
+        return command.get(FILTER_FIELDS[command_name])
+    if command_name in BULK_FILTER_FIELDS:
+        statements = command.get(BULK_FILTER_FIELDS[command_name]) or []
+        return statements[0].get("q") if statements else None
+    if command_name == "aggregate":
+        return command.get("pipeline")
+    return None
+
+class CommandMonitor(monitoring.CommandListener):
+    """Times MongoDB commands, per request and globally, and logs slow ones"""
+
+    def __init__(self):
+        # Commands in flight, keyed by connection and request ID: collection and command document
+        self._pending: Dict[Tuple[Any, int], Tuple[str, dict]] = {}
+
+    def started(self, event):
+        # getMore names the cursor ID first and the collection separately
+        field = "collection" if event.command_name == "getMore" else event.command_name
+        collection = event.command.get(field)
+        if not isinstance(collection, str):
+            collection = ""
+        self._pending[(event.connection_id, event.request_id)] = (collection, event.command)
+
+    def succeeded(self, event):
+        self._finished(event)
+
+    def failed(self, event):
+        self._finished(event)
+
+    def _finished(self, event):
+        collection, command = self._pending.pop((event.connection_id, event.request_id), ("", None))
+        seconds = event.duration_micros / 1e6
+        command_duration.observe((event.command_name, collection), seconds)
+
+        stats = db_request_stats.get()
+        if stats is not None:
+            stats.record(seconds)
+
+        if settings.SLOW_QUERY_MS and seconds * 1000 >= settings.SLOW_QUERY_MS and command is not None:
+            shape = query_shape(command_filter(event.command_name, command))
+            logger.warning(
+                f"Slow MongoDB {event.command_name} on {event.database_name}.{collection}: "
+                f"{seconds * 1000:.1f}ms filter={json.dumps(shape, default=str)}"
+            )
+
+# Registered on the Motor client by config.database
+command_monitor = CommandMonitor()
@@ -1,12 +1,251 @@
+"""
+Transactional email, sent through a persistent outbox.
+
+`EmailService.send_email` only inserts a message into the `email_outbox`
+collection, so request paths (order confirmation, shipping updates) never wait
+on SMTP. Background workers started from the lifespan handler claim pending
+messages in batches, send each batch over one reused SMTP connection, and
+reschedule failures with exponential backoff until EMAIL_MAX_ATTEMPTS.
+
+To try it locally without credentials, run a debugging SMTP server
+(`python -m aiosmtpd -n -l localhost:8025`) and set SMTP_HOST=localhost,
+SMTP_PORT=8025, SMTP_STARTTLS=false and SMTP_AUTH=false.
+"""
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
+from datetime import datetime, timedelta, timezone
 from typing import List, Optional
+import asyncio
 import logging
+import random
+import time
+import uuid
 from config.settings import settings
+from config.database import get_db, COLLECTIONS
 
 logger = logging.getLogger(__name__)
 
+# Errors that will not go away on retry
+PERMANENT_SMTP_ERRORS = (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused, smtplib.SMTPAuthenticationError)
+
+def smtp_configured() -> bool:
+    """Whether outgoing mail can be sent with the current settings"""
+    return not settings.SMTP_AUTH or bool(settings.SMTP_USER and settings.SMTP_PASSWORD)
+
+def build_message(message: dict) -> MIMEMultipart:
+    """Build the MIME message for an outbox document"""
+    msg = MIMEMultipart('alternative')
+    msg['Subject'] = message["subject"]
+    msg['From'] = settings.EMAIL_FROM
+    msg['To'] = message["to_email"]
+    
+    # Add plain text version
+    if message.get("text_content"):
+        msg.attach(MIMEText(message["text_content"], 'plain'))
+    
+    # Add HTML version
+    msg.attach(MIMEText(message["html_content"], 'html'))
+    return msg
+
+class SMTPConnection:
+    """One authenticated SMTP connection, reused across sends.
+    
+    smtplib is blocking, so callers run these methods in a thread. The
+    connection is opened lazily, reopened once if the server dropped it,
+    and closed after SMTP_IDLE_SECONDS without a send.
+    """
+    def __init__(self):
+        self._server: Optional[smtplib.SMTP] = None
+        self._last_used = 0.0
+    
+    def send(self, message: dict):
+        """Send one outbox message, reconnecting once if the connection went stale"""
+        msg = build_message(message)
+        try:
+            self._connection().sendmail(settings.EMAIL_FROM, message["to_email"], msg.as_string())
+        except smtplib.SMTPServerDisconnected:
+            self.close()
+            self._connection().sendmail(settings.EMAIL_FROM, message["to_email"], msg.as_string())
+        self._last_used = time.monotonic()
+    
+    def close_if_idle(self):
+        if self._server and time.monotonic() - self._last_used > settings.SMTP_IDLE_SECONDS:
+            self.close()
+    
+    def close(self):
+        if self._server:
+            try:
+                self._server.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._server = None
+    
+    def _connection(self) -> smtplib.SMTP:
+        if self._server is None:
+            server = smtplib.SMTP(settings.SMTP_HOST, settings.SMTP_PORT, timeout=settings.SMTP_TIMEOUT_SECONDS)
+            try:
+                if settings.SMTP_STARTTLS:
+                    server.starttls()
+                if settings.SMTP_AUTH:
+                    server.login(settings.SMTP_USER, settings.SMTP_PASSWORD)
+            except Exception:
+                server.close()
+                raise
+            self._server = server
+        return self._server
+
+class EmailOutbox:
+    """Queue of outgoing messages in MongoDB, drained by a pool of workers.
+    
+    Message status moves pending -> sending -> sent, or back to pending with
+    a later `next_attempt_at` on failure, or to failed once attempts run out.
+    Claims older than EMAIL_CLAIM_TIMEOUT_SECONDS are taken over, so messages
+    held by a crashed worker are not lost.
+    """
+    def __init__(self):
+        self._wakeup = asyncio.Event()
+        self.sent = 0
+        self.retried = 0
+        self.failed = 0
+    
+    @property
+    def collection(self):
+        return get_db()[COLLECTIONS['email_outbox']]
+    
+    async def enqueue(
+        self,
+        to_email: str,
+        subject: str,
+        html_content: str,
+        text_content: Optional[str] = None
+    ) -> str:
+        """Queue a message for sending and return its ID"""
+        now = datetime.now(timezone.utc)
+        message_id = str(uuid.uuid4())
+        await self.collection.insert_one({
+            "id": message_id,
+            "to_email": to_email,
+            "subject": subject,
+            "html_content": html_content,
+            "text_content": text_content,
+            "status": "pending",
+            "attempts": 0,
+            "next_attempt_at": now,
+            "last_error": None,
+            "claim_id": None,
+            "claimed_at": None,
+            "created_at": now,
+            "sent_at": None,
+        })
+        self._wakeup.set()
+        return message_id
+    
+    def start(self, workers: int) -> List[asyncio.Task]:
+        """Start the worker pool; the caller cancels the tasks on shutdown"""
+        return [asyncio.create_task(self._worker(i)) for i in range(workers)]
+    
+    async def _worker(self, worker_id: int):
+        connection = SMTPConnection()
+        try:
+            while True:
+                try:
+                    batch = await self._claim_batch(settings.EMAIL_BATCH_SIZE)
+                except Exception as e:
+                    logger.error(f"Email worker {worker_id} failed to claim messages: {e}")
+                    batch = []
+                
+                if not batch:
+                    await asyncio.to_thread(connection.close_if_idle)
+                    await self._wait_for_work()
+                    continue
+                
+                for message in batch:
+                    try:
+                        await self._deliver(connection, message)
+                    except Exception as e:
+                        # Recording the outcome failed; the claim times out and the message is retried
+                        logger.error(f"Email worker {worker_id} failed to process message {message['id']}: {e}")
+        finally:
+            connection.close()
+    
+    async def _wait_for_work(self):
+        self._wakeup.clear()
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=settings.EMAIL_POLL_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+    
+    async def _claim_batch(self, size: int) -> List[dict]:
+        """Atomically claim up to `size` due messages for this worker"""
+        now = datetime.now(timezone.utc)
+        due = {"$or": [
+            {"status": "pending", "next_attempt_at": {"$lte": now}},
+            {"status": "sending", "claimed_at": {"$lt": now - timedelta(seconds=settings.EMAIL_CLAIM_TIMEOUT_SECONDS)}},
+        ]}
+        candidates = await self.collection.find(due, {"_id": 0, "id": 1}).sort("next_attempt_at", 1).to_list(size)
+        if not candidates:
+            return []
+        
+        # Re-check the due filter so a message raced by another worker is claimed only once
+        claim_id = str(uuid.uuid4())
+        await self.collection.update_many(
+            {"id": {"$in": [c["id"] for c in candidates]}, **due},
+            {"$set": {"status": "sending", "claim_id": claim_id, "claimed_at": now}}
+        )
+        return await self.collection.find({"claim_id": claim_id}, {"_id": 0}).to_list(size)
+    
+    async def _deliver(self, connection: SMTPConnection, message: dict):
+        """Send one claimed message and record the outcome"""
+        try:
+            await asyncio.to_thread(connection.send, message)
+        except Exception as e:
+            # Start the next send on a fresh connection rather than one left in an unknown state
+            await asyncio.to_thread(connection.close)
+            await self._record_failure(message, e)
+            return
+        
+        await self.collection.update_one(
+            {"id": message["id"], "claim_id": message["claim_id"]},
+            {
+                "$set": {"status": "sent", "sent_at": datetime.now(timezone.utc), "claim_id": None},
+                "$inc": {"attempts": 1},
+            }
+        )
+        self.sent += 1
+        logger.info(f"Email sent successfully to {message['to_email']}")
+    
+    async def _record_failure(self, message: dict, error: Exception):
+        attempts = message.get("attempts", 0) + 1
+        update = {"attempts": attempts, "last_error": str(error), "claim_id": None}
+        
+        if isinstance(error, PERMANENT_SMTP_ERRORS) or attempts >= settings.EMAIL_MAX_ATTEMPTS:
+            update["status"] = "failed"
+            self.failed += 1
+            logger.error(f"Giving up on email to {message['to_email']} after {attempts} attempts: {error}")
+        else:
+            # Exponential backoff with jitter, so a recovering server is not hit all at once
+            delay = min(settings.EMAIL_RETRY_MAX_SECONDS, settings.EMAIL_RETRY_BASE_SECONDS * 2 ** (attempts - 1))
+            update["status"] = "pending"
+            update["next_attempt_at"] = datetime.now(timezone.utc) + timedelta(seconds=delay * random.uniform(0.8, 1.2))
+            self.retried += 1
+            logger.warning(f"Failed to send email to {message['to_email']} (attempt {attempts}), retrying in {delay:.0f}s: {error}")
+        
+        await self.collection.update_one(
+            {"id": message["id"], "claim_id": message["claim_id"]},
+            {"$set": update}
+        )
+    
+    def stats(self) -> dict:
+        return {
+            "sent": self.sent,
+            "retried": self.retried,
+            "failed": self.failed,
+        }
+
+# Shared by every request path and the worker pool in the process
+email_outbox = EmailOutbox()
+
 class EmailService:
     @staticmethod
     async def send_email(
@@ -15,37 +254,16 @@ class EmailService:
         html_content: str,
         text_content: Optional[str] = None
     ) -> bool:
-        """Send an email using SMTP"""
-        if not settings.SMTP_USER or not settings.SMTP_PASSWORD:
+        """Queue an email for sending by the outbox workers"""
+        if not smtp_configured():
             logger.warning("SMTP credentials not configured. Email not sent.")
             return False
         
         try:
-            msg = MIMEMultipart('alternative')
-            msg['Subject'] = subject
-            msg['From'] = settings.EMAIL_FROM
-            msg['To'] = to_email
-            
-            # Add plain text version
-            if text_content:
-                part1 = MIMEText(text_content, 'plain')
-                msg.attach(part1)
-            
-            # Add HTML version
-            part2 = MIMEText(html_content, 'html')
-            msg.attach(part2)
-            
-            # Connect and send
-            with smtplib.SMTP(settings.SMTP_HOST, settings.SMTP_PORT) as server:
-                server.starttls()
-                server.login(settings.SMTP_USER, settings.SMTP_PASSWORD)
-                server.sendmail(settings.EMAIL_FROM, to_email, msg.as_string())
-            
-            logger.info(f"Email sent successfully to {to_email}")
+            await email_outbox.enqueue(to_email, subject, html_content, text_content)
             return True
-            
         except Exception as e:
-            logger.error(f"Failed to send email to {to_email}: {str(e)}")
+            logger.error(f"Failed to queue email to {to_email}: {str(e)}")
             return False
     
     @staticmethod
@@ -0,0 +1,77 @@
+"""
+Named leases in MongoDB, so a job runs in one process at a time.
+
+A lease is a document in the `leases` collection keyed by the job's name,
+naming the process that holds it and when it expires. A process acquires it
+when it is free or expired and renews it while the job runs, so a holder that
+dies only blocks the job until the lease expires. Every API worker can start
+the same background job; the ones that don't get the lease skip that run.
+"""
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator
+import asyncio
+import logging
+import uuid
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from config.database import get_db, COLLECTIONS
+
+logger = logging.getLogger(__name__)
+
+class Lease:
+    def __init__(self, name: str, ttl_seconds: float = 300.0):
+        self.name = name
+        self.ttl_seconds = ttl_seconds
+        self.owner = str(uuid.uuid4())
+        # Whether the last acquire or renewal succeeded
+        self.held = False
+        self.collection = get_db()[COLLECTIONS['leases']]
+
+    async def acquire(self) -> bool:
+        """Take or renew the lease; False if another process holds it"""
+        now = datetime.now(timezone.utc)
+        try:
+            lease = await self.collection.find_one_and_update(
+                {"_id": self.name, "$or": [{"owner": self.owner}, {"expires_at": {"$lte": now}}]},
+                {"$set": {"owner": self.owner, "expires_at": now + timedelta(seconds=self.ttl_seconds)}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+        except DuplicateKeyError:
+            # The lease exists and is held: the upsert tried to insert a second one
+            lease = None
+        self.held = lease is not None
+        return self.held
+
+    async def release(self):
+        """Give the lease up if this process holds it"""
+        self.held = False
+        await self.collection.delete_one({"_id": self.name, "owner": self.owner})
+
+    @asynccontextmanager
+    async def hold(self) -> AsyncIterator[bool]:
+        """Hold the lease for the body, renewing it in the background.
+
+        Yields whether it was acquired; the body should do nothing if not.
+        """
+        if not await self.acquire():
+            yield False
+            return
+
+        renewal = asyncio.create_task(self._renew())
+        try:
+            yield True
+        finally:
+            renewal.cancel()
+            await asyncio.gather(renewal, return_exceptions=True)
+            await self.release()
+
+    async def _renew(self):
+        while True:
+            await asyncio.sleep(self.ttl_seconds / 3)
+            try:
+                if not await self.acquire():
+                    logger.warning(f"Lease {self.name} was lost while held")
+            except Exception as e:
+                logger.error(f"Failed to renew lease {self.name}: {e}")
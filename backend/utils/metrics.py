@@ -0,0 +1,223 @@
+"""
+Request metrics in the Prometheus text exposition format.
+
+`MetricsMiddleware` is a plain ASGI middleware, so it adds no per-request
+objects beyond a wrapped `send`. It times every HTTP request and records its
+latency and response size in histograms labelled by method, route template
+(`/api/products/{product_id}`, never the raw path, to keep label cardinality
+bounded) and status code, and tracks requests in flight per method. The
+route is only known once the router has matched, so it is read from the
+scope after the request completes. Plain Starlette routes (the API docs)
+have static paths and are labelled by path; requests no route matched are
+labelled `unmatched`.
+
+Each request also gets a `RequestDBStats` in a contextvar, which
+`utils.db_monitoring` fills with the MongoDB round trips the request makes.
+Their count and total time are recorded per route and, when
+`DB_STATS_HEADERS` is on, returned in `X-DB-Round-Trips` and `X-DB-Time-Ms`
+response headers, which tests use to hold endpoints to round-trip budgets.
+A coalesced read runs in the context of the request that started it, so its
+commands count for that request only.
+
+Metrics are kept per process; `/api/metrics` renders this process's series.
+"""
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Sequence, Tuple
+import bisect
+import threading
+import time
+from config.settings import settings
+
+# Upper bounds of the latency histogram buckets, in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Upper bounds of the response size histogram buckets, in bytes
+SIZE_BUCKETS = (128, 512, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+# Upper bounds of the per-request MongoDB round-trip histogram buckets
+ROUND_TRIP_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+
+UNMATCHED_ROUTE = "unmatched"
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+class Histogram:
+    """Histogram with one series per combination of label values"""
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str], buckets: Sequence[float]):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        # Per series: per-bucket counts (the last bucket is +Inf) and the sum of observations
+        self._series: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+        # MongoDB command timings are observed from Motor's executor threads
+        self._lock = threading.Lock()
+
+    def observe(self, label_values: Tuple[str, ...], value: float):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = ([0] * (len(self.buckets) + 1), [0.0])
+            series[0][bisect.bisect_left(self.buckets, value)] += 1
+            series[1][0] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = [(labels, (list(counts), total[0])) for labels, (counts, total) in self._series.items()]
+        for label_values, (counts, total) in sorted(series):
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += count
+                le = f'le="{bound if bound == "+Inf" else _format(bound)}"'
+                lines.append(f"{self.name}_bucket{_labels(self.label_names, label_values, le)} {cumulative}")
+            labels = _labels(self.label_names, label_values)
+            lines.append(f"{self.name}_sum{labels} {_format(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+class Gauge:
+    """Gauge with one value per combination of label values"""
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str]):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, label_values: Tuple[str, ...], amount: float = 1):
+        self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def dec(self, label_values: Tuple[str, ...], amount: float = 1):
+        self._values[label_values] = self._values.get(label_values, 0) - amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} gauge"]
+        for label_values, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_labels(self.label_names, label_values)} {_format(value)}")
+        return lines
+
+request_duration = Histogram(
+    "http_request_duration_seconds", "Time from receiving a request to sending the last of its response.",
+    ("method", "route", "status"), LATENCY_BUCKETS
+)
+response_size = Histogram(
+    "http_response_size_bytes", "Size of response bodies.",
+    ("method", "route", "status"), SIZE_BUCKETS
+)
+requests_in_flight = Gauge(
+    "http_requests_in_flight", "Requests being handled.",
+    ("method",)
+)
+request_round_trips = Histogram(
+    "http_request_db_round_trips", "MongoDB commands sent while handling a request.",
+    ("method", "route"), ROUND_TRIP_BUCKETS
+)
+request_db_time = Histogram(
+    "http_request_db_seconds", "Cumulative MongoDB round-trip time of a request.",
+    ("method", "route"), LATENCY_BUCKETS
+)
+command_duration = Histogram(
+    "mongodb_command_duration_seconds", "Round-trip time of MongoDB commands.",
+    ("command", "collection"), LATENCY_BUCKETS
+)
+
+# Rendered by /api/metrics, in order
+registry = [
+    request_duration, response_size, requests_in_flight,
+    request_round_trips, request_db_time, command_duration,
+]
+
+class RequestDBStats:
+    """Round trips and cumulative time of the MongoDB commands of one request"""
+    __slots__ = ("round_trips", "seconds", "_lock")
+
+    def __init__(self):
+        self.round_trips = 0
+        self.seconds = 0.0
+        # Commands of one request can complete on several executor threads at once
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        with self._lock:
+            self.round_trips += 1
+            self.seconds += seconds
+
+# Stats of the request being handled, set by MetricsMiddleware
+db_request_stats: ContextVar[Optional[RequestDBStats]] = ContextVar("db_request_stats", default=None)
+
+def render_metrics() -> str:
+    """All registered metrics in the Prometheus text format"""
+    lines = []
+    for metric in registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+def route_label(scope) -> str:
+    """Route template a request matched, once routing has run"""
+    route = scope.get("route")
+    if route is not None:
+        return route.path
+    if "endpoint" in scope:
+        return scope["path"]
+    return UNMATCHED_ROUTE
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency, response size, concurrency and MongoDB use of HTTP requests"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = 500
+        size = 0
+        db_stats = RequestDBStats()
+
+        async def send_wrapper(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if settings.DB_STATS_HEADERS:
+                    # Commands made while the body streams are counted in metrics only
+                    message = {**message, "headers": [
+                        *message.get("headers", []),
+                        (b"x-db-round-trips", str(db_stats.round_trips).encode()),
+                        (b"x-db-time-ms", f"{db_stats.seconds * 1000:.2f}".encode()),
+                    ]}
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        start = time.perf_counter()
+        requests_in_flight.inc((method,))
+        token = db_request_stats.set(db_stats)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            db_request_stats.reset(token)
+            requests_in_flight.dec((method,))
+            route = route_label(scope)
+            labels = (method, route, str(status))
+            request_duration.observe(labels, elapsed)
+            response_size.observe(labels, size)
+            request_round_trips.observe((method, route), db_stats.round_trips)
+            request_db_time.observe((method, route), db_stats.seconds)
@@ -0,0 +1,62 @@
+"""
+Keyset (cursor) pagination helpers.
+
+A cursor is an opaque, URL-safe token holding the sort option it was issued
+for and the sort key values of the last row on the page. The next page seeks
+directly past that row through the sort index, so page N costs the same as
+page 1 instead of scanning and discarding `(N - 1) * page_size` documents.
+"""
+from typing import List, Optional, Tuple, Any
+import base64
+import json
+
+def encode_cursor(sort_by: str, sort: List[Tuple[str, int]], row: dict) -> str:
+    """Encode the sort key of `row` as an opaque cursor"""
+    payload = {"s": sort_by, "k": [row.get(field) for field, _ in sort]}
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str, sort_by: str, sort: List[Tuple[str, int]]) -> List[Any]:
+    """Decode a cursor issued for `sort_by`, returning its sort key values"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        values = payload["k"]
+        issued_for = payload["s"]
+    except (ValueError, TypeError, KeyError):
+        raise ValueError("Invalid cursor")
+    
+    if issued_for != sort_by or not isinstance(values, list) or len(values) != len(sort):
+        raise ValueError("Cursor does not match the requested sort order")
+    
+    return values
+
+def _after(field: str, direction: int, value: Any) -> Optional[dict]:
+    """Condition matching `field` values strictly after `value` in sort order.
+
+    MongoDB sorts null (and missing) before every number and string, so an
+    ascending page after null continues with the non-null values, and a
+    descending page after a value continues into the nulls. None means no
+    value of the field comes after it.
+    """
+    if direction > 0:
+        return {field: {"$ne": None}} if value is None else {field: {"$gt": value}}
+    if value is None:
+        return None
+    return {"$or": [{field: {"$lt": value}}, {field: None}]}
+
+def keyset_filter(sort: List[Tuple[str, int]], values: List[Any]) -> dict:
+    """Build a filter matching rows strictly after `values` in `sort` order.
+
+    For sort `[(a, 1), (b, 1)]` this is `a > va OR (a == va AND b > vb)`.
+    Null sort values are ordered the way MongoDB sorts them (see `_after`).
+    """
+    clauses = []
+    for i, (field, direction) in enumerate(sort):
+        after = _after(field, direction, values[i])
+        if after is None:
+            continue
+        clause = {prev_field: values[j] for j, (prev_field, _) in enumerate(sort[:i])}
+        clause.update(after)
+        clauses.append(clause)
+    return {"$or": clauses}
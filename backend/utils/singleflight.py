@@ -0,0 +1,70 @@
+"""
+Request coalescing ("single-flight") for concurrent identical reads.
+
+While a call for a key is in flight, later callers for the same key await the
+same task instead of issuing their own query, and all of them receive its
+result or its exception. The shared call runs as its own task and callers
+await it through `asyncio.shield`, so a caller that is cancelled (e.g. a
+client disconnect) does not cancel the query for everyone else.
+"""
+from typing import Any, Awaitable, Callable, Dict, Hashable, TypeVar
+import asyncio
+import functools
+
+T = TypeVar("T")
+
+class SingleFlight:
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Task] = {}
+        self.executed = 0
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        """Run `fn()` unless a call for `key` is already in flight, and return its result"""
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(functools.partial(self._forget, key))
+            self.executed += 1
+        else:
+            self.coalesced += 1
+
+        return await asyncio.shield(task)
+
+    def forget_all(self):
+        """Make later calls start their own run instead of joining the ones in flight
+        
+        For after a write: calls in flight may have read the data from before it.
+        Their callers still receive their results.
+        """
+        self._calls.clear()
+
+    def _forget(self, key: Hashable, task: asyncio.Task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # Mark the exception as retrieved in case every caller was cancelled
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> dict:
+        return {
+            "executed": self.executed,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._calls),
+        }
+
+# Shared by every coalesced service method in the process
+read_group = SingleFlight()
+
+def coalesced(method: Callable[..., Awaitable[Any]]):
+    """Coalesce concurrent calls to an async service method with equal arguments.
+
+    The key is the method and its arguments, not the instance, since every
+    service instance reads the same database. Arguments must be hashable.
+    """
+    @functools.wraps(method)
+    async def wrapper(self, *args, **kwargs):
+        key = (method.__qualname__, args, tuple(sorted(kwargs.items())))
+        return await read_group.do(key, lambda: method(self, *args, **kwargs))
+    return wrapper